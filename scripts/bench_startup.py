@@ -0,0 +1,110 @@
+"""
+Startup benchmark for the experiment entry points.
+
+Runs every src/experiments/*.py with --help (nothing is generated or scored)
+under `python -X importtime` and reports the median wall time, the slowest
+top-level imports, and which heavy dependencies were imported. Orchestrators
+start one process per shard, so this time is paid per shard.
+
+Usage:
+    python scripts/bench_startup.py [--repeats 5] [--output results/startup_bench.json]
+    python scripts/bench_startup.py --max-seconds 1.5   # exit 1 if any entry point is slower
+"""
+
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# 생성 단계에서는 필요 없는 무거운 의존성
+HEAVY_MODULES = (
+    "torch", "transformers", "bert_score", "sentence_transformers",
+    "nltk", "rouge_score", "sklearn", "scipy", "onnxruntime", "tiktoken",
+)
+
+
+def entry_points() -> list[Path]:
+    return sorted(p for p in (ROOT / "src" / "experiments").glob("*.py") if not p.name.startswith("_"))
+
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    """Top-level module → cumulative import time (µs) from -X importtime output."""
+    top = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if name.startswith(" ") and not name.startswith("  "):  # depth 0
+            top[name.strip()] = int(cumulative)
+    return top
+
+
+def bench(path: Path, python: str, repeats: int, args: list[str]) -> dict:
+    walls, imports = [], {}
+    for _ in range(repeats):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [python, "-X", "importtime", str(path), *args],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        walls.append(time.perf_counter() - start)
+        imports = parse_importtime(proc.stderr)
+    loaded = {name.split(".")[0] for name in imports}
+    all_modules = {
+        line.rsplit("|", 1)[-1].strip().split(".")[0]
+        for line in proc.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+    slowest = sorted(imports.items(), key=lambda kv: -kv[1])[:5]
+    return {
+        "entry_point": str(path.relative_to(ROOT)),
+        "returncode": proc.returncode,
+        "median_seconds": statistics.median(walls),
+        "min_seconds": min(walls),
+        "slowest_imports": {name: us / 1e6 for name, us in slowest},
+        "heavy_modules": sorted(m for m in HEAVY_MODULES if m in all_modules | loaded),
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure experiment script startup time")
+    parser.add_argument("--python", default=sys.executable, help="Interpreter to benchmark")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--args", nargs=argparse.REMAINDER, default=["--help"],
+                        help="Arguments passed to each entry point (default: --help)")
+    parser.add_argument("--max-seconds", type=float, default=None)
+    parser.add_argument("--output", default=None, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    results = [bench(p, args.python, args.repeats, args.args) for p in entry_points()]
+
+    print(f"{'Entry point':<36} {'median':>8} {'min':>8}  heavy imports")
+    for r in results:
+        heavy = ", ".join(r["heavy_modules"]) or "-"
+        print(f"{r['entry_point']:<36} {r['median_seconds']:>7.2f}s {r['min_seconds']:>7.2f}s  {heavy}")
+        if r["error"]:
+            print(f"  exited {r['returncode']}: {r['error']}")
+        slow = ", ".join(f"{k} {v:.2f}s" for k, v in r["slowest_imports"].items())
+        print(f"  slowest imports: {slow}")
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"python": args.python, "repeats": args.repeats, "results": results}, f, indent=2)
+        print(f"\nReport saved to {args.output}")
+
+    failed = [r for r in results if r["returncode"]]
+    if args.max_seconds is not None:
+        failed += [r for r in results if r["median_seconds"] > args.max_seconds]
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
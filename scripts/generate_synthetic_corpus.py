@@ -0,0 +1,438 @@
+"""
+Large-scale synthetic corpus generator for load testing.
+
+Composes clinical visits from templated agenda items (chief complaints),
+symptom details (provider question → annotated patient answer), provider
+follow-ups and unannotated filler turns, and writes them in the
+data/processed + data/annotations schema (one JSON file per case in each;
+see src/utils/data_loader.py). Visit lengths are drawn from a configurable
+distribution, with an optional fraction of long (500+ line) visits.
+
+Every case is generated from its own RNG seeded with (seed, case index), so
+the corpus is identical for any --workers / --chunk-size. Cases are
+generated and written chunk by chunk on a process pool; nothing is held in
+memory beyond one chunk per worker. A manifest with the parameters and
+corpus statistics is written next to the two directories.
+
+Usage:
+    python scripts/generate_synthetic_corpus.py --cases 10000
+    python scripts/generate_synthetic_corpus.py --cases 30000 --lines lognormal:3.4,0.45 \\
+        --long-fraction 0.02 --long-lines uniform:500,1500 --workers 8
+    python -m src.experiments.realtime_sim --transcript-dir data/synthetic/processed \\
+        --annotation-dir data/synthetic/annotations --backend standin --generate-only
+"""
+
+import os
+import re
+import json
+import math
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from tqdm import tqdm
+
+# (agenda 문장, agenda 요약) 템플릿 + 주제별 슬롯 값
+TOPICS = [
+    {
+        "symptom": "cough",
+        "complaint": "I've had this {quality} cough for about {duration} and it's not going away.",
+        "summary": "Patient reports a {quality} cough for about {duration}.",
+        "quality": ["dry", "wet", "hacking", "persistent", "barking"],
+        "location": ["chest", "throat"],
+        "trigger": ["lie down at night", "go outside in the cold", "talk for a long time"],
+    },
+    {
+        "symptom": "headache",
+        "complaint": "I keep getting these {quality} headaches, it's been going on for {duration}.",
+        "summary": "Patient reports recurring {quality} headaches for {duration}.",
+        "quality": ["throbbing", "pressure-like", "sharp", "dull", "pounding"],
+        "location": ["forehead", "temples", "back of the head"],
+        "trigger": ["look at screens", "skip meals", "am stressed at work"],
+    },
+    {
+        "symptom": "back pain",
+        "complaint": "My lower back has been {quality} for {duration}, it's hard to get through the day.",
+        "summary": "Patient reports {quality} lower back pain for {duration}.",
+        "quality": ["aching", "stiff", "sore", "spasming"],
+        "location": ["lower back", "left side of the back", "right hip"],
+        "trigger": ["bend over", "sit for too long", "lift things at work"],
+    },
+    {
+        "symptom": "chest pain",
+        "complaint": "I've been getting a {quality} pain in my chest on and off for {duration}.",
+        "summary": "Patient reports intermittent {quality} chest pain for {duration}.",
+        "quality": ["tight", "squeezing", "burning", "stabbing"],
+        "location": ["center of the chest", "left side of the chest"],
+        "trigger": ["climb stairs", "exercise", "eat a big meal"],
+    },
+    {
+        "symptom": "stomach pain",
+        "complaint": "My stomach has been {quality} for {duration}, especially after I eat.",
+        "summary": "Patient reports {quality} abdominal pain for {duration}, worse after meals.",
+        "quality": ["cramping", "bloated", "upset", "burning"],
+        "location": ["upper abdomen", "lower abdomen", "right side"],
+        "trigger": ["eat spicy food", "drink coffee", "eat late at night"],
+    },
+    {
+        "symptom": "knee pain",
+        "complaint": "I've been having {quality} pain in my {location} for {duration}.",
+        "summary": "Patient reports {quality} pain in the {location} for {duration}.",
+        "quality": ["sharp", "aching", "throbbing", "grinding"],
+        "location": ["left knee", "right knee", "both knees"],
+        "trigger": ["go down stairs", "run", "kneel"],
+    },
+    {
+        "symptom": "rash",
+        "complaint": "I've got this {quality} rash on my {location} that showed up {duration} ago.",
+        "summary": "Patient reports a {quality} rash on the {location} that began {duration} ago.",
+        "quality": ["itchy", "red", "bumpy", "scaly"],
+        "location": ["arms", "neck", "back", "legs"],
+        "trigger": ["shower with hot water", "wear wool", "use a new detergent"],
+    },
+    {
+        "symptom": "fatigue",
+        "complaint": "I've been feeling {quality} all the time for {duration}.",
+        "summary": "Patient reports feeling {quality} for {duration}.",
+        "quality": ["exhausted", "run down", "tired", "drained"],
+        "location": [],
+        "trigger": ["work long shifts", "don't sleep well", "skip breakfast"],
+    },
+    {
+        "symptom": "anxiety",
+        "complaint": "I've been feeling really {quality} for {duration} and it's affecting my sleep.",
+        "summary": "Patient reports feeling {quality} for {duration} with sleep disruption.",
+        "quality": ["anxious", "on edge", "nervous", "overwhelmed"],
+        "location": [],
+        "trigger": ["think about work", "am in crowds", "lie in bed at night"],
+    },
+    {
+        "symptom": "blood sugar",
+        "complaint": "My blood sugar readings have been {quality} for {duration}.",
+        "summary": "Patient reports {quality} blood sugar readings for {duration}.",
+        "quality": ["high", "all over the place", "hard to control"],
+        "location": [],
+        "trigger": ["eat carbs", "miss a dose", "skip exercise"],
+    },
+    {
+        "symptom": "dizziness",
+        "complaint": "I've been getting {quality} spells for {duration}.",
+        "summary": "Patient reports {quality} spells for {duration}.",
+        "quality": ["dizzy", "lightheaded", "spinning"],
+        "location": [],
+        "trigger": ["stand up quickly", "turn my head", "haven't eaten"],
+    },
+    {
+        "symptom": "shortness of breath",
+        "complaint": "I get {quality} short of breath, it's been like that for {duration}.",
+        "summary": "Patient reports being {quality} short of breath for {duration}.",
+        "quality": ["really", "easily", "suddenly"],
+        "location": ["chest"],
+        "trigger": ["walk uphill", "carry groceries", "lie flat"],
+    },
+]
+
+DURATIONS = [
+    "two days", "a week", "ten days", "two weeks", "three weeks", "a month",
+    "six weeks", "two months", "three months", "half a year", "a year",
+]
+MEDICATIONS = [
+    ("ibuprofen", "400mg"), ("acetaminophen", "500mg"), ("lisinopril", "10mg"),
+    ("metformin", "500mg"), ("omeprazole", "20mg"), ("sertraline", "50mg"),
+    ("cetirizine", "10mg"), ("albuterol", "two puffs"),
+]
+FREQUENCIES = ["once a day", "twice a day", "every morning", "as needed"]
+RELATIVES = ["mother", "father", "sister", "brother", "grandmother"]
+CONDITIONS = ["diabetes", "high blood pressure", "asthma", "migraines", "heart disease", "thyroid problems"]
+
+# (provider 질문, patient 답변, detail 요약)
+DETAILS = [
+    ("When did the {symptom} first start?",
+     "It started about {duration} ago, and it's been getting {course} since.",
+     "The {symptom} started about {duration} ago and has been getting {course}."),
+    ("On a scale from 1 to 10, how bad is it?",
+     "Most days it's about a {severity}, but it can get up to a {severity_hi}.",
+     "The {symptom} is rated {severity} out of 10, up to {severity_hi} at worst."),
+    ("Does anything make it worse?",
+     "It definitely gets worse when I {trigger}.",
+     "The {symptom} gets worse when the patient tries to {trigger}."),
+    ("Are you taking anything for it?",
+     "I've been taking {med} {dose} {freq}, it helps a little.",
+     "Patient takes {med} {dose} {freq} with partial relief."),
+    ("Where exactly do you feel it?",
+     "Mostly in my {location}.",
+     "The {symptom} is mostly felt in the {location}."),
+    ("Does anyone in your family have similar problems?",
+     "My {relative} has {condition}.",
+     "Family history of {condition} in the patient's {relative}."),
+    ("How has your sleep been with all this?",
+     "Not great, I'm only getting about {hours} hours a night.",
+     "Patient sleeps only about {hours} hours per night."),
+    ("Any fever or chills?",
+     "I had a low fever, around {temp}, a few days ago.",
+     "Patient had a low-grade fever around {temp}."),
+    ("Have you noticed any other changes?",
+     "No, nothing else that I've noticed.",
+     "Patient reports no other changes."),
+    ("Is it affecting your work or daily activities?",
+     "Yes, I've had to miss {missed} days of work because of it.",
+     "The {symptom} caused the patient to miss {missed} days of work."),
+]
+
+OPENERS = [
+    "Hi, what brings you in today?", "Good morning. How can I help you today?",
+    "So what's going on today?", "Nice to see you again. What can I do for you?",
+]
+NEXT_ITEM = [
+    "Is there anything else you wanted to talk about today?",
+    "Okay. Anything else bothering you?", "What else is going on?",
+]
+PROVIDER_FILLER = [
+    "Okay.", "I see.", "Mm-hmm, go on.", "Let me make a note of that.",
+    "Alright.", "Got it.", "Thanks for letting me know.", "How's the family doing?",
+    "Let me pull up your chart for a second.", "Okay, that's helpful.",
+]
+PATIENT_FILLER = [
+    "Sure.", "Yeah.", "Okay.", "They're doing well, thanks.", "Mm-hmm.",
+    "No problem.", "Right.", "Sorry, I lost my train of thought.",
+]
+CLOSERS = [
+    ("Provider", "Alright, let me examine you and then we'll talk about a plan."),
+    ("Patient", "Sounds good, thank you."),
+]
+
+
+def sample_length(spec: str, rng: random.Random) -> int:
+    """Draw one visit length from a distribution spec (const:N | uniform:A,B | lognormal:MU,SIGMA)."""
+    kind, _, params = spec.partition(":")
+    args = [float(x) for x in params.split(",")] if params else []
+    if kind == "const":
+        return int(args[0])
+    if kind == "uniform":
+        return rng.randint(int(args[0]), int(args[1]))
+    if kind == "lognormal":
+        return round(rng.lognormvariate(args[0], args[1]))
+    raise ValueError(f"Unknown length distribution: {spec}")
+
+
+def _slots(topic: dict, rng: random.Random) -> dict:
+    med, dose = rng.choice(MEDICATIONS)
+    severity = rng.randint(3, 8)
+    return {
+        "symptom": topic["symptom"],
+        "quality": rng.choice(topic["quality"]),
+        "location": rng.choice(topic["location"]) if topic["location"] else None,
+        "trigger": rng.choice(topic["trigger"]),
+        "duration": rng.choice(DURATIONS),
+        "course": rng.choice(["worse", "a bit better", "more frequent"]),
+        "severity": severity,
+        "severity_hi": min(10, severity + rng.randint(1, 3)),
+        "med": med,
+        "dose": dose,
+        "freq": rng.choice(FREQUENCIES),
+        "relative": rng.choice(RELATIVES),
+        "condition": rng.choice(CONDITIONS),
+        "hours": rng.randint(3, 6),
+        "temp": rng.choice(["99", "100", "100.5", "101"]),
+        "missed": rng.choice(["two", "three", "a few", "several"]),
+    }
+
+
+def generate_case(n_lines: int, rng: random.Random) -> tuple[list[dict], list[dict]]:
+    """One visit of exactly n_lines lines → (lines, annotations)."""
+    lines, annotations = [], []
+    # 충분히 긴 visit은 마지막 두 줄을 진찰 안내로 마무리
+    body = n_lines - len(CLOSERS) if n_lines > len(CLOSERS) + 2 else n_lines
+
+    def say(speaker, text, kind=None, summary=None):
+        if kind is not None:
+            annotations.append({"line_idx": len(lines), "type": kind, "summary": summary})
+        lines.append({"speaker": speaker, "text": text})
+
+    say("Provider", rng.choice(OPENERS))
+    # body에 도달할 때까지 agenda item (주소 + 세부 질문/답변)을 이어 붙임
+    while len(lines) < body:
+        if len(lines) > 1:
+            say("Provider", rng.choice(NEXT_ITEM))
+        topic = rng.choice(TOPICS)
+        slots = _slots(topic, rng)
+        say("Patient", topic["complaint"].format(**slots), "agenda_item", topic["summary"].format(**slots))
+        details = [d for d in DETAILS if slots["location"] or "{location}" not in d[1]]
+        for question, answer, summary in rng.sample(details, rng.randint(3, len(details))):
+            if len(lines) >= body:
+                break
+            if rng.random() < 0.3:
+                say("Provider", rng.choice(PROVIDER_FILLER))
+                say("Patient", rng.choice(PATIENT_FILLER))
+            say("Provider", question.format(**slots))
+            say("Patient", answer.format(**slots), "detail", summary.format(**slots))
+
+    del lines[body:]
+    annotations = [a for a in annotations if a["line_idx"] < body]
+    if body < n_lines:
+        for speaker, text in CLOSERS:
+            say(speaker, text)
+    return lines, annotations
+
+
+def _case_rng(seed: int, idx: int) -> random.Random:
+    return random.Random(f"{seed}/{idx}")
+
+
+def _write_chunk(
+    start: int, stop: int, width: int, params: dict, t_dir: str, a_dir: str
+) -> dict:
+    """Generate and write cases [start, stop); return their length / annotation stats."""
+    lengths, annotated = [], 0
+    for idx in range(start, stop):
+        rng = _case_rng(params["seed"], idx)
+        spec = params["long_lines"] if rng.random() < params["long_fraction"] else params["lines"]
+        n_lines = max(params["min_lines"], min(params["max_lines"], sample_length(spec, rng)))
+        case_id = f"{params['prefix']}_{idx:0{width}d}"
+        lines, annotations = generate_case(n_lines, rng)
+        with open(os.path.join(t_dir, f"{case_id}.json"), "w", encoding="utf-8") as f:
+            json.dump({"id": case_id, "lines": lines}, f, ensure_ascii=False)
+        with open(os.path.join(a_dir, f"{case_id}.json"), "w", encoding="utf-8") as f:
+            json.dump({"id": case_id, "annotations": annotations}, f, ensure_ascii=False)
+        lengths.append(len(lines))
+        annotated += len(annotations)
+    return {"lengths": lengths, "annotations": annotated}
+
+
+def _prepare_dir(path: Path, prefix: str, overwrite: bool):
+    """Create path; with overwrite, delete only case files this generator wrote (<prefix>_<n>.json)."""
+    path.mkdir(parents=True, exist_ok=True)
+    existing = list(path.glob("*.json"))
+    if not existing:
+        return
+    if not overwrite:
+        raise FileExistsError(f"{path} is not empty; pass --overwrite to replace a generated corpus")
+    own = re.compile(rf"{re.escape(prefix)}_\d+\.json")
+    foreign = [f.name for f in existing if not own.fullmatch(f.name)]
+    if foreign:
+        # 직접 만든 파일이 아니면 지우지도, 섞지도 않음 (예: data/processed의 샘플 코퍼스)
+        raise FileExistsError(
+            f"{path} holds files not written by this generator with prefix {prefix!r} "
+            f"(e.g. {foreign[0]}); refusing to write there"
+        )
+    for f in existing:
+        f.unlink()
+
+
+def _percentile(sorted_values: list[int], q: float) -> int:
+    return sorted_values[min(len(sorted_values) - 1, math.floor(q * len(sorted_values)))]
+
+
+def generate_corpus(
+    n_cases: int,
+    transcript_dir: str = "data/synthetic/processed",
+    annotation_dir: str = "data/synthetic/annotations",
+    seed: int = 0,
+    lines: str = "lognormal:3.4,0.45",
+    long_fraction: float = 0.0,
+    long_lines: str = "uniform:500,1500",
+    min_lines: int = 4,
+    max_lines: int = 5000,
+    prefix: str = "syn",
+    workers: int | None = None,
+    chunk_size: int = 500,
+    overwrite: bool = False,
+) -> dict:
+    """Generate n_cases visits in parallel; returns the manifest (also saved as JSON).
+
+    Refuses non-empty target directories unless overwrite is set, and even
+    then only replaces files named like this generator's cases.
+    """
+    t_dir, a_dir = Path(transcript_dir), Path(annotation_dir)
+    for d in (t_dir, a_dir):
+        _prepare_dir(d, prefix, overwrite)
+
+    params = {
+        "seed": seed, "lines": lines, "long_fraction": long_fraction, "long_lines": long_lines,
+        "min_lines": min_lines, "max_lines": max_lines, "prefix": prefix,
+    }
+    width = len(str(max(n_cases - 1, 0)))
+    workers = workers or os.cpu_count() or 1
+    chunks = [(s, min(s + chunk_size, n_cases)) for s in range(0, n_cases, chunk_size)]
+
+    lengths, annotated = [], 0
+    progress = tqdm(total=n_cases, desc="Generating cases", unit="case")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_write_chunk, s, e, width, params, str(t_dir), str(a_dir))
+            for s, e in chunks
+        ]
+        for future in as_completed(futures):
+            stats = future.result()
+            lengths.extend(stats["lengths"])
+            annotated += stats["annotations"]
+            progress.update(len(stats["lengths"]))
+    progress.close()
+
+    lengths.sort()
+    total = sum(lengths)
+    manifest = {
+        "params": {"cases": n_cases, **params},
+        "cases": n_cases,
+        "lines": total,
+        "annotations": annotated,
+        "lines_per_case": {
+            "mean": total / n_cases if n_cases else 0.0,
+            "p50": _percentile(lengths, 0.5) if lengths else 0,
+            "p95": _percentile(lengths, 0.95) if lengths else 0,
+            "max": lengths[-1] if lengths else 0,
+        },
+        "cases_500_plus_lines": sum(n >= 500 for n in lengths),
+        "transcript_dir": str(t_dir),
+        "annotation_dir": str(a_dir),
+    }
+    manifest_path = t_dir.parent / "corpus_manifest.json"
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Generated {n_cases} cases, {total} lines, {annotated} annotations")
+    print(
+        f"  Lines/case: mean {manifest['lines_per_case']['mean']:.1f}, "
+        f"p50 {manifest['lines_per_case']['p50']}, p95 {manifest['lines_per_case']['p95']}, "
+        f"max {manifest['lines_per_case']['max']} ({manifest['cases_500_plus_lines']} with 500+)"
+    )
+    print(f"  Manifest: {manifest_path}")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a large synthetic clinical corpus")
+    parser.add_argument("--cases", type=int, default=10000)
+    parser.add_argument("--transcript-dir", default="data/synthetic/processed")
+    parser.add_argument("--annotation-dir", default="data/synthetic/annotations")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--lines", default="lognormal:3.4,0.45",
+        help="Visit length distribution: const:N | uniform:A,B | lognormal:MU,SIGMA",
+    )
+    parser.add_argument("--long-fraction", type=float, default=0.0,
+                        help="Fraction of visits drawn from --long-lines instead")
+    parser.add_argument("--long-lines", default="uniform:500,1500")
+    parser.add_argument("--min-lines", type=int, default=4)
+    parser.add_argument("--max-lines", type=int, default=5000)
+    parser.add_argument("--prefix", default="syn", help="Case id prefix (ids are <prefix>_<index>)")
+    parser.add_argument("--workers", type=int, default=None, help="Writer processes (default: all CPUs)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Cases per worker task")
+    parser.add_argument(
+        "--overwrite", action="store_true",
+        help="Replace a corpus previously generated with the same --prefix in the target dirs",
+    )
+    args = parser.parse_args()
+
+    try:
+        generate_corpus(
+            args.cases, args.transcript_dir, args.annotation_dir,
+            seed=args.seed, lines=args.lines,
+            long_fraction=args.long_fraction, long_lines=args.long_lines,
+            min_lines=args.min_lines, max_lines=args.max_lines,
+            prefix=args.prefix, workers=args.workers, chunk_size=args.chunk_size,
+            overwrite=args.overwrite,
+        )
+    except FileExistsError as e:
+        parser.error(str(e))
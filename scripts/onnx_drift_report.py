@@ -0,0 +1,122 @@
+"""
+Score drift and CPU speed of the ONNX evaluation backend vs PyTorch.
+
+Scores the committed predictions in results/*.json (files with "predictions"
+and "references") plus line-level (transcript line, annotation summary)
+pairs from the data with BERTScore and SemScore, once with the PyTorch
+encoders and once per ONNX variant (fp32, int8). Reports per-pair and
+mean-score deltas and encoder wall time, and writes
+results/onnx_drift_report.json.
+
+Usage:
+    python scripts/onnx_drift_report.py --threads 4
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.utils.data_loader import load_all_cases
+from src.evaluation.metrics import SummarizationMetrics
+from src.evaluation.onnx_backend import OnnxOptions
+
+METRICS = ("BERTScore", "SemScore")
+
+
+def collect_pairs(results_dir: str, transcript_dir: str, annotation_dir: str) -> dict[str, list]:
+    """source name → list of (prediction, reference)."""
+    sources = {}
+    for path in sorted(Path(results_dir).glob("*.json")):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict) and "predictions" in data and "references" in data:
+            sources[path.stem] = list(zip(data["predictions"], data["references"]))
+    cases = load_all_cases(transcript_dir, annotation_dir)
+    sources["annotated_lines"] = [
+        (case.lines[a.line_idx].text, a.summary)
+        for case in cases
+        for a in case.annotations
+        if a.line_idx < len(case.lines)
+    ]
+    return sources
+
+
+def score(metrics: SummarizationMetrics, pairs: list[tuple[str, str]]) -> tuple[dict, dict]:
+    """Scores and wall time per metric (after a small warm-up batch)."""
+    preds, refs = [p for p, _ in pairs], [r for _, r in pairs]
+    metrics.bertscore(preds[:2], refs[:2])
+    metrics.semscore_batch(preds[:2], refs[:2])
+    scores, seconds = {}, {}
+    for name, fn in (("BERTScore", metrics.bertscore), ("SemScore", metrics.semscore_batch)):
+        start = time.perf_counter()
+        scores[name] = np.array(fn(preds, refs))
+        seconds[name] = time.perf_counter() - start
+    return scores, seconds
+
+
+def drift(reference: np.ndarray, candidate: np.ndarray) -> dict:
+    delta = candidate - reference
+    return {
+        "mean_abs_delta": float(np.mean(np.abs(delta))),
+        "max_abs_delta": float(np.max(np.abs(delta))),
+        "mean_score_delta": float(np.mean(candidate) - np.mean(reference)),
+        "pearson": float(np.corrcoef(reference, candidate)[0, 1]) if len(reference) > 1 else 1.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--results-dir", default="results")
+    parser.add_argument("--transcript-dir", default="data/processed")
+    parser.add_argument("--annotation-dir", default="data/annotations")
+    parser.add_argument("--onnx-dir", default="models/onnx")
+    parser.add_argument("--threads", type=int, default=None, help="onnxruntime intra-op threads")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--output", default="results/onnx_drift_report.json")
+    args = parser.parse_args()
+
+    sources = collect_pairs(args.results_dir, args.transcript_dir, args.annotation_dir)
+    pairs = [pair for source in sources.values() for pair in source]
+    print(f"{len(pairs)} pairs from {', '.join(f'{k} ({len(v)})' for k, v in sources.items())}")
+
+    torch_scores, torch_seconds = score(SummarizationMetrics(batch_size=args.batch_size), pairs)
+    report = {
+        "pairs": {k: len(v) for k, v in sources.items()},
+        "threads": args.threads,
+        "torch_seconds": torch_seconds,
+        "variants": {},
+    }
+    for quantize in (False, True):
+        options = OnnxOptions(args.onnx_dir, quantize=quantize, threads=args.threads)
+        metrics = SummarizationMetrics(batch_size=args.batch_size, onnx=options)
+        scores, seconds = score(metrics, pairs)
+        report["variants"][options.precision] = {
+            "seconds": seconds,
+            "speedup": {m: torch_seconds[m] / max(seconds[m], 1e-9) for m in METRICS},
+            "drift": {m: drift(torch_scores[m], scores[m]) for m in METRICS},
+        }
+
+    print(f"\n| Variant | Metric | Speedup | Mean |Δ| | Max |Δ| | Δ mean score | Pearson |")
+    print("|---|---|---|---|---|---|---|")
+    for variant, data in report["variants"].items():
+        for m in METRICS:
+            d = data["drift"][m]
+            print(
+                f"| onnx-{variant} | {m} | {data['speedup'][m]:.2f}x | {d['mean_abs_delta']:.3f} "
+                f"| {d['max_abs_delta']:.3f} | {d['mean_score_delta']:+.3f} | {d['pearson']:.4f} |"
+            )
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 #!/bin/bash
 # ============================================================
 # Run all experiments for paper reproduction
-# Usage: bash scripts/run_all.sh
+# Usage: bash scripts/run_all.sh [extra run_all.py options]
 # ============================================================
 
 set -e
@@ -17,6 +17,11 @@ if [ -z "$OPENAI_API_KEY" ]; then
     exit 1
 fi
 
+# Persistent response cache: identical requests are served from disk on re-runs
+CACHE="${LLM_CACHE:-results/llm_cache.sqlite}"
+# Persistent embedding store: references are embedded once for all experiments
+EMBEDDINGS="${EMBEDDING_STORE:-results/embeddings}"
+
 # Generate sample data (skip if data already exists)
 if [ ! -f "data/processed/case_01.json" ]; then
     echo ""
@@ -24,43 +29,15 @@ if [ ! -f "data/processed/case_01.json" ]; then
     python scripts/generate_sample_data.py
 fi
 
-# Experiment 1: Baseline (Table 1)
-echo ""
-echo "[Step 1] Running Baseline experiment (Table 1)..."
-python src/experiments/baseline.py \
-    --transcript-dir data/processed \
-    --annotation-dir data/annotations \
-    --model gpt-3.5-turbo \
-    --output results/baseline_results.json
-
-# Experiment 2: Input Lines (Table 2)
-echo ""
-echo "[Step 2] Running Input Lines experiment (Table 2)..."
-python src/experiments/input_lines.py \
-    --transcript-dir data/processed \
-    --annotation-dir data/annotations \
-    --chunk-sizes 2 5 10 20 \
-    --model gpt-3.5-turbo \
-    --output results/input_lines_results.json
-
-# Experiment 3: Real-time Simulation (Table 3)
-echo ""
-echo "[Step 3] Running Real-time Simulation (Table 3)..."
-python src/experiments/realtime_sim.py \
-    --transcript-dir data/processed \
-    --annotation-dir data/annotations \
-    --context-sizes 0 1 20 50 100 max \
-    --model gpt-3.5-turbo \
-    --output results/realtime_sim_results.json
-
-# Experiment 4: Context Aggregation (Table 4)
+# Experiments 1-4 (Tables 1-4) from configs/config.yaml, in one process:
+# data, LLM client (connection pool + cache) and evaluation models are set up once
 echo ""
-echo "[Step 4] Running Context Aggregation (Table 4)..."
-python src/experiments/context_agg.py \
-    --transcript-dir data/processed \
-    --annotation-dir data/annotations \
-    --model gpt-3.5-turbo \
-    --output results/context_agg_results.json
+echo "[Step 1] Running all experiments from configs/config.yaml (Tables 1-4)..."
+python src/experiments/run_all.py \
+    --config configs/config.yaml \
+    --cache "$CACHE" \
+    --embedding-store "$EMBEDDINGS" \
+    "$@"
 
 echo ""
 echo "============================================"
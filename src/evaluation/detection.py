@@ -1,10 +1,21 @@
 """
 Detection metrics for agenda items and details.
 Implements Precision and Recall from Section 4.1 (Equations 1 & 2).
+
+compute_detection_metrics scores one case. sweep_detection scores a whole
+sweep at once: the ragged (config × case × line) predictions are laid out
+as one (config, total lines) bitmap, per-case counts come from a single
+np.add.reduceat over the case boundaries, and per-case, macro and micro
+precision/recall follow for every config without a Python loop over cases.
 """
 
+from itertools import chain
+from typing import Hashable, Iterable, Sequence
+
 import numpy as np
 
+NONE_OUTPUTS = ("none", "none.")  # LLM 응답이 이 값이면 "탐지 안 함"
+
 
 def compute_detection_metrics(
     y_true: list[int], y_pred: list[int]
@@ -59,9 +70,107 @@ def line_level_detection(
     annotated_lines = {a["line_idx"] for a in annotations}
 
     y_true = [1 if i in annotated_lines else 0 for i in range(num_lines)]
-    y_pred = [
-        0 if (out.strip().lower() == "none" or out.strip().lower() == "none.") else 1
-        for out in llm_outputs
-    ]
+    y_pred = detection_labels(llm_outputs).astype(int).tolist()
 
     return y_true, y_pred
+
+
+def is_none_output(text: str) -> bool:
+    """True if an LLM output means "nothing to record" ("None" / "None.")."""
+    return text.strip().lower() in NONE_OUTPUTS
+
+
+def detection_labels(llm_outputs: Sequence[str], memo: dict[str, bool] | None = None) -> np.ndarray:
+    """Boolean y_pred for a sequence of outputs; each distinct string is checked once."""
+    # 대부분의 줄이 "None."이므로 고유 문자열만 검사 (memo는 호출 간 공유 가능)
+    memo = {} if memo is None else memo
+    for text in set(llm_outputs).difference(memo):
+        memo[text] = not is_none_output(text)
+    return np.fromiter(map(memo.__getitem__, llm_outputs), dtype=bool, count=len(llm_outputs))
+
+
+def case_prediction(llm_outputs: list[str]) -> str:
+    """Detected line summaries joined into the case-level prediction ("None" if nothing)."""
+    detected = [s for s in llm_outputs if not is_none_output(s)]
+    return " ".join(detected) if detected else "None"
+
+
+def _ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    """num / den in percent, 0 where den == 0 (same convention as compute_detection_metrics)."""
+    return np.divide(num * 100.0, den, out=np.zeros(num.shape), where=den > 0)
+
+
+def sweep_detection(
+    predictions: dict[Hashable, list[Sequence[str]]],
+    annotated: list[Iterable[int] | np.ndarray],
+    num_lines: list[int],
+) -> dict[Hashable, dict]:
+    """Detection metrics for every config of a sweep in one vectorized pass.
+
+    Args:
+        predictions: config → per-case line outputs, cases in the same
+            order as annotated/num_lines
+        annotated: annotated line indices, or a boolean line bitmap
+            (CaseIndex.annotated), of each case
+        num_lines: number of lines of each case
+
+    Returns:
+        config → {"precision"/"recall": {"mean", "std"} over cases (macro),
+        "micro": {"precision", "recall"} over all lines, "per_case":
+        {"precision", "recall", "true_positives", "predicted_positives",
+        "actual_positives"} arrays}
+    """
+    keys = list(predictions)
+    lengths = np.asarray(num_lines, dtype=np.int64)
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    total = int(ends[-1]) if len(ends) else 0
+
+    # 모든 case의 줄을 하나로 이어 붙인 정답 bitmap
+    y_true = np.zeros(total, dtype=bool)
+    for start, n, lines in zip(starts, lengths, annotated):
+        if isinstance(lines, np.ndarray) and lines.dtype == bool:
+            y_true[start : start + n] = lines
+            continue
+        idx = np.fromiter((i for i in lines if 0 <= i < n), dtype=np.int64)
+        y_true[start + idx] = True
+
+    y_pred = np.zeros((len(keys), total), dtype=bool)
+    memo: dict[str, bool] = {}
+    for row, key in enumerate(keys):
+        cases = predictions[key]
+        if len(cases) != len(lengths):
+            raise ValueError(f"{key!r}: {len(cases)} cases, expected {len(lengths)}")
+        bad = [i for i, (case_pred, n) in enumerate(zip(cases, num_lines)) if len(case_pred) != n]
+        if bad:
+            raise ValueError(f"{key!r}: output count != line count for cases {bad[:5]}")
+        y_pred[row] = detection_labels(list(chain.from_iterable(cases)), memo)
+
+    # case 경계에서 reduceat → (config, case) 카운트 (줄이 없는 case는 0)
+    stacked = np.concatenate([y_pred & y_true, y_pred, y_true[None, :]])
+    counts = np.zeros((len(stacked), len(lengths)), dtype=np.int64)
+    nonempty = lengths > 0
+    if nonempty.any():
+        counts[:, nonempty] = np.add.reduceat(stacked, starts[nonempty], axis=1, dtype=np.int64)
+    tp, pp, ap = counts[: len(keys)], counts[len(keys) : -1], counts[-1]
+
+    precision = _ratio(tp, pp)
+    recall = _ratio(tp, np.broadcast_to(ap, tp.shape))
+    micro_p = _ratio(tp.sum(axis=1), pp.sum(axis=1))
+    micro_r = _ratio(tp.sum(axis=1), np.full(len(keys), ap.sum()))
+
+    return {
+        key: {
+            "precision": {"mean": float(precision[row].mean()), "std": float(precision[row].std())},
+            "recall": {"mean": float(recall[row].mean()), "std": float(recall[row].std())},
+            "micro": {"precision": float(micro_p[row]), "recall": float(micro_r[row])},
+            "per_case": {
+                "precision": precision[row],
+                "recall": recall[row],
+                "true_positives": tp[row],
+                "predicted_positives": pp[row],
+                "actual_positives": ap,
+            },
+        }
+        for row, key in enumerate(keys)
+    }
@@ -0,0 +1,196 @@
+"""
+On-disk store of text embeddings for the evaluation metrics.
+
+References are rebuilt identically by every experiment and config, and many
+predictions repeat across configs, yet BERTScore and SemScore used to
+re-embed them on every run. EmbeddingStore keeps one float32 array per
+(model, text) in a directory:
+
+    <root>/index.sqlite   key = sha256(model, text) → offset, shape, last access
+    <root>/heap.f32       all arrays back to back, read through np.memmap
+
+Sentence embeddings are stored as (dim,) vectors; BERTScore token
+embeddings as (tokens, dim + 1) matrices (last column = idf weight). When
+max_bytes is set, least recently used entries are evicted and the heap is
+compacted once more than half of it is dead space.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+def text_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """Memory-mapped (model, text) → float32 array store with LRU eviction."""
+
+    def __init__(self, root: str, max_bytes: int | None = None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.heap_path = self.root / "heap.f32"
+        self.heap_path.touch()
+        self.hits = 0
+        self.misses = 0
+        self._mm = None
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.root / "index.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                shape TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_accessed ON embeddings(accessed)"
+        )
+        self._conn.commit()
+
+        # 압축 도중 중단되어 인덱스와 heap이 어긋났으면 비우고 다시 시작 (캐시이므로 안전)
+        end = self._conn.execute("SELECT MAX(offset * 4 + size) FROM embeddings").fetchone()[0]
+        if end is not None and end > self.heap_path.stat().st_size:
+            print(f"Embedding store {self.root} is inconsistent; resetting it")
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self.heap_path.write_bytes(b"")
+
+    def _heap(self) -> np.ndarray:
+        """Read-only memmap of the heap, reopened when the file has grown."""
+        n = self.heap_path.stat().st_size // 4
+        if n == 0:
+            return np.zeros(0, dtype=np.float32)
+        if self._mm is None or len(self._mm) != n:
+            self._mm = np.memmap(self.heap_path, dtype=np.float32, mode="r")
+        return self._mm
+
+    def get_many(self, model: str, texts: list[str]) -> dict[str, np.ndarray]:
+        """Stored arrays for the texts that are present (copies, safe to modify)."""
+        keys = {text_key(model, t): t for t in dict.fromkeys(texts)}
+        key_list = list(keys)
+        found = {}
+        with self._lock:
+            rows = []
+            for chunk_start in range(0, len(key_list), 500):
+                chunk = key_list[chunk_start : chunk_start + 500]
+                rows += self._conn.execute(
+                    f"SELECT key, offset, shape FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+            heap = self._heap() if rows else None
+            for key, offset, shape in rows:
+                dims = tuple(int(d) for d in shape.split(","))
+                count = int(np.prod(dims))
+                found[keys[key]] = np.array(heap[offset : offset + count]).reshape(dims)
+            if rows:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET accessed = ? WHERE key = ?", [(now, r[0]) for r in rows]
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, model: str, text: str) -> np.ndarray | None:
+        return self.get_many(model, [text]).get(text)
+
+    def put_many(self, model: str, items: dict[str, np.ndarray]):
+        """Append arrays to the heap and index them."""
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        with self._lock:
+            offset = self.heap_path.stat().st_size // 4
+            with open(self.heap_path, "ab") as f:
+                for text, arr in items.items():
+                    arr = np.ascontiguousarray(arr, dtype=np.float32)
+                    f.write(arr.tobytes())
+                    rows.append((
+                        text_key(model, text), model, offset,
+                        ",".join(str(d) for d in arr.shape), arr.nbytes, now,
+                    ))
+                    offset += arr.size
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, offset, shape, size, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+        if self.max_bytes is not None:
+            self.evict()
+
+    def put(self, model: str, text: str, array: np.ndarray):
+        self.put_many(model, {text: array})
+
+    def evict(self) -> int:
+        """Drop least recently used entries beyond max_bytes; compact if mostly dead."""
+        removed = 0
+        with self._lock:
+            if self.max_bytes is not None:
+                total = 0
+                stale = []
+                for key, size in self._conn.execute(
+                    "SELECT key, size FROM embeddings ORDER BY accessed DESC"
+                ):
+                    total += size
+                    if total > self.max_bytes:
+                        stale.append((key,))
+                self._conn.executemany("DELETE FROM embeddings WHERE key = ?", stale)
+                self._conn.commit()
+                removed = len(stale)
+            live = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+            if self.heap_path.stat().st_size > 2 * live + (1 << 20):
+                self._compact()
+        return removed
+
+    def _compact(self):
+        """Rewrite the heap with live entries only (caller holds the lock)."""
+        heap = self._heap()
+        tmp = self.heap_path.with_suffix(".tmp")
+        updates = []
+        offset = 0
+        with open(tmp, "wb") as f:
+            for key, old, size in self._conn.execute(
+                "SELECT key, offset, size FROM embeddings ORDER BY offset"
+            ).fetchall():
+                count = size // 4
+                f.write(np.asarray(heap[old : old + count]).tobytes())
+                updates.append((offset, key))
+                offset += count
+        self._mm = None  # 기존 memmap을 닫은 뒤 파일 교체
+        del heap
+        tmp.replace(self.heap_path)
+        self._conn.executemany("UPDATE embeddings SET offset = ? WHERE key = ?", updates)
+        self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "bytes": size,
+            "heap_bytes": self.heap_path.stat().st_size,
+        }
+
+    def close(self):
+        with self._lock:
+            self._mm = None
+            self._conn.close()
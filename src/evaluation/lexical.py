@@ -0,0 +1,304 @@
+"""
+Fast ROUGE-L and BLEU for large numbers of (prediction, reference) pairs.
+
+SummarizationMetrics.rouge_l / .bleu score one pair at a time through
+rouge_score and nltk.sentence_bleu, re-tokenizing and re-stemming the
+reference on every call. This module produces the same numbers by:
+
+  - tokenizing/stemming each distinct text once (rouge_score's tokenizer
+    with a memoized Porter stemmer),
+  - building each reference's 1-4 gram count tables once,
+  - computing the LCS bit-parallel (Hyyrö 2004) on Python ints instead of
+    filling the O(n·m) DP table,
+  - spreading large batches over a process pool (pairs are grouped by
+    reference so each worker builds a reference's tables once). The pool
+    starts on the first large batch and is shut down by close(), on leaving
+    a `with LexicalScorer() as lexical:` block, or at interpreter exit.
+
+Parity with the reference implementation is checked by
+
+    python -m src.evaluation.lexical --check [--pairs 20000]
+"""
+
+import math
+import os
+import time
+import atexit
+import random
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from pathlib import Path
+
+BLEU_MAX_N = 4
+BLEU_EPSILON = 0.1  # SmoothingFunction().method1
+PARALLEL_MIN_PAIRS = 2000  # 이보다 적으면 프로세스 풀 시작 비용이 더 큼
+
+
+class _MemoStemmer:
+    """Porter stemmer with a per-word cache (rouge_score only calls .stem)."""
+
+    def __init__(self):
+        from nltk.stem import porter
+
+        self._stemmer = porter.PorterStemmer()
+        self._cache: dict[str, str] = {}
+
+    def stem(self, word: str) -> str:
+        stem = self._cache.get(word)
+        if stem is None:
+            stem = self._cache[word] = self._stemmer.stem(word)
+        return stem
+
+
+@lru_cache(maxsize=None)
+def _stemmer() -> _MemoStemmer:
+    return _MemoStemmer()
+
+
+@lru_cache(maxsize=1 << 16)
+def rouge_tokens(text: str) -> tuple[str, ...]:
+    """rouge_score's tokens (lowercased, alphanumeric, stemmed)."""
+    from rouge_score import tokenize as rouge_tokenize
+
+    return tuple(rouge_tokenize.tokenize(text, _stemmer()))
+
+
+@lru_cache(maxsize=1 << 16)
+def _lcs_masks(tokens: tuple[str, ...]) -> dict[str, int]:
+    """token → bitmask of its positions (bit i = tokens[i])."""
+    masks: dict[str, int] = {}
+    for i, tok in enumerate(tokens):
+        masks[tok] = masks.get(tok, 0) | (1 << i)
+    return masks
+
+
+def lcs_length(a: tuple[str, ...], b: tuple[str, ...]) -> int:
+    """Length of the longest common subsequence, bit-parallel over a."""
+    if not a or not b:
+        return 0
+    masks = _lcs_masks(a)
+    full = (1 << len(a)) - 1
+    v = full
+    for tok in b:
+        u = v & masks.get(tok, 0)
+        v = ((v + u) | (v - u)) & full
+    return len(a) - bin(v).count("1")
+
+
+def rouge_l(prediction: str, reference: str) -> float:
+    """ROUGE-L F-measure ×100, same as RougeScorer(["rougeL"], use_stemmer=True)."""
+    target = rouge_tokens(reference)
+    pred = rouge_tokens(prediction)
+    if not target or not pred:
+        return 0.0
+    lcs = lcs_length(target, pred)
+    precision = lcs / len(pred)
+    recall = lcs / len(target)
+    if precision + recall > 0:
+        return 2 * precision * recall / (precision + recall) * 100
+    return 0.0
+
+
+@lru_cache(maxsize=1 << 16)
+def bleu_counts(text: str) -> tuple[int, tuple[Counter, ...]]:
+    """(token count, 1..4-gram Counters) of the lowercased whitespace tokens."""
+    tokens = text.lower().split()
+    tables = tuple(
+        Counter(zip(*(tokens[k:] for k in range(n)))) for n in range(1, BLEU_MAX_N + 1)
+    )
+    return len(tokens), tables
+
+
+def bleu(prediction: str, reference: str) -> float:
+    """sentence_bleu ×100 with method1 smoothing, on lowercased whitespace tokens."""
+    hyp_len, hyp_tables = bleu_counts(prediction)
+    if hyp_len == 0:
+        return 0.0
+    ref_len, ref_tables = bleu_counts(reference)
+
+    # modified precision: 참조 n-gram 개수로 클리핑
+    precisions = []
+    for n, (hyp, ref) in enumerate(zip(hyp_tables, ref_tables), start=1):
+        numerator = sum(min(count, ref[ng]) for ng, count in hyp.items() if ng in ref)
+        denominator = max(1, hyp_len - n + 1)  # 가설의 n-gram 총 개수
+        precisions.append((numerator, denominator))
+    if precisions[0][0] == 0:
+        return 0.0
+
+    if hyp_len > ref_len:
+        bp = 1
+    else:
+        bp = math.exp(1 - ref_len / hyp_len)
+    logs = (
+        0.25 * math.log(num / den if num else (num + BLEU_EPSILON) / den)
+        for num, den in precisions
+    )
+    return bp * math.exp(math.fsum(logs)) * 100
+
+
+_SCORERS = {"Rouge-L": rouge_l, "BLEU": bleu}
+
+
+def _score_chunk(
+    pairs: list[tuple[str, str]], metrics: tuple[str, ...]
+) -> dict[str, list[float]]:
+    return {name: [_SCORERS[name](p, r) for p, r in pairs] for name in metrics}
+
+
+class LexicalScorer:
+    """ROUGE-L and BLEU for many pairs, optionally across a process pool."""
+
+    def __init__(self, workers: int | None = None, min_parallel: int = PARALLEL_MIN_PAIRS):
+        self.workers = workers if workers is not None else min(8, os.cpu_count() or 1)
+        self.min_parallel = min_parallel
+        self._pool = None
+
+    def score(
+        self,
+        predictions: list[str],
+        references: list[str],
+        metrics: tuple[str, ...] = ("Rouge-L", "BLEU"),
+    ) -> dict[str, list[float]]:
+        """metric name → scores for aligned pairs (identical pairs scored once)."""
+        unique = list(dict.fromkeys(zip(predictions, references)))
+        if self.workers > 1 and len(unique) >= self.min_parallel:
+            scored = self._score_parallel(unique, metrics)
+        else:
+            scored = _score_chunk(unique, metrics)
+        index = {pair: i for i, pair in enumerate(unique)}
+        order = [index[pair] for pair in zip(predictions, references)]
+        return {name: [scores[i] for i in order] for name, scores in scored.items()}
+
+    def _score_parallel(
+        self, pairs: list[tuple[str, str]], metrics: tuple[str, ...]
+    ) -> dict[str, list[float]]:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            atexit.register(self.close)  # close()를 부르지 않은 경우에도 worker 정리
+        # reference별로 모아서 나누면 각 worker가 참조 테이블을 한 번만 만듦
+        order = sorted(range(len(pairs)), key=lambda i: pairs[i][1])
+        size = math.ceil(len(order) / (self.workers * 4))
+        chunks = [order[i : i + size] for i in range(0, len(order), size)]
+        scored = {name: [0.0] * len(pairs) for name in metrics}
+        results = self._pool.map(
+            partial(_score_chunk, metrics=metrics), [[pairs[i] for i in c] for c in chunks]
+        )
+        for chunk, result in zip(chunks, results):
+            for name, scores in result.items():
+                for i, score in zip(chunk, scores):
+                    scored[name][i] = score
+        return scored
+
+    def close(self):
+        """Shut down the process pool (a later large batch starts a new one)."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            atexit.unregister(self.close)
+
+    def __enter__(self) -> "LexicalScorer":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _check_pairs(n: int, transcript_dir: str, annotation_dir: str, seed: int) -> list[tuple[str, str]]:
+    """Case-level and line-level pairs from the data plus n random recombinations."""
+    from src.utils.data_loader import load_all_cases
+
+    cases = load_all_cases(transcript_dir, annotation_dir)
+    summaries = [a.summary for c in cases for a in c.annotations]
+    lines = [l.text for c in cases for l in c.lines]
+    pairs = [(" ".join(a.summary for a in c.annotations[::2]) or "None",
+              " ".join(a.summary for a in c.annotations)) for c in cases]
+    pairs += [("None", s) for s in summaries[:5]] + [("", summaries[0]), ("?!", summaries[0])]
+
+    rng = random.Random(seed)
+    vocab = " ".join(summaries + lines).split() or ["none"]
+    for _ in range(n):
+        ref = rng.choice(summaries) if summaries else " ".join(rng.choices(vocab, k=8))
+        kind = rng.random()
+        if kind < 0.3:
+            pred = rng.choice(summaries + lines)
+        elif kind < 0.6:
+            words = ref.split()
+            pred = " ".join(w for w in words if rng.random() < 0.7) + " " + " ".join(
+                rng.choices(vocab, k=rng.randint(0, 4))
+            )
+        else:
+            pred = " ".join(rng.choices(vocab, k=rng.randint(1, 30)))
+        pairs.append((pred, ref))
+    return pairs
+
+
+def check_parity(
+    pairs: list[tuple[str, str]],
+    workers: int | None = None,
+    min_parallel: int = PARALLEL_MIN_PAIRS,
+) -> dict:
+    """Compare against rouge_score / nltk one pair at a time; return max diffs and timings."""
+    from rouge_score import rouge_scorer
+    from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
+
+    scorer = rouge_scorer.RougeScorer(["rougeL"], use_stemmer=True)
+    smooth = SmoothingFunction().method1
+    preds, refs = [p for p, _ in pairs], [r for _, r in pairs]
+
+    start = time.perf_counter()
+    expected_rouge = [scorer.score(r, p)["rougeL"].fmeasure * 100 for p, r in pairs]
+    expected_bleu = [
+        sentence_bleu([r.lower().split()], p.lower().split(), smoothing_function=smooth) * 100
+        if p.lower().split() else 0.0
+        for p, r in pairs
+    ]
+    reference_seconds = time.perf_counter() - start
+
+    with LexicalScorer(workers, min_parallel) as lexical:
+        start = time.perf_counter()
+        got = lexical.score(preds, refs)
+        fast_seconds = time.perf_counter() - start
+
+    return {
+        "pairs": len(pairs),
+        "rouge_max_diff": max(abs(a - b) for a, b in zip(expected_rouge, got["Rouge-L"])),
+        "bleu_max_diff": max(abs(a - b) for a, b in zip(expected_bleu, got["BLEU"])),
+        "rouge_mismatches": sum(a != b for a, b in zip(expected_rouge, got["Rouge-L"])),
+        "bleu_mismatches": sum(a != b for a, b in zip(expected_bleu, got["BLEU"])),
+        "reference_seconds": reference_seconds,
+        "fast_seconds": fast_seconds,
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--check", action="store_true", help="Parity check against rouge_score/nltk")
+    parser.add_argument("--pairs", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--transcript-dir", default="data/processed")
+    parser.add_argument("--annotation-dir", default="data/annotations")
+    args = parser.parse_args()
+
+    if not args.check:
+        parser.error("nothing to do (use --check)")
+    report = check_parity(
+        _check_pairs(args.pairs, args.transcript_dir, args.annotation_dir, args.seed), args.workers
+    )
+    print(
+        f"{report['pairs']} pairs: Rouge-L max diff {report['rouge_max_diff']:.3g} "
+        f"({report['rouge_mismatches']} mismatches), BLEU max diff {report['bleu_max_diff']:.3g} "
+        f"({report['bleu_mismatches']} mismatches)"
+    )
+    print(
+        f"rouge_score/nltk {report['reference_seconds']:.2f}s, "
+        f"lexical {report['fast_seconds']:.2f}s "
+        f"({report['reference_seconds'] / max(report['fast_seconds'], 1e-9):.1f}x)"
+    )
+    if report["rouge_mismatches"] or report["bleu_mismatches"]:
+        sys.exit(1)
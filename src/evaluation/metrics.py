@@ -1,13 +1,44 @@
 """
 Evaluation metrics for summarization quality.
 Implements: ROUGE-L, BLEU, BERTScore, SemScore (Section 4.1)
+
+Batch ROUGE-L/BLEU in compute_all go through src/evaluation/lexical.py,
+which reproduces rouge_l()/bleu() exactly with per-text tokenization, a
+bit-parallel LCS and an optional process pool.
+
+The BERTScore and SemScore models come from the process-wide registry
+(src/evaluation/registry.py), so they are loaded once per process no matter
+how many SummarizationMetrics instances are created.
+
+With an EmbeddingStore (src/evaluation/embedding_store.py) sentence
+embeddings and BERTScore token embeddings are read from disk when present,
+so texts that recur across configs and runs (e.g. references) are embedded
+once. Cached BERTScore runs the same greedy matching as bert_score.
+
+With OnnxOptions the encoders run through onnxruntime (optionally int8),
+see src/evaluation/onnx_backend.py.
+
+torch, bert_score, rouge_score and nltk are imported on first use, so
+importing this module (e.g. for add_eval_arguments or --help) stays cheap.
 """
 
+import time
+import argparse
+from collections import defaultdict
+from typing import TYPE_CHECKING, Hashable
+
 import numpy as np
-from rouge_score import rouge_scorer
-from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
-from bert_score import score as bert_score_fn
-from sentence_transformers import SentenceTransformer, util
+
+from src.evaluation import registry
+from src.evaluation.embedding_store import EmbeddingStore
+from src.evaluation.lexical import LexicalScorer
+
+if TYPE_CHECKING:
+    import torch
+    from src.evaluation.onnx_backend import OnnxOptions
+
+# config.yaml `evaluation.metrics` 이름 → 결과 키
+METRICS = {"rouge_l": "Rouge-L", "bleu": "BLEU", "bertscore": "BERTScore", "semscore": "SemScore"}
 
 
 class SummarizationMetrics:
@@ -17,11 +48,51 @@ class SummarizationMetrics:
         self,
         bertscore_model: str = "roberta-large",
         semscore_model: str = "all-MiniLM-L6-v2",
+        batch_size: int = 64,
+        embedding_store: EmbeddingStore | None = None,
+        lexical_workers: int | None = None,
+        onnx: "OnnxOptions | None" = None,
+        metrics: list[str] | None = None,
     ):
+        """metrics: config names (see METRICS) to compute; None = all four.
+        The BERTScore / SemScore models are only loaded when selected."""
+        from rouge_score import rouge_scorer
+        from nltk.translate.bleu_score import SmoothingFunction
+
+        unknown = set(metrics or []) - set(METRICS)
+        if unknown:
+            raise ValueError(f"Unknown metrics {sorted(unknown)}; choose from {list(METRICS)}")
+        self.metric_names = [METRICS[m] for m in METRICS if metrics is None or m in metrics]
         self.rouge = rouge_scorer.RougeScorer(["rougeL"], use_stemmer=True)
         self.smooth = SmoothingFunction().method1
-        self.semscore_model = SentenceTransformer(semscore_model)
-        self._bertscore_model = bertscore_model
+        self.lexical = LexicalScorer(lexical_workers)  # rouge_l / bleu와 동일한 값, 배치용
+        self.semscore_model = None
+        self.bertscorer = None
+        self.batch_size = batch_size  # encoder / greedy-matching batch size
+        self.store = embedding_store
+        self.onnx = onnx
+        self._sentence_key = f"sentence:{semscore_model}:normalized"
+        self._sentence_onnx = None
+        self._bert_model = None
+        if "SemScore" in self.metric_names:
+            self.semscore_model = registry.sentence_encoder(semscore_model)
+        if "BERTScore" in self.metric_names:
+            self.bertscorer = registry.bert_scorer(bertscore_model)
+            self._token_key = f"bertscore:{bertscore_model}:L{self.bertscorer.num_layers}"
+            self._bert_model = self.bertscorer._model
+        if onnx is not None:
+            from src.evaluation.onnx_backend import onnx_bert_model, onnx_sentence_encoder
+
+            # ONNX 임베딩은 PyTorch와 값이 조금 달라서 store 키를 분리
+            if self.bertscorer is not None:
+                self._bert_model = onnx_bert_model(bertscore_model, onnx)
+                self._token_key += f":onnx-{onnx.precision}"
+            if self.semscore_model is not None:
+                self._sentence_onnx = onnx_sentence_encoder(semscore_model, onnx)
+            self._sentence_key += f":onnx-{onnx.precision}"
+        self.scoring_seconds: dict[str, float] = {}  # metric → cumulative scoring time
+        self.pairs_requested = 0  # (prediction, reference) pairs passed to compute_sweep
+        self.pairs_scored = 0  # distinct pairs actually scored
 
     def rouge_l(self, prediction: str, reference: str) -> float:
         """ROUGE-L: Longest common subsequence F-score."""
@@ -30,6 +101,8 @@ class SummarizationMetrics:
 
     def bleu(self, prediction: str, reference: str) -> float:
         """BLEU: Modified n-gram precision with brevity penalty."""
+        from nltk.translate.bleu_score import sentence_bleu
+
         ref_tokens = reference.lower().split()
         pred_tokens = prediction.lower().split()
         if len(pred_tokens) == 0:
@@ -41,42 +114,262 @@ class SummarizationMetrics:
 
     def bertscore(self, predictions: list[str], references: list[str]) -> list[float]:
         """BERTScore: Contextual embedding similarity (batch)."""
-        P, R, F1 = bert_score_fn(
-            predictions,
-            references,
-            model_type=self._bertscore_model,
-            verbose=False,
-        )
+        if self.store is not None or self.onnx is not None:
+            return self._bertscore_cached(predictions, references)
+        P, R, F1 = self.bertscorer.score(predictions, references, verbose=False)
         return (F1.numpy() * 100).tolist()
 
+    def _token_embeddings(self, texts: list[str]) -> dict[str, np.ndarray]:
+        """text → (tokens, dim + 1) array of token embeddings + idf, via the store if set."""
+        from bert_score.utils import get_bert_embedding
+
+        found = self.store.get_many(self._token_key, texts) if self.store is not None else {}
+        # bert_score와 동일하게 긴 문장부터 배치 구성
+        missing = sorted(
+            (t for t in dict.fromkeys(texts) if t not in found),
+            key=lambda x: len(x.split(" ")),
+            reverse=True,
+        )
+        scorer = self.bertscorer
+        tokenizer = scorer._tokenizer
+        idf_dict = defaultdict(lambda: 1.0)  # idf=False: 특수 토큰만 가중치 0
+        idf_dict[tokenizer.sep_token_id] = 0
+        idf_dict[tokenizer.cls_token_id] = 0
+
+        new = {}
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start : start + self.batch_size]
+            embs, masks, padded_idf = get_bert_embedding(
+                batch, self._bert_model, tokenizer, idf_dict, device=scorer.device
+            )
+            embs, masks, padded_idf = embs.cpu(), masks.cpu(), padded_idf.cpu()
+            for i, text in enumerate(batch):
+                n = int(masks[i].sum().item())
+                new[text] = np.concatenate(
+                    [embs[i, :n].numpy(), padded_idf[i, :n].numpy()[:, None]], axis=1
+                )
+        if self.store is not None:
+            self.store.put_many(self._token_key, new)
+        found.update(new)
+        return found
+
+    def _bertscore_cached(self, predictions: list[str], references: list[str]) -> list[float]:
+        """bert_score's greedy cosine matching over stored (or ONNX) token embeddings."""
+        import torch
+        from bert_score.utils import greedy_cos_idf
+
+        stats = self._token_embeddings([*predictions, *references])
+        scores = []
+        with torch.no_grad():
+            for start in range(0, len(references), self.batch_size):
+                end = start + self.batch_size
+                ref_stats = _pad_token_stats([stats[t] for t in references[start:end]])
+                hyp_stats = _pad_token_stats([stats[t] for t in predictions[start:end]])
+                P, R, F1 = greedy_cos_idf(*ref_stats, *hyp_stats)
+                scores.extend((F1 * 100).tolist())
+        return scores
+
     def semscore(self, prediction: str, reference: str) -> float:
         """SemScore: Sentence-level semantic similarity."""
-        emb_pred = self.semscore_model.encode(prediction, convert_to_tensor=True)
-        emb_ref = self.semscore_model.encode(reference, convert_to_tensor=True)
-        similarity = util.cos_sim(emb_pred, emb_ref).item()
-        return similarity * 100
+        return self.semscore_batch([prediction], [reference])[0]
+
+    def semscore_batch(
+        self, predictions: list[str], references: list[str], batch_size: int | None = None
+    ) -> list[float]:
+        """SemScore for aligned pairs: batched encoding + one vectorized cosine."""
+        if not predictions:
+            return []
+        # 중복 텍스트(같은 reference, "None" 예측 등)는 한 번만 인코딩
+        texts = list(dict.fromkeys([*predictions, *references]))
+        emb = self._sentence_embeddings(texts, batch_size or self.batch_size)
+        index = {t: i for i, t in enumerate(texts)}
+        pred = emb[[index[p] for p in predictions]]
+        ref = emb[[index[r] for r in references]]
+        return (np.einsum("ij,ij->i", pred, ref) * 100).tolist()
+
+    def _sentence_embeddings(self, texts: list[str], batch_size: int) -> np.ndarray:
+        """Normalized sentence embeddings for distinct texts, via the store if set."""
+        found = self.store.get_many(self._sentence_key, texts) if self.store is not None else {}
+        missing = [t for t in texts if t not in found]
+        if missing:
+            if self._sentence_onnx is not None:
+                emb = self._sentence_onnx.encode(missing, batch_size)
+            else:
+                emb = self.semscore_model.encode(
+                    missing,
+                    batch_size=batch_size,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                    show_progress_bar=False,
+                )
+            new = dict(zip(missing, emb))
+            if self.store is not None:
+                self.store.put_many(self._sentence_key, new)
+            found.update(new)
+        return np.stack([found[t] for t in texts])
 
     def compute_all(
         self, predictions: list[str], references: list[str]
     ) -> dict[str, dict[str, float]]:
         """Compute all metrics and return mean ± std (like paper tables)."""
-        n = len(predictions)
-        rouge_scores = [self.rouge_l(p, r) for p, r in zip(predictions, references)]
-        bleu_scores = [self.bleu(p, r) for p, r in zip(predictions, references)]
-        bert_scores = self.bertscore(predictions, references)
-        sem_scores = [self.semscore(p, r) for p, r in zip(predictions, references)]
+        scorers = [
+            ("Rouge-L", lambda: self.lexical.score(predictions, references, ("Rouge-L",))["Rouge-L"]),
+            ("BLEU", lambda: self.lexical.score(predictions, references, ("BLEU",))["BLEU"]),
+            ("BERTScore", lambda: self.bertscore(predictions, references)),
+            ("SemScore", lambda: self.semscore_batch(predictions, references)),
+        ]
 
         results = {}
-        for name, scores in [
-            ("Rouge-L", rouge_scores),
-            ("BLEU", bleu_scores),
-            ("BERTScore", bert_scores),
-            ("SemScore", sem_scores),
-        ]:
-            arr = np.array(scores)
-            results[name] = {
-                "mean": float(np.mean(arr)),
-                "std": float(np.std(arr)),
-                "scores": scores,
-            }
+        for name, scorer in scorers:
+            if name not in self.metric_names:
+                continue
+            start = time.perf_counter()
+            scores = scorer()
+            self.scoring_seconds[name] = (
+                self.scoring_seconds.get(name, 0.0) + time.perf_counter() - start
+            )
+            results[name] = summarize_scores(scores)
         return results
+
+    def compute_sweep(
+        self, sweep: dict[Hashable, tuple[list[str], list[str]]]
+    ) -> dict[Hashable, dict[str, dict[str, float]]]:
+        """compute_all for every config of a sweep in one batched pass.
+
+        sweep maps a config key to its (predictions, references). Identical
+        pairs across configs (same reference, same output) are scored once,
+        then the scores are scattered back, so scoring time scales with the
+        number of distinct pairs rather than configs.
+        """
+        unique: dict[tuple[str, str], int] = {}
+        positions = {}
+        for key, (predictions, references) in sweep.items():
+            positions[key] = [
+                unique.setdefault(pair, len(unique)) for pair in zip(predictions, references)
+            ]
+        self.pairs_requested += sum(len(p) for p in positions.values())
+        self.pairs_scored += len(unique)
+        if not unique:
+            return {key: {} for key in sweep}
+
+        preds, refs = (list(x) for x in zip(*unique))
+        scored = self.compute_all(preds, refs)
+
+        return {
+            key: {
+                name: summarize_scores([data["scores"][i] for i in idx])
+                for name, data in scored.items()
+            }
+            for key, idx in positions.items()
+        }
+
+
+def summarize_scores(scores: list[float]) -> dict:
+    """mean ± std over per-case scores (like paper tables), keeping the scores."""
+    arr = np.array(scores)
+    return {"mean": float(np.mean(arr)), "std": float(np.std(arr)), "scores": scores}
+
+
+def _pad_token_stats(
+    arrays: list[np.ndarray],
+) -> tuple["torch.Tensor", "torch.Tensor", "torch.Tensor"]:
+    """Pad stored (tokens, dim + 1) arrays like bert_score's pad_batch_stats."""
+    import torch
+    from torch.nn.utils.rnn import pad_sequence
+
+    emb = [torch.from_numpy(a[:, :-1]) for a in arrays]
+    idf = [torch.from_numpy(np.ascontiguousarray(a[:, -1])) for a in arrays]
+    lens = torch.tensor([e.size(0) for e in emb], dtype=torch.long)
+    emb_pad = pad_sequence(emb, batch_first=True, padding_value=2.0)
+    idf_pad = pad_sequence(idf, batch_first=True)
+    mask = torch.arange(int(lens.max())).expand(len(lens), -1) < lens.unsqueeze(1)
+    return emb_pad, mask, idf_pad
+
+
+def add_eval_arguments(parser: argparse.ArgumentParser):
+    """Register the evaluation options shared by all experiment scripts."""
+    parser.add_argument(
+        "--generate-only", action="store_true",
+        help="Only run the LLM calls (response cache + ledger); skip scoring and "
+        "never import the evaluation stack",
+    )
+    parser.add_argument(
+        "--embedding-store", default=None,
+        help="Directory of cached BERTScore/SemScore embeddings (reused across runs)",
+    )
+    parser.add_argument("--embedding-store-max-bytes", type=int, default=None)
+    parser.add_argument("--eval-batch-size", type=int, default=64)
+    parser.add_argument(
+        "--eval-backend", choices=["torch", "onnx"], default="torch",
+        help="onnx (experimental): run the BERTScore/SemScore encoders with onnxruntime (CPU); "
+        "score drift against torch is not measured yet",
+    )
+    parser.add_argument("--onnx-dir", default="models/onnx", help="Exported ONNX encoders")
+    parser.add_argument(
+        "--onnx-fp32", action="store_true", help="Skip int8 quantization of the ONNX encoders"
+    )
+    parser.add_argument("--onnx-threads", type=int, default=None, help="onnxruntime intra-op threads")
+    parser.add_argument(
+        "--lexical-workers", type=int, default=None,
+        help="Processes for ROUGE-L/BLEU on large batches (default: up to 8 CPUs)",
+    )
+    parser.add_argument(
+        "--metrics", nargs="+", choices=list(METRICS), default=None,
+        help="Summary metrics to compute (default: all four)",
+    )
+    parser.add_argument("--bertscore-model", default=None, help="Default: roberta-large")
+    parser.add_argument("--semscore-model", default=None, help="Default: all-MiniLM-L6-v2")
+
+
+def metrics_from_args(args: argparse.Namespace) -> SummarizationMetrics | None:
+    """Build SummarizationMetrics from add_eval_arguments options.
+
+    Returns None with --generate-only, so no evaluation model is loaded.
+    """
+    if args.generate_only:
+        return None
+    store = None
+    if args.embedding_store:
+        store = EmbeddingStore(args.embedding_store, max_bytes=args.embedding_store_max_bytes)
+    onnx = None
+    if args.eval_backend == "onnx":
+        from src.evaluation.onnx_backend import OnnxOptions
+
+        # 실험적 기능: int8 drift가 측정되기 전까지 torch 결과와 직접 비교하지 않음
+        print(
+            "Note: --eval-backend onnx is experimental; its drift against torch scores is not "
+            "measured yet (scripts/onnx_drift_report.py)"
+        )
+        onnx = OnnxOptions(args.onnx_dir, quantize=not args.onnx_fp32, threads=args.onnx_threads)
+    models = {}  # 지정하지 않으면 SummarizationMetrics 기본 모델
+    if args.bertscore_model:
+        models["bertscore_model"] = args.bertscore_model
+    if args.semscore_model:
+        models["semscore_model"] = args.semscore_model
+    return SummarizationMetrics(
+        batch_size=args.eval_batch_size,
+        embedding_store=store,
+        lexical_workers=args.lexical_workers,
+        onnx=onnx,
+        metrics=args.metrics,
+        **models,
+    )
+
+
+def print_eval_timing(metrics: SummarizationMetrics):
+    """Print model load time (process-wide) and this instance's scoring time."""
+    loads = registry.load_times()
+    load = ", ".join(f"{k} {v:.1f}s" for k, v in loads.items()) or "none"
+    scoring = ", ".join(f"{k} {v:.1f}s" for k, v in metrics.scoring_seconds.items())
+    print(f"\nEvaluation time: model load [{load}]; scoring [{scoring}]")
+    if metrics.pairs_requested:
+        print(
+            f"Sweep evaluation: {metrics.pairs_scored} distinct pairs scored "
+            f"for {metrics.pairs_requested} config pairs"
+        )
+    if metrics.store is not None:
+        st = metrics.store.stats()
+        print(
+            f"Embedding store: {st['hits']} hits / {st['misses']} misses, "
+            f"{st['entries']} entries, {st['bytes']} bytes"
+        )
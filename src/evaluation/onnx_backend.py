@@ -0,0 +1,222 @@
+"""
+Optional, experimental ONNX Runtime backend for the BERTScore and SemScore encoders.
+
+There is no GPU in production, and the roberta-large forward pass dominates
+compute_all on CPU. This backend exports each encoder (the layer-truncated
+BERTScore model, the SemScore transformer) to ONNX once, optionally applies
+dynamic int8 weight quantization, and runs it through an onnxruntime
+session with an explicit thread count:
+
+    models/onnx/<kind>-<model>-fp32.onnx
+    models/onnx/<kind>-<model>-int8.onnx
+
+Tokenization, idf weighting, greedy matching (bert_score.utils) and pooling
+stay in Python, so only the encoder forward pass changes. Quantization
+changes scores slightly; scripts/onnx_drift_report.py measures the drift
+against the PyTorch path. No drift report has been committed yet, so the
+backend stays opt-in (--eval-backend onnx) and torch remains the default.
+
+Requires `pip install onnxruntime onnx` (not in requirements.txt).
+"""
+
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from src.evaluation import registry
+
+try:
+    import onnxruntime as ort
+except ImportError:  # optional dependency
+    ort = None
+
+
+@dataclass
+class OnnxOptions:
+    """Where exported encoders live and how they are run."""
+
+    dir: str = "models/onnx"
+    quantize: bool = True  # dynamic int8 weights
+    threads: int | None = None  # onnxruntime intra-op threads (None = runtime default)
+
+    @property
+    def precision(self) -> str:
+        return "int8" if self.quantize else "fp32"
+
+
+class _LastHiddenState(torch.nn.Module):
+    """Export wrapper: (input_ids, attention_mask) → last hidden state."""
+
+    def __init__(self, model: torch.nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask)[0]
+
+
+def export_encoder(model: torch.nn.Module, tokenizer, path: Path, opset: int = 17) -> Path:
+    """Export a Hugging Face encoder with dynamic batch and sequence axes."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    sample = tokenizer(["The patient reports a persistent cough."], return_tensors="pt")
+    wrapper = _LastHiddenState(model).eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper,
+            (sample["input_ids"], sample["attention_mask"]),
+            str(path),
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=opset,
+            dynamo=False,
+        )
+    return path
+
+
+def quantize_int8(src: Path, dst: Path) -> Path:
+    """Dynamic int8 quantization of the weights (activations stay float)."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    prepared = src.with_suffix(".prep.onnx")
+    try:
+        # ONNX shape inference + graph folding (symbolic pass writes temp files to cwd)
+        quant_pre_process(str(src), str(prepared), skip_symbolic_shape=True)
+    except Exception as e:  # 전처리 실패 시 원본 모델을 그대로 양자화
+        print(f"Quantization pre-processing failed ({e}); quantizing the exported model")
+        prepared = src
+    quantize_dynamic(str(prepared), str(dst), weight_type=QuantType.QInt8)
+    if prepared != src:
+        prepared.unlink()
+    return dst
+
+
+def encoder_path(options: OnnxOptions, kind: str, name: str, precision: str) -> Path:
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+    return Path(options.dir) / f"{kind}-{safe}-{precision}.onnx"
+
+
+class OnnxEncoder:
+    """onnxruntime session for an exported encoder."""
+
+    def __init__(self, path: Path, threads: int | None = None):
+        if ort is None:
+            raise ImportError("The ONNX backend requires onnxruntime: pip install onnxruntime onnx")
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            opts.intra_op_num_threads = threads
+            opts.inter_op_num_threads = 1
+        self.path = path
+        self.session = ort.InferenceSession(str(path), opts, providers=["CPUExecutionProvider"])
+
+    def run(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        return self.session.run(
+            ["last_hidden_state"],
+            {
+                "input_ids": input_ids.astype(np.int64),
+                "attention_mask": attention_mask.astype(np.int64),
+            },
+        )[0]
+
+
+def _load_encoder(model, tokenizer, options: OnnxOptions, kind: str, name: str) -> OnnxEncoder:
+    fp32 = encoder_path(options, kind, name, "fp32")
+    if not fp32.exists():
+        print(f"Exporting {kind} {name} to {fp32}")
+        export_encoder(model, tokenizer, fp32)
+    path = fp32
+    if options.quantize:
+        path = encoder_path(options, kind, name, "int8")
+        if not path.exists():
+            print(f"Quantizing {fp32} → {path}")
+            quantize_int8(fp32, path)
+    return OnnxEncoder(path, options.threads)
+
+
+class OnnxBertModel:
+    """Stands in for bert_score's layer-truncated model in get_bert_embedding."""
+
+    def __init__(self, encoder: OnnxEncoder):
+        self.encoder = encoder
+
+    def eval(self):
+        return self
+
+    def __call__(self, input_ids, attention_mask=None, output_hidden_states=False):
+        if output_hidden_states:
+            raise ValueError("The ONNX BERTScore encoder only exports the last used layer")
+        out = self.encoder.run(input_ids.cpu().numpy(), attention_mask.cpu().numpy())
+        return (torch.from_numpy(out),)
+
+
+class OnnxSentenceEncoder:
+    """SemScore encoder: ONNX transformer + the SentenceTransformer's pooling."""
+
+    def __init__(self, st_model, encoder: OnnxEncoder):
+        transformer, pooling = st_model[0], st_model[1]
+        self.tokenizer = transformer.tokenizer
+        self.max_seq_length = transformer.max_seq_length
+        if hasattr(pooling, "get_pooling_mode_str"):  # sentence-transformers < 5
+            mode = pooling.get_pooling_mode_str()
+        else:
+            mode = pooling.pooling_mode
+        if mode not in ("mean", "cls"):
+            raise ValueError(f"Unsupported SemScore pooling for the ONNX backend: {mode}")
+        self.cls_pooling = mode == "cls"
+        self.encoder = encoder
+
+    def encode(self, texts: list[str], batch_size: int = 64) -> np.ndarray:
+        """L2-normalized sentence embeddings (same pooling as the PyTorch model)."""
+        out = []
+        for start in range(0, len(texts), batch_size):
+            batch = self.tokenizer(
+                texts[start : start + batch_size],
+                padding=True,
+                truncation="longest_first",
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            hidden = self.encoder.run(batch["input_ids"], batch["attention_mask"])
+            if self.cls_pooling:
+                emb = hidden[:, 0]
+            else:  # mean pooling over real tokens
+                mask = batch["attention_mask"][..., None].astype(hidden.dtype)
+                emb = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            norms = np.linalg.norm(emb, axis=1, keepdims=True)
+            out.append(emb / np.clip(norms, 1e-12, None))
+        return np.concatenate(out).astype(np.float32)
+
+
+def onnx_bert_model(model_type: str, options: OnnxOptions) -> OnnxBertModel:
+    """Shared ONNX BERTScore encoder (exported from the registry's BERTScorer)."""
+    scorer = registry.bert_scorer(model_type)
+    name = f"{model_type}-L{scorer.num_layers}"
+    return registry.get_model(
+        "onnx_bert_scorer",
+        f"{name}:{options.precision}:{options.threads}",
+        lambda: OnnxBertModel(
+            _load_encoder(scorer._model, scorer._tokenizer, options, "bertscore", name)
+        ),
+    )
+
+
+def onnx_sentence_encoder(name: str, options: OnnxOptions) -> OnnxSentenceEncoder:
+    """Shared ONNX SemScore encoder (exported from the registry's SentenceTransformer)."""
+    st_model = registry.sentence_encoder(name)
+    return registry.get_model(
+        "onnx_sentence_encoder",
+        f"{name}:{options.precision}:{options.threads}",
+        lambda: OnnxSentenceEncoder(
+            st_model,
+            _load_encoder(st_model[0].auto_model, st_model[0].tokenizer, options, "semscore", name),
+        ),
+    )
@@ -0,0 +1,144 @@
+"""
+Evaluation overlapped with generation.
+
+LLM generation is I/O bound, while building SummarizationMetrics (loading
+roberta-large and the SemScore encoder) and scoring are CPU bound. Running
+them one after the other makes wall time generation + evaluation.
+StreamingEvaluator instead:
+
+  1. builds the metrics in a background thread as soon as it is created
+     (warm-up while the first LLM calls are in flight),
+  2. scores each case's (prediction, reference) pair as soon as its chain
+     finishes (run_chains(on_result=...)), in small batches, and
+  3. at the end, aggregates the per-pair scores per config exactly like
+     SummarizationMetrics.compute_sweep (identical pairs scored once).
+
+With that, wall time approaches max(generation, evaluation).
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Hashable
+
+from src.evaluation.metrics import SummarizationMetrics, summarize_scores
+
+_DONE = object()
+
+
+class StreamingEvaluator:
+    """Background scorer fed with pairs while generation is still running."""
+
+    def __init__(
+        self,
+        metrics: SummarizationMetrics | Callable[[], SummarizationMetrics],
+        batch_size: int = 64,
+    ):
+        """metrics: a ready instance, or a zero-arg factory run in the background."""
+        self.batch_size = batch_size
+        self._factory = metrics if callable(metrics) else None
+        self.metrics: SummarizationMetrics | None = None if callable(metrics) else metrics
+        self.warmup_seconds = 0.0  # metrics construction, in the background
+        self.tail_seconds = 0.0  # time spent waiting for scoring after generation
+        self._queue: queue.Queue = queue.Queue()
+        self._submitted: set[tuple[str, str]] = set()
+        self._scores: dict[tuple[str, str], dict[str, float]] = {}
+        self._counted = 0  # len(_scores) already added to metrics.pairs_scored
+        self._error: BaseException | None = None
+        self._finished = False
+        self._thread = threading.Thread(
+            target=self._worker, name="streaming-evaluator", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, prediction: str, reference: str):
+        """Queue a pair for scoring (no-op if it was already submitted)."""
+        pair = (prediction, reference)
+        if pair in self._submitted:
+            return
+        self._submitted.add(pair)
+        if not self._finished:  # finish() 이후에는 sweep_results()가 직접 채점
+            self._queue.put(pair)
+
+    def _worker(self):
+        try:
+            if self.metrics is None:
+                start = time.perf_counter()
+                self.metrics = self._factory()
+                self.warmup_seconds = time.perf_counter() - start
+            done = False
+            while not done:
+                batch = [self._queue.get()]
+                # 밀린 pair를 한 번에 모아 배치로 채점
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if _DONE in batch:
+                    done = True
+                    batch = [p for p in batch if p is not _DONE]
+                    while not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                for start in range(0, len(batch), self.batch_size):
+                    self._score(batch[start : start + self.batch_size])
+        except BaseException as e:  # finish()에서 다시 발생시킴
+            self._error = e
+
+    def _score(self, pairs: list[tuple[str, str]]):
+        if not pairs:
+            return
+        scored = self.metrics.compute_all([p for p, _ in pairs], [r for _, r in pairs])
+        for i, pair in enumerate(pairs):
+            self._scores[pair] = {name: data["scores"][i] for name, data in scored.items()}
+
+    def finish(self) -> SummarizationMetrics:
+        """Wait until every submitted pair is scored; return the metrics instance."""
+        if not self._finished:
+            start = time.perf_counter()
+            self._queue.put(_DONE)
+            self._thread.join()
+            self.tail_seconds = time.perf_counter() - start
+            self._finished = True
+        if self._error is not None:
+            raise self._error
+        return self.metrics
+
+    def sweep_results(
+        self, sweep: dict[Hashable, tuple[list[str], list[str]]]
+    ) -> dict[Hashable, dict[str, dict[str, float]]]:
+        """Per-config results in compute_sweep's format (scores anything not yet submitted).
+
+        Can be called once per sweep when several experiments share the
+        evaluator; pairs first seen after the first call are scored here.
+        """
+        for predictions, references in sweep.values():
+            for pair in zip(predictions, references):
+                self.submit(*pair)
+        metrics = self.finish()
+        pairs = {key: list(zip(*value)) for key, value in sweep.items()}
+        late = list(dict.fromkeys(
+            pair for key_pairs in pairs.values() for pair in key_pairs if pair not in self._scores
+        ))
+        for start in range(0, len(late), self.batch_size):
+            self._score(late[start : start + self.batch_size])
+        metrics.pairs_requested += sum(len(p) for p in pairs.values())
+        # 여러 sweep이 evaluator를 공유하면 이전 sweep에서 채점한 pair는 다시 세지 않음
+        metrics.pairs_scored += len(self._scores) - self._counted
+        self._counted = len(self._scores)
+        results = {}
+        for key, key_pairs in pairs.items():
+            names = self._scores[key_pairs[0]].keys() if key_pairs else []
+            results[key] = {
+                name: summarize_scores([self._scores[pair][name] for pair in key_pairs])
+                for name in names
+            }
+        return results
+
+
+def print_overlap(evaluator: StreamingEvaluator):
+    """How much evaluation work was left once generation had finished."""
+    print(
+        f"Streaming evaluation: metrics warm-up {evaluator.warmup_seconds:.1f}s in the "
+        f"background, {evaluator.tail_seconds:.1f}s of scoring left after generation"
+    )
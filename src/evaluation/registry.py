@@ -0,0 +1,55 @@
+"""
+Process-wide registry of evaluation models.
+
+Loading roberta-large (BERTScore) and the SemScore sentence encoder takes
+far longer than scoring a sweep's predictions on CPU. The registry loads
+each (kind, name) model once per process, hands the same instance to every
+SummarizationMetrics, and records how long each load took so evaluation
+reports can separate load time from scoring time.
+"""
+
+import threading
+import time
+from typing import Callable
+
+_models: dict[tuple[str, str], object] = {}
+_load_seconds: dict[tuple[str, str], float] = {}
+_lock = threading.Lock()
+
+
+def get_model(kind: str, name: str, loader: Callable[[], object]):
+    """Return the cached model for (kind, name), calling loader() on first use."""
+    key = (kind, name)
+    with _lock:
+        if key not in _models:
+            start = time.perf_counter()
+            _models[key] = loader()
+            _load_seconds[key] = time.perf_counter() - start
+        return _models[key]
+
+
+def sentence_encoder(name: str = "all-MiniLM-L6-v2"):
+    """Shared SentenceTransformer (SemScore)."""
+    from sentence_transformers import SentenceTransformer
+
+    return get_model("sentence_encoder", name, lambda: SentenceTransformer(name))
+
+
+def bert_scorer(model_type: str = "roberta-large"):
+    """Shared BERTScorer; same defaults as bert_score.score(model_type=...)."""
+    from bert_score import BERTScorer
+
+    return get_model("bert_scorer", model_type, lambda: BERTScorer(model_type=model_type))
+
+
+def load_times() -> dict[str, float]:
+    """Seconds spent loading each model, keyed "kind:name"."""
+    with _lock:
+        return {f"{kind}:{name}": s for (kind, name), s in _load_seconds.items()}
+
+
+def clear():
+    """Drop all cached models (frees memory; the next use reloads)."""
+    with _lock:
+        _models.clear()
+        _load_seconds.clear()
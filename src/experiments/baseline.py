@@ -10,59 +10,59 @@ Paper result (GPT 3.5 Turbo):
 """
 
 import json
+import asyncio
 import argparse
+from functools import partial
+from typing import Callable
 from pathlib import Path
-from tqdm import tqdm
 
 import sys
 sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
-from src.utils.llm_client import LLMClient
-from src.utils.data_loader import load_all_cases, format_transcript
+from src.utils.llm_client import (
+    AsyncLLMClient,
+    add_llm_arguments,
+    client_from_args,
+    print_cache_stats,
+)
+from src.utils.data_loader import ClinicalCase, load_all_cases, format_transcript, parse_shard
+from src.utils.scheduler import run_chains
+from src.utils.ledger import print_ledger_summary
+from src.utils.outputs import print_rescore_hint, write_outputs
 from src.utils.prompts import BASELINE_SYSTEM_PROMPT, BASELINE_USER_PROMPT
-from src.evaluation.metrics import SummarizationMetrics
+from src.evaluation.metrics import (
+    SummarizationMetrics,
+    add_eval_arguments,
+    metrics_from_args,
+    print_eval_timing,
+)
+from src.evaluation.pipeline import StreamingEvaluator, print_overlap
 
+CONFIG = "full_transcript"  # ledger / outputs config label (one call per case)
 
-def run_baseline(
-    transcript_dir: str,
-    annotation_dir: str,
-    model_name: str = "gpt-3.5-turbo",
-    output_path: str = "results/baseline_results.json",
-):
-    """Run baseline experiment: full transcript → LLM → summary."""
 
-    # Load data
-    cases = load_all_cases(transcript_dir, annotation_dir)
-    if not cases:
-        print("ERROR: No cases found. Please add data to data/processed/ and data/annotations/")
-        return
+async def summarize_case(llm: AsyncLLMClient, case: ClinicalCase) -> str:
+    """Summarize one full transcript in a single call."""
+    # Format full transcript
+    transcript_text = format_transcript(case.lines)
+    user_prompt = BASELINE_USER_PROMPT.format(transcript=transcript_text)
+    tag = {"experiment": "baseline", "config": CONFIG, "case_id": case.id}
+    return await llm.single_call(BASELINE_SYSTEM_PROMPT, user_prompt, tag=tag)
 
-    # Init LLM client
-    llm = LLMClient(model=model_name, temperature=0.0)
-
-    # Run experiment
-    predictions = []
-    references = []
-
-    for case in tqdm(cases, desc="Baseline experiment"):
-        # Format full transcript
-        transcript_text = format_transcript(case.lines)
 
-        # Get LLM summary
-        user_prompt = BASELINE_USER_PROMPT.format(transcript=transcript_text)
-        summary = llm.single_call(BASELINE_SYSTEM_PROMPT, user_prompt)
-        predictions.append(summary)
+def case_sweep(
+    cases: list[ClinicalCase], summaries: dict[str, str]
+) -> dict[str, tuple[list[str], list[str]]]:
+    """Single-config sweep: (case summaries, reference summaries built from annotations)."""
+    predictions = [summaries[case.id] for case in cases]
+    references = [case.index.reference for case in cases]
+    return {"baseline": (predictions, references)}
 
-        # Build reference summary from annotations
-        ref_summary = " ".join(a.summary for a in case.annotations)
-        references.append(ref_summary)
 
-        print(f"\n[{case.id}] LLM Summary (first 200 chars): {summary[:200]}...")
-
-    # Evaluate
-    print("\nComputing evaluation metrics...")
-    metrics = SummarizationMetrics()
-    results = metrics.compute_all(predictions, references)
+def report_results(sweep: dict, sweep_results: dict, model_name: str) -> dict:
+    """Summary scores → results JSON (Table 1), with predictions and references."""
+    predictions, references = sweep["baseline"]
+    results = sweep_results["baseline"]
 
     # Print results (Table 1 format)
     print("\n" + "=" * 60)
@@ -71,20 +71,91 @@ def run_baseline(
     for metric_name, metric_data in results.items():
         print(f"  {metric_name}: {metric_data['mean']:.2f} ± {metric_data['std']:.2f}")
 
-    # Save results
-    output = {
+    return {
         "experiment": "baseline",
         "model": model_name,
-        "num_cases": len(cases),
+        "num_cases": len(predictions),
         "metrics": {k: {"mean": v["mean"], "std": v["std"]} for k, v in results.items()},
         "predictions": predictions,
         "references": references,
     }
+
+
+def run_baseline(
+    transcript_dir: str,
+    annotation_dir: str,
+    model_name: str = "gpt-3.5-turbo",
+    output_path: str = "results/baseline_results.json",
+    llm: AsyncLLMClient | None = None,
+    max_in_flight: int = 8,
+    metrics: SummarizationMetrics | Callable[[], SummarizationMetrics] | None = None,
+    generate_only: bool = False,
+    shard: tuple[int, int] | None = None,
+):
+    """Run baseline experiment: full transcript → LLM → summary.
+
+    A metrics factory is built in the background during generation (see
+    StreamingEvaluator); finished cases are scored as they arrive.
+    """
+
+    # Load data
+    cases = load_all_cases(transcript_dir, annotation_dir, shard)
+    if not cases:
+        print("ERROR: No cases found. Please add data to data/processed/ and data/annotations/")
+        return
+
+    # Init LLM client
+    if llm is None:
+        llm = AsyncLLMClient(model=model_name, temperature=0.0)
+
+    # 생성 중에 평가 모델을 미리 로드하고, 끝난 case부터 채점
+    evaluator = None if generate_only else StreamingEvaluator(metrics or SummarizationMetrics)
+    case_refs = {case.id: case.index.reference for case in cases}
+
+    def on_result(case_id, summary):
+        if evaluator is not None:
+            evaluator.submit(summary, case_refs[case_id])
+
+    # Run experiment (cases are independent → concurrent)
+    chains = {case.id: partial(summarize_case, llm, case) for case in cases}
+    summaries = asyncio.run(
+        run_chains(chains, max_in_flight, desc="Baseline experiment", on_result=on_result)
+    )
+
+    for case in cases:
+        print(f"\n[{case.id}] LLM Summary (first 200 chars): {summaries[case.id][:200]}...")
+
+    print_cache_stats(llm)
+
+    # 채점과 무관하게 case별 출력을 저장 (rescore.py로 재채점 가능)
+    saved = write_outputs(
+        output_path, "baseline", model_name, [(CONFIG, CONFIG)],
+        {(CONFIG, case_id): [summary] for case_id, summary in summaries.items()},
+        llm.ledger,
+    )
+
+    if generate_only:
+        # 채점 없이 종료: 응답은 outputs 파일(rescore로 채점)과 --cache, 호출 기록은 ledger에 남음
+        print_ledger_summary(llm.ledger.write(output_path, experiment="baseline"))
+        print_rescore_hint([saved])
+        return
+
+    # Evaluate (most cases were already scored while generation was running)
+    print("\nComputing evaluation metrics...")
+    sweep = case_sweep(cases, summaries)
+    output = report_results(sweep, evaluator.sweep_results(sweep), model_name)
+    print_eval_timing(evaluator.metrics)
+    print_overlap(evaluator)
+
+    # Save results
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
     with open(output_path, "w", encoding="utf-8") as f:
         json.dump(output, f, ensure_ascii=False, indent=2)
     print(f"\nResults saved to {output_path}")
 
+    # Token / latency / cost ledger next to the results JSON
+    print_ledger_summary(llm.ledger.write(output_path, experiment="baseline"))
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Baseline agenda-setting experiment")
@@ -92,6 +163,19 @@ if __name__ == "__main__":
     parser.add_argument("--annotation-dir", default="data/annotations")
     parser.add_argument("--model", default="gpt-3.5-turbo")
     parser.add_argument("--output", default="results/baseline_results.json")
+    parser.add_argument(
+        "--shard", type=parse_shard, default=None,
+        help="Run only shard i of N of the cases (i/N, 0-based; every N-th case from i)",
+    )
+    add_llm_arguments(parser)
+    add_eval_arguments(parser)
     args = parser.parse_args()
 
-    run_baseline(args.transcript_dir, args.annotation_dir, args.model, args.output)
+    run_baseline(
+        args.transcript_dir, args.annotation_dir, args.model, args.output,
+        llm=client_from_args(args, AsyncLLMClient),
+        max_in_flight=args.max_in_flight,
+        metrics=partial(metrics_from_args, args),
+        generate_only=args.generate_only,
+        shard=args.shard,
+    )
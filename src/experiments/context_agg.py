@@ -8,54 +8,230 @@ Paper best result:
     Growing window, input=5, context=5: Precision=66.7, Recall=77.8
 """
 
+import re
 import json
+import asyncio
 import argparse
+from functools import partial
+from typing import Callable
 from pathlib import Path
-from tqdm import tqdm
 
 import sys
 sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
-from src.utils.llm_client import LLMClient
-from src.utils.data_loader import load_all_cases
+from src.utils.llm_client import (
+    AsyncLLMClient,
+    add_llm_arguments,
+    client_from_args,
+    print_cache_stats,
+)
+from src.utils.data_loader import ClinicalCase, TranscriptLine, load_all_cases, parse_shard
+from src.utils.scheduler import run_chains
+from src.utils.ledger import print_ledger_summary
+from src.utils.outputs import print_rescore_hint, write_outputs
+from src.utils.prefilter import LineGate, cross_fitted_gates, gate_report, print_gate_report
 from src.utils.prompts import (
     REALTIME_SYSTEM_PROMPT,
     REALTIME_USER_PROMPT,
     CONTEXT_AGG_CONTEXT_PREFIX,
+    CONTEXT_AGG_MULTILINE_SYSTEM_PROMPT,
+    CONTEXT_AGG_MULTILINE_PREFIX,
+    CONTEXT_AGG_NUMBERED_LINE,
+)
+from src.evaluation.metrics import (
+    SummarizationMetrics,
+    add_eval_arguments,
+    metrics_from_args,
+    print_eval_timing,
 )
-from src.evaluation.metrics import SummarizationMetrics
-from src.evaluation.detection import compute_detection_metrics
-import numpy as np
+from src.evaluation.detection import case_prediction, is_none_output, sweep_detection
+from src.evaluation.pipeline import StreamingEvaluator, print_overlap
 
+_JSON_OBJECT = re.compile(r"\{.*\}", re.S)
+_VERDICT_LINE = re.compile(r"^\s*(?:line\s*)?(\d+)\s*[:.)]\s*(.+?)\s*$", re.M | re.I)
+_JSON_PAIR = re.compile(r'"[^"\d]*(\d+)"\s*:\s*("(?:[^"\\]|\\.)*"|null)')
 
-def run_context_aggregation(
-    transcript_dir: str,
-    annotation_dir: str,
-    configs: list[dict] = None,
-    model_name: str = "gpt-3.5-turbo",
-    output_path: str = "results/context_agg_results.json",
-):
-    """Run context aggregation experiments."""
 
-    if configs is None:
-        # Default configs from Table 4
-        configs = [
-            {"aggregation": "sliding_window", "input_size": 1, "context_size": 20},
-            {"aggregation": "sliding_window", "input_size": 1, "context_size": 50},
-            {"aggregation": "growing_window", "input_size": 1, "context_size": 20},
-            {"aggregation": "growing_window", "input_size": 1, "context_size": 50},
-            {"aggregation": "growing_window", "input_size": 5, "context_size": 5},
-        ]
+def config_label(cfg: dict) -> str:
+    return f"{cfg['aggregation']}/in={cfg['input_size']}/ctx={cfg['context_size']}"
+
+
+def format_line_batch(numbered: list[tuple[int, TranscriptLine]]) -> str:
+    """Numbered lines for one multi-line request."""
+    return "\n".join(
+        CONTEXT_AGG_NUMBERED_LINE.format(idx=idx, speaker=l.speaker, text=l.text)
+        for idx, l in numbered
+    )
+
+
+def parse_line_verdicts(text: str, line_indices: list[int]) -> list[str]:
+    """Per-line summaries from a multi-line response ("None." where missing).
+
+    Expects a JSON object {"<line>": "<summary or None.>"}. If it does not
+    parse (e.g. cut off at max_tokens) the complete "<line>": "..." pairs
+    are kept; otherwise falls back to "Line N: ..." / "N. ..." lines.
+    Verdicts are matched by line number, never by position, so a missing
+    line is "None." rather than shifting the lines after it.
+    """
+    verdicts = {}
+    match = _JSON_OBJECT.search(text)
+    data = None
+    if match:
+        try:
+            data = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            pass
+    if isinstance(data, dict):
+        for k, v in data.items():
+            digits = re.sub(r"\D", "", str(k))
+            if digits:
+                verdicts[int(digits)] = v
+    elif "{" in text:
+        # 잘린 JSON: 완결된 "줄": "요약" 쌍만 사용
+        for m in _JSON_PAIR.finditer(text[text.index("{"):]):
+            verdicts[int(m.group(1))] = json.loads(m.group(2))
+    if not verdicts:
+        for m in _VERDICT_LINE.finditer(text):
+            verdicts[int(m.group(1))] = m.group(2)
+
+    outputs = []
+    for i in line_indices:
+        v = verdicts.get(i)
+        v = str(v).strip() if v is not None else ""
+        outputs.append("None." if v.lower() in ("", "none", "none.", "null") else v)
+    return outputs
+
+
+async def aggregate_case(
+    llm: AsyncLLMClient, case: ClinicalCase, cfg: dict, gate: LineGate | None = None
+) -> list[str]:
+    """Process one case under one aggregation config; returns one output per line.
+
+    input_size=1 sends one line per call (paper prompt). input_size>1 sends
+    that many numbered lines per call and parses per-line verdicts from a
+    JSON response, so detection metrics stay line-level. Lines the gate
+    marks as "None" are answered locally and left out of the request.
+    """
+    agg = cfg["aggregation"]
+    input_size = cfg["input_size"]
+    ctx_size = cfg["context_size"]
+    tag = {"experiment": "context_aggregation", "config": config_label(cfg), "case_id": case.id}
+
+    llm_outputs = []
+    context_summary = ""  # aggregated context summary
+    recent_summaries = []  # buffer of recent K summaries
+    lines_since_update = 0
+    gated = gate.decide(case.lines) if gate is not None else [False] * len(case.lines)
+
+    for i in range(0, len(case.lines), input_size):
+        batch = case.lines[i : i + input_size]
+        # 사전 필터를 통과한 줄만 LLM에 보냄
+        pending = [(i + j, l) for j, l in enumerate(batch) if not gated[i + j]]
+
+        if not pending:
+            summaries = ["None."] * len(batch)
+        elif input_size == 1:
+            line = batch[0]
+            current_line = REALTIME_USER_PROMPT.format(
+                speaker=line.speaker, text=line.text
+            )
+
+            # Build prompt with context
+            if context_summary:
+                user_content = CONTEXT_AGG_CONTEXT_PREFIX.format(
+                    context_summary=context_summary
+                ) + "\n" + current_line
+            else:
+                user_content = current_line
+
+            messages = [
+                {"role": "system", "content": REALTIME_SYSTEM_PROMPT},
+                {"role": "user", "content": user_content},
+            ]
+            summaries = [await llm.conversation_call(messages, tag={**tag, "line_idx": i})]
+        else:
+            numbered = format_line_batch(pending)
+            if context_summary:
+                user_content = CONTEXT_AGG_MULTILINE_PREFIX.format(
+                    context_summary=context_summary
+                ) + "\n" + numbered
+            else:
+                user_content = numbered
+
+            messages = [
+                {"role": "system", "content": CONTEXT_AGG_MULTILINE_SYSTEM_PROMPT},
+                {"role": "user", "content": user_content},
+            ]
+            # line_idx = 배치의 첫 줄 인덱스
+            response = await llm.conversation_call(
+                messages, max_tokens=max(512, 128 * len(pending)), tag={**tag, "line_idx": i}
+            )
+            verdicts = dict(zip(
+                (idx for idx, _ in pending),
+                parse_line_verdicts(response, [idx for idx, _ in pending]),
+            ))
+            summaries = [verdicts.get(i + j, "None.") for j in range(len(batch))]
+
+        llm_outputs.extend(summaries)
+
+        # Track summaries for aggregation
+        recent_summaries.extend(
+            s for s in summaries if not is_none_output(s)
+        )
+
+        lines_since_update += len(batch)
+
+        # Update context every K lines
+        if lines_since_update >= ctx_size and recent_summaries:
+            new_chunk = " ".join(recent_summaries[-ctx_size:])
+
+            if agg == "sliding_window":
+                context_summary = new_chunk
+            elif agg == "growing_window":
+                context_summary = (
+                    (context_summary + " " + new_chunk).strip()
+                    if context_summary
+                    else new_chunk
+                )
+
+            recent_summaries = []
+            lines_since_update = 0
+
+    return llm_outputs
+
+
+def case_sweep(
+    cases: list[ClinicalCase],
+    outputs: dict[tuple[int, str], list[str]],
+    num_configs: int,
+) -> dict[int, tuple[list[str], list[str]]]:
+    """Per config index: (case predictions, case references) for the summary metrics."""
+    case_refs = [case.index.reference for case in cases]
+    return {
+        cfg_idx: ([case_prediction(outputs[(cfg_idx, case.id)]) for case in cases], case_refs)
+        for cfg_idx in range(num_configs)
+    }
 
-    cases = load_all_cases(transcript_dir, annotation_dir)
-    if not cases:
-        print("ERROR: No cases found.")
-        return
 
-    llm = LLMClient(model=model_name, temperature=0.0)
+def report_results(
+    cases: list[ClinicalCase],
+    outputs: dict[tuple[int, str], list[str]],
+    sweep_results: dict,
+    configs: list[dict],
+    model_name: str,
+    prefilter: dict | None = None,
+) -> dict:
+    """Detection metrics from the per-line outputs + summary scores → results JSON (Table 4)."""
     all_results = []
 
-    for cfg in configs:
+    # Line-level detection for every config × case in one pass
+    detection = sweep_detection(
+        {cfg_idx: [outputs[(cfg_idx, case.id)] for case in cases] for cfg_idx in range(len(configs))},
+        [case.index.annotated for case in cases],
+        [len(case.lines) for case in cases],
+    )
+
+    for cfg_idx, cfg in enumerate(configs):
         agg = cfg["aggregation"]
         input_size = cfg["input_size"]
         ctx_size = cfg["context_size"]
@@ -64,89 +240,13 @@ def run_context_aggregation(
         print(f"Aggregation={agg}, Input={input_size}, Context={ctx_size}")
         print(f"{'='*60}")
 
-        case_precisions = []
-        case_recalls = []
-        all_predictions = []
-        all_references = []
-
-        for case in tqdm(cases, desc=f"{agg} in={input_size} ctx={ctx_size}"):
-            annotated_lines = {a.line_idx for a in case.annotations}
-            llm_outputs = []
-            context_summary = ""  # aggregated context summary
-            recent_summaries = []  # buffer of recent K summaries
-            lines_since_update = 0
-
-            for i, line in enumerate(case.lines):
-                # Build user message (potentially multiple lines for input_size > 1)
-                # For simplicity with input_size=1, process one line at a time
-                current_line = REALTIME_USER_PROMPT.format(
-                    speaker=line.speaker, text=line.text
-                )
-
-                # Build prompt with context
-                if context_summary:
-                    user_content = CONTEXT_AGG_CONTEXT_PREFIX.format(
-                        context_summary=context_summary
-                    ) + "\n" + current_line
-                else:
-                    user_content = current_line
-
-                messages = [
-                    {"role": "system", "content": REALTIME_SYSTEM_PROMPT},
-                    {"role": "user", "content": user_content},
-                ]
-
-                summary = llm.conversation_call(messages)
-                llm_outputs.append(summary)
-
-                # Track summaries for aggregation
-                if summary.strip().lower() not in ("none", "none."):
-                    recent_summaries.append(summary)
-
-                lines_since_update += 1
-
-                # Update context every K lines
-                if lines_since_update >= ctx_size and recent_summaries:
-                    new_chunk = " ".join(recent_summaries[-ctx_size:])
-
-                    if agg == "sliding_window":
-                        context_summary = new_chunk
-                    elif agg == "growing_window":
-                        context_summary = (
-                            (context_summary + " " + new_chunk).strip()
-                            if context_summary
-                            else new_chunk
-                        )
-
-                    recent_summaries = []
-                    lines_since_update = 0
-
-            # Detection metrics
-            y_true = [1 if i in annotated_lines else 0 for i in range(len(case.lines))]
-            y_pred = [
-                0 if s.strip().lower() in ("none", "none.") else 1
-                for s in llm_outputs
-            ]
-            det = compute_detection_metrics(y_true, y_pred)
-            case_precisions.append(det["precision"])
-            case_recalls.append(det["recall"])
-
-            # Summarization
-            detected = [s for s in llm_outputs if s.strip().lower() not in ("none", "none.")]
-            all_predictions.append(" ".join(detected) if detected else "None")
-            all_references.append(" ".join(a.summary for a in case.annotations))
-
-        # Compute metrics
-        metrics = SummarizationMetrics()
-        sum_results = metrics.compute_all(all_predictions, all_references)
-
-        precision_arr = np.array(case_precisions)
-        recall_arr = np.array(case_recalls)
+        sum_results = sweep_results[cfg_idx]
 
         result = {
             "config": cfg,
-            "precision": {"mean": float(np.mean(precision_arr)), "std": float(np.std(precision_arr))},
-            "recall": {"mean": float(np.mean(recall_arr)), "std": float(np.std(recall_arr))},
+            "precision": detection[cfg_idx]["precision"],
+            "recall": detection[cfg_idx]["recall"],
+            "micro": detection[cfg_idx]["micro"],
         }
         for name, data in sum_results.items():
             result[name] = {"mean": data["mean"], "std": data["std"]}
@@ -154,22 +254,112 @@ def run_context_aggregation(
         print(f"\nResults:")
         print(f"  Precision:  {result['precision']['mean']:.2f} ± {result['precision']['std']:.2f}")
         print(f"  Recall:     {result['recall']['mean']:.2f} ± {result['recall']['std']:.2f}")
-        for name in ["Rouge-L", "BLEU", "BERTScore", "SemScore"]:
+        print(f"  Micro P/R:  {result['micro']['precision']:.2f} / {result['micro']['recall']:.2f}")
+        for name in sum_results:
             print(f"  {name}: {result[name]['mean']:.2f} ± {result[name]['std']:.2f}")
 
         all_results.append(result)
 
-    # Save
-    output = {
+    return {
         "experiment": "context_aggregation",
         "model": model_name,
+        "prefilter": prefilter,
         "results": all_results,
     }
+
+
+def run_context_aggregation(
+    transcript_dir: str,
+    annotation_dir: str,
+    configs: list[dict] = None,
+    model_name: str = "gpt-3.5-turbo",
+    output_path: str = "results/context_agg_results.json",
+    llm: AsyncLLMClient | None = None,
+    max_in_flight: int = 8,
+    metrics: SummarizationMetrics | Callable[[], SummarizationMetrics] | None = None,
+    gate_threshold: float | None = None,
+    generate_only: bool = False,
+    shard: tuple[int, int] | None = None,
+):
+    """Run context aggregation experiments.
+
+    A metrics factory is built in the background during generation (see
+    StreamingEvaluator); finished cases are scored as they arrive.
+    """
+
+    if configs is None:
+        # Default configs from Table 4
+        configs = [
+            {"aggregation": "sliding_window", "input_size": 1, "context_size": 20},
+            {"aggregation": "sliding_window", "input_size": 1, "context_size": 50},
+            {"aggregation": "growing_window", "input_size": 1, "context_size": 20},
+            {"aggregation": "growing_window", "input_size": 1, "context_size": 50},
+            {"aggregation": "growing_window", "input_size": 5, "context_size": 5},
+        ]
+
+    cases = load_all_cases(transcript_dir, annotation_dir, shard)
+    if not cases:
+        print("ERROR: No cases found.")
+        return
+
+    if llm is None:
+        llm = AsyncLLMClient(model=model_name, temperature=0.0)
+
+    gates, gate_stats = {}, None
+    if gate_threshold is not None:
+        gates = cross_fitted_gates(cases, gate_threshold)
+        gate_stats = gate_report(cases, gates)
+        print_gate_report(gate_stats, gate_threshold)
+
+    # 생성 중에 평가 모델을 미리 로드하고, 끝난 case부터 채점
+    evaluator = None if generate_only else StreamingEvaluator(metrics or SummarizationMetrics)
+    references = {case.id: case.index.reference for case in cases}
+
+    def on_result(key, llm_outputs):
+        if evaluator is not None:
+            evaluator.submit(case_prediction(llm_outputs), references[key[1]])
+
+    # Every (config, case) chain is independent → run them concurrently
+    chains = {
+        (cfg_idx, case.id): partial(aggregate_case, llm, case, cfg, gates.get(case.id))
+        for cfg_idx, cfg in enumerate(configs)
+        for case in cases
+    }
+    outputs = asyncio.run(
+        run_chains(chains, max_in_flight, desc="Context aggregation", on_result=on_result)
+    )
+    print_cache_stats(llm)
+
+    # 채점과 무관하게 줄 단위 출력을 저장 (rescore.py로 재채점 가능)
+    prefilter = None if gate_stats is None else {"threshold": gate_threshold, **gate_stats}
+    saved = write_outputs(
+        output_path, "context_aggregation", model_name,
+        [(cfg_idx, config_label(cfg)) for cfg_idx, cfg in enumerate(configs)],
+        outputs, llm.ledger,
+        settings={"configs": configs, "prefilter": prefilter},
+    )
+
+    if generate_only:
+        # 채점 없이 종료: 응답은 outputs 파일(rescore로 채점)과 --cache, 호출 기록은 ledger에 남음
+        print_ledger_summary(llm.ledger.write(output_path, experiment="context_aggregation"))
+        print_rescore_hint([saved])
+        return
+
+    # Per-config results from the streamed scores (identical pairs scored once)
+    sweep_results = evaluator.sweep_results(case_sweep(cases, outputs, len(configs)))
+    output = report_results(cases, outputs, sweep_results, configs, model_name, prefilter)
+    print_eval_timing(evaluator.metrics)
+    print_overlap(evaluator)
+
+    # Save
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
     with open(output_path, "w", encoding="utf-8") as f:
         json.dump(output, f, ensure_ascii=False, indent=2)
     print(f"\nResults saved to {output_path}")
 
+    # Token / latency / cost ledger next to the results JSON
+    print_ledger_summary(llm.ledger.write(output_path, experiment="context_aggregation"))
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -177,9 +367,25 @@ if __name__ == "__main__":
     parser.add_argument("--annotation-dir", default="data/annotations")
     parser.add_argument("--model", default="gpt-3.5-turbo")
     parser.add_argument("--output", default="results/context_agg_results.json")
+    parser.add_argument(
+        "--gate-threshold", type=float, default=None,
+        help="Answer lines locally as 'None.' when the pre-filter's P(None) >= this",
+    )
+    parser.add_argument(
+        "--shard", type=parse_shard, default=None,
+        help="Run only shard i of N of the cases (i/N, 0-based; every N-th case from i)",
+    )
+    add_llm_arguments(parser)
+    add_eval_arguments(parser)
     args = parser.parse_args()
 
     run_context_aggregation(
         args.transcript_dir, args.annotation_dir,
         model_name=args.model, output_path=args.output,
+        llm=client_from_args(args, AsyncLLMClient),
+        max_in_flight=args.max_in_flight,
+        metrics=partial(metrics_from_args, args),
+        gate_threshold=args.gate_threshold,
+        generate_only=args.generate_only,
+        shard=args.shard,
     )
@@ -9,73 +9,91 @@ Paper result (GPT 3.5 Turbo, 5 lines):
 """
 
 import json
+import asyncio
 import argparse
+from functools import partial
+from typing import Callable
 from pathlib import Path
-from tqdm import tqdm
 
 import sys
 sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
-from src.utils.llm_client import LLMClient
-from src.utils.data_loader import load_all_cases, chunk_lines, format_transcript
+from src.utils.llm_client import (
+    AsyncLLMClient,
+    add_llm_arguments,
+    client_from_args,
+    print_cache_stats,
+)
+from src.utils.data_loader import ClinicalCase, load_all_cases, chunk_lines, parse_shard
+from src.utils.scheduler import run_chains
+from src.utils.ledger import print_ledger_summary
+from src.utils.outputs import print_rescore_hint, write_outputs
 from src.utils.prompts import INPUT_LINES_SYSTEM_PROMPT, INPUT_LINES_USER_PROMPT
-from src.evaluation.metrics import SummarizationMetrics
-
-
-def run_input_lines(
-    transcript_dir: str,
-    annotation_dir: str,
-    chunk_sizes: list[int] = [2, 5, 10, 20],
-    model_name: str = "gpt-3.5-turbo",
-    output_path: str = "results/input_lines_results.json",
-):
-    """Run input lines experiment with various chunk sizes."""
+from src.evaluation.metrics import (
+    SummarizationMetrics,
+    add_eval_arguments,
+    metrics_from_args,
+    print_eval_timing,
+)
+from src.evaluation.detection import case_prediction
+from src.evaluation.pipeline import StreamingEvaluator, print_overlap
+
+
+async def summarize_case_chunks(
+    llm: AsyncLLMClient, case: ClinicalCase, chunk_size: int
+) -> list[str]:
+    """Summarize one case chunk by chunk, keeping previous chunks + summaries in context.
+
+    Returns the raw output of every chunk; case_prediction() joins them
+    into the case summary.
+    """
+    # Split into chunks
+    chunks = chunk_lines(case.lines, chunk_size)
+    chunk_outputs = []
+
+    # Process each chunk — keep previous chunks + summaries in context
+    messages = [{"role": "system", "content": INPUT_LINES_SYSTEM_PROMPT}]
+
+    tag = {"experiment": "input_lines", "config": str(chunk_size), "case_id": case.id}
+
+    for chunk_idx, chunk in enumerate(chunks):
+        chunk_text = "\n".join(f"[{l.speaker}] {l.text}" for l in chunk)
+        user_msg = INPUT_LINES_USER_PROMPT.format(chunk=chunk_text)
+        messages.append({"role": "user", "content": user_msg})
+
+        # line_idx = 청크의 첫 줄 인덱스
+        summary = await llm.conversation_call(
+            messages, tag={**tag, "line_idx": chunk_idx * chunk_size}
+        )
+        messages.append({"role": "assistant", "content": summary})
+        chunk_outputs.append(summary)
+
+    return chunk_outputs
+
+
+def case_sweep(
+    cases: list[ClinicalCase],
+    outputs: dict[tuple[int, str], list[str]],
+    chunk_sizes: list[int],
+) -> dict[int, tuple[list[str], list[str]]]:
+    """Per chunk size: (case summaries, case references) for the summary metrics."""
+    case_refs = [case.index.reference for case in cases]
+    return {
+        chunk_size: ([case_prediction(outputs[(chunk_size, case.id)]) for case in cases], case_refs)
+        for chunk_size in chunk_sizes
+    }
 
-    cases = load_all_cases(transcript_dir, annotation_dir)
-    if not cases:
-        print("ERROR: No cases found.")
-        return
 
-    llm = LLMClient(model=model_name, temperature=0.0)
+def report_results(sweep_results: dict, chunk_sizes: list[int], model_name: str) -> dict:
+    """Summary scores per chunk size → results JSON (Table 2)."""
     all_results = {}
 
     for chunk_size in chunk_sizes:
         print(f"\n{'='*60}")
-        print(f"Running with chunk_size={chunk_size}")
+        print(f"Chunk size: {chunk_size}")
         print(f"{'='*60}")
 
-        predictions = []
-        references = []
-
-        for case in tqdm(cases, desc=f"Chunk size {chunk_size}"):
-            # Split into chunks
-            chunks = chunk_lines(case.lines, chunk_size)
-            case_summaries = []
-
-            # Process each chunk — keep previous chunks + summaries in context
-            messages = [{"role": "system", "content": INPUT_LINES_SYSTEM_PROMPT}]
-
-            for chunk in chunks:
-                chunk_text = "\n".join(f"[{l.speaker}] {l.text}" for l in chunk)
-                user_msg = INPUT_LINES_USER_PROMPT.format(chunk=chunk_text)
-                messages.append({"role": "user", "content": user_msg})
-
-                summary = llm.conversation_call(messages)
-                messages.append({"role": "assistant", "content": summary})
-
-                if summary.strip().lower() not in ("none", "none."):
-                    case_summaries.append(summary)
-
-            # Combine all chunk summaries
-            prediction = " ".join(case_summaries) if case_summaries else "None"
-            predictions.append(prediction)
-
-            ref_summary = " ".join(a.summary for a in case.annotations)
-            references.append(ref_summary)
-
-        # Evaluate
-        metrics = SummarizationMetrics()
-        results = metrics.compute_all(predictions, references)
+        results = sweep_results[chunk_size]
 
         print(f"\nResults for chunk_size={chunk_size}:")
         for name, data in results.items():
@@ -85,17 +103,87 @@ def run_input_lines(
             k: {"mean": v["mean"], "std": v["std"]} for k, v in results.items()
         }
 
-    # Save
-    output = {
+    return {
         "experiment": "input_lines",
         "model": model_name,
         "results_by_chunk_size": all_results,
     }
+
+
+def run_input_lines(
+    transcript_dir: str,
+    annotation_dir: str,
+    chunk_sizes: list[int] = [2, 5, 10, 20],
+    model_name: str = "gpt-3.5-turbo",
+    output_path: str = "results/input_lines_results.json",
+    llm: AsyncLLMClient | None = None,
+    max_in_flight: int = 8,
+    metrics: SummarizationMetrics | Callable[[], SummarizationMetrics] | None = None,
+    generate_only: bool = False,
+    shard: tuple[int, int] | None = None,
+):
+    """Run input lines experiment with various chunk sizes.
+
+    A metrics factory is built in the background during generation (see
+    StreamingEvaluator); finished cases are scored as they arrive.
+    """
+
+    cases = load_all_cases(transcript_dir, annotation_dir, shard)
+    if not cases:
+        print("ERROR: No cases found.")
+        return
+
+    if llm is None:
+        llm = AsyncLLMClient(model=model_name, temperature=0.0)
+
+    # 생성 중에 평가 모델을 미리 로드하고, 끝난 case부터 채점
+    evaluator = None if generate_only else StreamingEvaluator(metrics or SummarizationMetrics)
+    references = {case.id: case.index.reference for case in cases}
+
+    def on_result(key, chunk_outputs):
+        if evaluator is not None:
+            evaluator.submit(case_prediction(chunk_outputs), references[key[1]])
+
+    # Every (chunk size, case) chain is independent → run them concurrently
+    chains = {
+        (chunk_size, case.id): partial(summarize_case_chunks, llm, case, chunk_size)
+        for chunk_size in chunk_sizes
+        for case in cases
+    }
+    outputs = asyncio.run(
+        run_chains(chains, max_in_flight, desc="Input lines", on_result=on_result)
+    )
+    print_cache_stats(llm)
+
+    # 채점과 무관하게 청크 단위 출력을 저장 (rescore.py로 재채점 가능)
+    saved = write_outputs(
+        output_path, "input_lines", model_name,
+        [(chunk_size, str(chunk_size)) for chunk_size in chunk_sizes],
+        outputs, llm.ledger,
+        settings={"chunk_sizes": chunk_sizes},
+    )
+
+    if generate_only:
+        # 채점 없이 종료: 응답은 outputs 파일(rescore로 채점)과 --cache, 호출 기록은 ledger에 남음
+        print_ledger_summary(llm.ledger.write(output_path, experiment="input_lines"))
+        print_rescore_hint([saved])
+        return
+
+    # Per-chunk-size results from the streamed scores (identical pairs scored once)
+    sweep_results = evaluator.sweep_results(case_sweep(cases, outputs, chunk_sizes))
+    output = report_results(sweep_results, chunk_sizes, model_name)
+    print_eval_timing(evaluator.metrics)
+    print_overlap(evaluator)
+
+    # Save
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
     with open(output_path, "w", encoding="utf-8") as f:
         json.dump(output, f, ensure_ascii=False, indent=2)
     print(f"\nAll results saved to {output_path}")
 
+    # Token / latency / cost ledger next to the results JSON
+    print_ledger_summary(llm.ledger.write(output_path, experiment="input_lines"))
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -104,9 +192,20 @@ if __name__ == "__main__":
     parser.add_argument("--chunk-sizes", nargs="+", type=int, default=[2, 5, 10, 20])
     parser.add_argument("--model", default="gpt-3.5-turbo")
     parser.add_argument("--output", default="results/input_lines_results.json")
+    parser.add_argument(
+        "--shard", type=parse_shard, default=None,
+        help="Run only shard i of N of the cases (i/N, 0-based; every N-th case from i)",
+    )
+    add_llm_arguments(parser)
+    add_eval_arguments(parser)
     args = parser.parse_args()
 
     run_input_lines(
         args.transcript_dir, args.annotation_dir,
         args.chunk_sizes, args.model, args.output,
+        llm=client_from_args(args, AsyncLLMClient),
+        max_in_flight=args.max_in_flight,
+        metrics=partial(metrics_from_args, args),
+        generate_only=args.generate_only,
+        shard=args.shard,
     )
@@ -0,0 +1,410 @@
+"""
+Dry-run planner: predict calls, tokens, cost and runtime of a sweep.
+
+Reads the sweep definition from configs/config.yaml and drives each
+experiment's per-case chain function with DryRunClient instead of an LLM
+client. DryRunClient counts prompt tokens with the real tokenizer
+(src/utils/tokens.py) and answers with the predicted output: the annotated
+summary for annotated lines (joined for chunks / full transcripts) and
+"None." otherwise, so context growth follows the reference run. Nothing is
+sent to the API. Like AsyncLLMClient it sends each distinct request once
+per experiment (--no-dedup turns that off) and applies the config's
+`stream`, `gate_threshold` and model `max_tokens`, so the predicted calls
+sent and billed cost match the experiment's own script; `calls` counts
+every request including the shared ones. (run_all.py also shares requests
+across experiments, so it sends fewer.)
+
+    python -m src.experiments.plan
+    python -m src.experiments.plan --lines 1000                   # tile cases to 1000-line visits
+    python -m src.experiments.plan --calibrate results/realtime_sim_results_ledger.jsonl
+
+Per-call latency is modeled as a + b * prompt_tokens + c * completion_tokens
+(--calibrate fits a, b, c on a previous run's ledger). Runtime assumes all
+chains of an experiment are scheduled together with --max-in-flight, and
+respects --rpm / --tpm if given.
+"""
+
+import re
+import json
+import math
+import asyncio
+import argparse
+from dataclasses import dataclass, replace
+from functools import partial
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+import numpy as np
+import yaml
+
+from src.utils.cache import request_key
+from src.utils.data_loader import Annotation, ClinicalCase, load_all_cases
+from src.utils.ledger import CallRecord, Ledger
+from src.utils.llm_client import REALTIME_STOP, adaptive_max_tokens
+from src.utils.prefilter import cross_fitted_gates
+from src.utils.tokens import context_window, count_message_tokens, count_tokens, tokenizer_name
+from src.experiments.baseline import summarize_case
+from src.experiments.input_lines import summarize_case_chunks
+from src.experiments.realtime_sim import simulate_case
+from src.experiments.context_agg import aggregate_case
+
+
+@dataclass
+class LatencyModel:
+    """Per-call latency: base + per prompt token + per completion token (seconds)."""
+
+    base: float = 0.4
+    per_prompt_token: float = 0.0001
+    per_completion_token: float = 0.015
+
+    def __call__(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return (
+            self.base
+            + self.per_prompt_token * prompt_tokens
+            + self.per_completion_token * completion_tokens
+        )
+
+    @classmethod
+    def fit(cls, ledger_path: str) -> "LatencyModel":
+        """Least-squares fit on the non-cached calls of a *_ledger.jsonl file."""
+        rows = []
+        with open(ledger_path, "r", encoding="utf-8") as f:
+            for line in f:
+                rec = json.loads(line)
+                if rec["cache_hit"] or rec.get("deduplicated") or rec["prompt_tokens"] is None:
+                    continue
+                rows.append((rec["prompt_tokens"], rec["completion_tokens"] or 0, rec["latency_s"]))
+        if len(rows) < 3:
+            raise ValueError(f"Not enough uncached calls to calibrate in {ledger_path}")
+        data = np.array(rows, dtype=float)
+        X = np.column_stack([np.ones(len(data)), data[:, 0], data[:, 1]])
+        coef, *_ = np.linalg.lstsq(X, data[:, 2], rcond=None)
+        return cls(*(max(0.0, float(c)) for c in coef))
+
+
+def _input_size(config_label: str) -> int:
+    match = re.search(r"/in=(\d+)/", config_label)
+    return int(match.group(1)) if match else 1
+
+
+class DryRunClient:
+    """Stand-in for AsyncLLMClient that predicts outputs and logs token counts."""
+
+    def __init__(
+        self,
+        model: str,
+        cases: list[ClinicalCase],
+        latency: LatencyModel,
+        ledger: Ledger | None = None,
+        dedup: bool = True,
+        max_tokens: int | None = None,
+    ):
+        self.model = model
+        self.latency = latency
+        self.ledger = ledger if ledger is not None else Ledger()
+        self.max_tokens = max_tokens
+        self.chain_seconds = {}  # (experiment, config, case_id) → predicted seconds
+        # request key → (record, response) of the first call, as AsyncLLMClient's dedup
+        self._sent: dict[str, tuple[CallRecord, str]] | None = {} if dedup else None
+        self._n_lines = {case.id: len(case.lines) for case in cases}
+        self._index = {case.id: case.index for case in cases}
+
+    def _predict(self, tag: dict) -> str:
+        """Expected response for the lines a call covers."""
+        index = self._index[tag["case_id"]]
+        n_lines = self._n_lines[tag["case_id"]]
+        if tag["experiment"] == "baseline":
+            covered = range(n_lines)
+        elif tag["experiment"] == "input_lines":
+            covered = range(tag["line_idx"], tag["line_idx"] + int(tag["config"]))
+        elif tag["experiment"] == "context_aggregation" and _input_size(tag["config"]) > 1:
+            # 다중 줄 요청은 줄 번호 → 요약 JSON으로 응답
+            last = min(n_lines, tag["line_idx"] + _input_size(tag["config"]))
+            return json.dumps({
+                str(i): " ".join(a.summary for a in index.at(i)) or "None."
+                for i in range(tag["line_idx"], last)
+            })
+        else:
+            covered = [tag["line_idx"]]
+        found = [a.summary for i in covered for a in index.at(i)]
+        return " ".join(found) if found else "None."
+
+    def _call(
+        self, messages: list[dict], tag: dict, max_tokens: int,
+        prompt_tokens: int | None = None, **extra,
+    ) -> str:
+        if self.max_tokens is not None:
+            max_tokens = min(max_tokens, self.max_tokens)
+        chain = (tag["experiment"], tag["config"], tag["case_id"])
+        key = request_key(self.model, 0.0, max_tokens, messages, **extra)
+        if self._sent is not None and key in self._sent:
+            # 같은 요청은 한 번만 전송: config별 비용에는 포함, 청구액(billed)에서는 제외
+            origin, content = self._sent[key]
+            untagged = dict(experiment=None, config=None, case_id=None, line_idx=None)
+            self.ledger.record(replace(origin, deduplicated=True, **{**untagged, **tag}))
+            self.chain_seconds[chain] = self.chain_seconds.get(chain, 0.0) + origin.latency_s
+            return content
+
+        content = self._predict(tag)
+        if prompt_tokens is None:
+            prompt_tokens = count_message_tokens(messages, self.model)
+        completion_tokens = count_tokens(content, self.model)
+        seconds = self.latency(prompt_tokens, completion_tokens)
+        self.chain_seconds[chain] = self.chain_seconds.get(chain, 0.0) + seconds
+        rec = CallRecord(
+            model=self.model,
+            latency_s=seconds,
+            cache_hit=False,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            prompt_hash=key,
+            **tag,
+        )
+        self.ledger.record(rec)
+        if self._sent is not None:
+            self._sent[key] = (rec, content)
+        return content
+
+    async def single_call(
+        self, system_prompt: str, user_prompt: str, max_tokens: int = 1024,
+        tag: dict | None = None,
+    ) -> str:
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+        return self._call(messages, tag, max_tokens)
+
+    async def conversation_call(
+        self, messages: list[dict], max_tokens: int = 512, tag: dict | None = None,
+        prompt_tokens: int | None = None,
+    ) -> str:
+        return self._call(messages, tag, max_tokens, prompt_tokens)
+
+    async def realtime_call(
+        self, messages: list[dict], max_tokens: int | None = None, tag: dict | None = None,
+        prompt_tokens: int | None = None,
+    ) -> str:
+        # AsyncLLMClient.realtime_call과 같은 요청 (조기 종료 스트림, 줄바꿈에서 중단)
+        if max_tokens is None:
+            max_tokens = adaptive_max_tokens(messages[-1]["content"])
+        return self._call(
+            messages, tag, max_tokens, prompt_tokens, stop=REALTIME_STOP, early_none=True
+        )
+
+
+def tile_case(case: ClinicalCase, n_lines: int) -> ClinicalCase:
+    """Repeat a case's lines (and annotations) to exactly n_lines lines."""
+    n = len(case.lines)
+    reps = math.ceil(n_lines / n)
+    annotations = [
+        Annotation(line_idx=a.line_idx + r * n, type=a.type, summary=a.summary)
+        for r in range(reps)
+        for a in case.annotations
+        if a.line_idx + r * n < n_lines
+    ]
+    return ClinicalCase(id=case.id, lines=(list(case.lines) * reps)[:n_lines], annotations=annotations)
+
+
+def sweep_from_config(config: dict) -> dict[str, list]:
+    """Experiment name → list of configs, from the `experiments` section of config.yaml."""
+    experiments = config.get("experiments", {})
+    sweep = {}
+    if "baseline" in experiments:
+        sweep["baseline"] = ["full_transcript"]
+    if "input_lines" in experiments:
+        sweep["input_lines"] = list(experiments["input_lines"]["chunk_sizes"])
+    if "realtime_sim" in experiments:
+        rt = experiments["realtime_sim"]
+        budget = rt.get("context_token_budget")
+        sweep["realtime_simulation"] = [(ctx, budget) for ctx in rt["context_sizes"]]
+    if "context_agg" in experiments:
+        sweep["context_aggregation"] = [
+            {"aggregation": s["aggregation"], "input_size": s["input_size"], "context_size": ctx}
+            for s in experiments["context_agg"]["strategies"]
+            for ctx in s["context_sizes"]
+        ]
+    return sweep
+
+
+def experiment_options(config: dict, name: str) -> dict:
+    """An experiment's section of `experiments` in config.yaml."""
+    key = {"realtime_simulation": "realtime_sim", "context_aggregation": "context_agg"}.get(name, name)
+    return config.get("experiments", {}).get(key) or {}
+
+
+def model_config(config: dict, name: str) -> dict:
+    """The `models` entry an experiment uses (name, temperature, max_tokens, ...)."""
+    model_key = experiment_options(config, name).get("model", "gpt35")
+    return config.get("models", {}).get(model_key, {})
+
+
+def experiment_model(config: dict, name: str) -> str:
+    return model_config(config, name).get("name", "gpt-3.5-turbo")
+
+
+def build_chains(
+    llm,
+    experiment: str,
+    configs: list,
+    cases: list[ClinicalCase],
+    stream: bool = False,
+    gates: dict | None = None,
+) -> dict:
+    """The same per-case chains the experiment scripts schedule, keyed (config index, case_id).
+
+    llm is a DryRunClient here and an AsyncLLMClient in run_all.py; gates
+    maps case_id → pre-filter gate (realtime_simulation, context_aggregation).
+    """
+    gates = gates or {}
+    chains = {}
+    for cfg_idx, cfg in enumerate(configs):
+        for case in cases:
+            if experiment == "baseline":
+                chain = partial(summarize_case, llm, case)
+            elif experiment == "input_lines":
+                chain = partial(summarize_case_chunks, llm, case, cfg)
+            elif experiment == "realtime_simulation":
+                ctx_size, budget = cfg
+                chain = partial(simulate_case, llm, case, ctx_size, stream, budget, gates.get(case.id))
+            else:
+                chain = partial(aggregate_case, llm, case, cfg, gates.get(case.id))
+            chains[(cfg_idx, case.id)] = chain
+    return chains
+
+
+async def _drive(chains: dict):
+    for chain in chains.values():
+        await chain()
+
+
+def estimate_runtime(
+    chain_seconds: list[float],
+    calls: int,
+    tokens: int,
+    max_in_flight: int,
+    rpm: float | None = None,
+    tpm: float | None = None,
+    work_seconds: float | None = None,
+) -> float:
+    """Lower-bound makespan of chains run concurrently (seconds).
+
+    work_seconds is the API time of the requests actually sent (default:
+    all chain time); calls and tokens count only sent requests too.
+    """
+    if not chain_seconds:
+        return 0.0
+    work = sum(chain_seconds) if work_seconds is None else work_seconds
+    bounds = [max(chain_seconds), work / max_in_flight]
+    if rpm:
+        bounds.append(calls / rpm * 60)
+    if tpm:
+        bounds.append(tokens / tpm * 60)
+    return max(bounds)
+
+
+def plan_sweep(
+    config: dict,
+    cases: list[ClinicalCase],
+    latency: LatencyModel,
+    max_in_flight: int = 8,
+    rpm: float | None = None,
+    tpm: float | None = None,
+    dedup: bool = True,
+) -> dict:
+    """Predicted calls, tokens, cost and runtime per experiment and config."""
+    plan = {}
+    gate_sets = {}  # threshold → gates (같은 threshold는 한 번만 학습)
+    for experiment, configs in sweep_from_config(config).items():
+        model = experiment_model(config, experiment)
+        options = experiment_options(config, experiment)
+        threshold = options.get("gate_threshold")
+        if threshold is not None and threshold not in gate_sets:
+            gate_sets[threshold] = cross_fitted_gates(cases, threshold)
+        llm = DryRunClient(
+            model, cases, latency, dedup=dedup,
+            max_tokens=model_config(config, experiment).get("max_tokens"),
+        )
+        chains = build_chains(
+            llm, experiment, configs, cases,
+            bool(options.get("stream", False)), gate_sets.get(threshold),
+        )
+        asyncio.run(_drive(chains))
+
+        summaries = llm.ledger.summarize(experiment)
+        window = context_window(model)
+        records = llm.ledger.select(experiment)
+        entry = {"model": model, "configs": {}}
+        for cfg, summary in summaries.items():
+            recs = records if cfg == "all" else [r for r in records if r.config == cfg]
+            chains = [s for (_, c, _), s in llm.chain_seconds.items() if cfg == "all" or c == cfg]
+            max_prompt = max(r.prompt_tokens for r in recs)
+            sent = summary["calls"] - summary["deduplicated"]
+            entry["configs"][cfg] = {
+                "calls": summary["calls"],
+                "sent_calls": sent,
+                "prompt_tokens": summary["prompt_tokens"],
+                "completion_tokens": summary["completion_tokens"],
+                "max_prompt_tokens": max_prompt,
+                "exceeds_context_window": window is not None and max_prompt > window,
+                "estimated_cost_usd": summary["estimated_cost_usd"],
+                "billed_cost_usd": summary["billed_cost_usd"],
+                "estimated_runtime_s": estimate_runtime(
+                    chains, sent, summary["billed_tokens"], max_in_flight, rpm, tpm,
+                    work_seconds=sum(r.latency_s for r in recs if not r.deduplicated),
+                ),
+            }
+        plan[experiment] = entry
+    return plan
+
+
+def print_plan(plan: dict):
+    for experiment, entry in plan.items():
+        print(f"\n{experiment} ({entry['model']}):")
+        for cfg, p in entry["configs"].items():
+            flag = "  EXCEEDS CONTEXT WINDOW" if p["exceeds_context_window"] else ""
+            print(
+                f"  {cfg:>36}: {p['calls']} calls ({p['sent_calls']} sent), "
+                f"{p['prompt_tokens']}+{p['completion_tokens']} tokens "
+                f"(max prompt {p['max_prompt_tokens']}), "
+                f"${p['estimated_cost_usd']:.4f} (billed ${p['billed_cost_usd']:.4f}), "
+                f"~{p['estimated_runtime_s'] / 60:.1f} min{flag}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Predict calls, tokens and cost of a sweep")
+    parser.add_argument("--config", default="configs/config.yaml")
+    parser.add_argument("--transcript-dir", default="data/processed")
+    parser.add_argument("--annotation-dir", default="data/annotations")
+    parser.add_argument("--lines", type=int, default=None, help="Tile every case to N lines")
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--rpm", type=float, default=None)
+    parser.add_argument("--tpm", type=float, default=None)
+    parser.add_argument("--calibrate", default=None, help="Fit the latency model on a *_ledger.jsonl")
+    parser.add_argument(
+        "--no-dedup", action="store_true",
+        help="Predict a run with --no-dedup (identical requests sent separately)",
+    )
+    parser.add_argument("--output", default="results/sweep_plan.json")
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    cases = load_all_cases(args.transcript_dir, args.annotation_dir)
+    if args.lines:
+        cases = [tile_case(case, args.lines) for case in cases]
+    latency = LatencyModel.fit(args.calibrate) if args.calibrate else LatencyModel()
+    print(f"Tokenizer: {tokenizer_name()}, latency model: {latency}")
+
+    plan = plan_sweep(
+        config, cases, latency, args.max_in_flight, args.rpm, args.tpm, dedup=not args.no_dedup
+    )
+    print_plan(plan)
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(plan, f, ensure_ascii=False, indent=2)
+    print(f"\nPlan saved to {args.output}")
@@ -11,116 +11,194 @@ Paper results (GPT 3.5 Turbo):
 """
 
 import json
+import asyncio
 import argparse
+from functools import partial
+from typing import Callable
 from pathlib import Path
-from tqdm import tqdm
 
 import sys
 sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
-from src.utils.llm_client import LLMClient
-from src.utils.data_loader import load_all_cases
+from src.utils.llm_client import (
+    AsyncLLMClient,
+    add_llm_arguments,
+    client_from_args,
+    print_cache_stats,
+    print_stream_stats,
+)
+from src.utils.data_loader import ClinicalCase, load_all_cases, parse_shard
+from src.utils.scheduler import run_chains
+from src.utils.ledger import print_ledger_summary
+from src.utils.outputs import print_rescore_hint, write_outputs
+from src.utils.tokens import REPLY_PRIMER_TOKENS, message_tokens
+from src.utils.prefilter import LineGate, cross_fitted_gates, gate_report, print_gate_report
 from src.utils.prompts import REALTIME_SYSTEM_PROMPT, REALTIME_USER_PROMPT
-from src.evaluation.metrics import SummarizationMetrics
-from src.evaluation.detection import compute_detection_metrics
-import numpy as np
+from src.evaluation.metrics import (
+    SummarizationMetrics,
+    add_eval_arguments,
+    metrics_from_args,
+    print_eval_timing,
+)
+from src.evaluation.detection import case_prediction, sweep_detection
+from src.evaluation.pipeline import StreamingEvaluator, print_overlap
 
 
-def run_realtime_simulation(
-    transcript_dir: str,
-    annotation_dir: str,
-    context_sizes: list = [0, 1, 20, 50, 100, "max"],
-    model_name: str = "gpt-3.5-turbo",
-    output_path: str = "results/realtime_sim_results.json",
-):
-    """Run real-time simulation with varying context window sizes."""
+def select_context(
+    context_history: list[tuple[str, str, int | None]],
+    ctx_size: int | str,
+    token_budget: int | None = None,
+) -> list[tuple[str, str, int | None]]:
+    """Previous (line, summary, tokens) entries to replay for the next line.
+
+    ctx_size limits the number of lines ("max" = all); token_budget further
+    keeps only the most recent pairs whose combined tokens fit the budget
+    (tokens are only counted when a budget is set, None otherwise).
+    """
+    if ctx_size == "max":
+        # Use all previous lines that fit
+        window = context_history
+    elif ctx_size == 0:
+        window = []
+    else:
+        window = context_history[-ctx_size:]
+
+    if token_budget is None:
+        return window
+    used = 0
+    start = len(window)
+    while start > 0 and used + window[start - 1][2] <= token_budget:
+        start -= 1
+        used += window[start][2]
+    return window[start:]
+
+
+def config_label(ctx_size: int | str, token_budget: int | None = None) -> str:
+    return str(ctx_size) if token_budget is None else f"{ctx_size}/budget={token_budget}"
+
+
+def _user_tokens(llm: AsyncLLMClient, line: str) -> int:
+    return message_tokens({"role": "user", "content": line}, llm.model)
+
+
+def _assistant_tokens(llm: AsyncLLMClient, summary: str) -> int:
+    return message_tokens({"role": "assistant", "content": summary}, llm.model)
 
-    cases = load_all_cases(transcript_dir, annotation_dir)
-    if not cases:
-        print("ERROR: No cases found.")
-        return
 
-    llm = LLMClient(model=model_name, temperature=0.0)
+async def simulate_case(
+    llm: AsyncLLMClient,
+    case: ClinicalCase,
+    ctx_size: int | str,
+    stream: bool = False,
+    token_budget: int | None = None,
+    gate: LineGate | None = None,
+) -> list[str]:
+    """Process one case line-by-line; each call depends on the previous summaries.
+
+    With stream=True each line uses llm.realtime_call (streamed, cancelled
+    as soon as the response starts with "None"). token_budget caps the
+    tokens of the replayed context pairs (see select_context). Lines the
+    gate marks as "None" are answered locally without a call.
+    """
+    context_history = []  # list of (line_text, summary, pair_tokens or None)
+    llm_outputs = []
+    tag = {
+        "experiment": "realtime_simulation",
+        "config": config_label(ctx_size, token_budget),
+        "case_id": case.id,
+    }
+    gated = gate.decide(case.lines) if gate is not None else [False] * len(case.lines)
+    if token_budget is not None:
+        system_tokens = message_tokens({"role": "system", "content": REALTIME_SYSTEM_PROMPT}, llm.model)
+
+    for i, line in enumerate(case.lines):
+        current_line = REALTIME_USER_PROMPT.format(
+            speaker=line.speaker, text=line.text
+        )
+        # 토큰은 예산이 있을 때만 셈 (없으면 select_context가 쓰지 않음)
+        line_tokens = _user_tokens(llm, current_line) if token_budget is not None else None
+        if gated[i]:
+            summary = "None."  # 사전 필터가 LLM 호출 없이 응답
+        else:
+            # Build messages
+            messages = [{"role": "system", "content": REALTIME_SYSTEM_PROMPT}]
+
+            # Add context (previous lines + summaries)
+            context = select_context(context_history, ctx_size, token_budget)
+            for prev_line, prev_summary, _ in context:
+                messages.append({"role": "user", "content": prev_line})
+                messages.append({"role": "assistant", "content": prev_summary})
+
+            # Add current line
+            messages.append({"role": "user", "content": current_line})
+
+            # 예산 단계에서 센 토큰으로 prompt 크기를 바로 계산 (ledger·rate limiter용)
+            prompt_tokens = None
+            if token_budget is not None:
+                prompt_tokens = (
+                    system_tokens + sum(t for _, _, t in context) + line_tokens + REPLY_PRIMER_TOKENS
+                )
+
+            # Get LLM response
+            call_tag = {**tag, "line_idx": i}
+            if stream:
+                summary = await llm.realtime_call(messages, tag=call_tag, prompt_tokens=prompt_tokens)
+            else:
+                summary = await llm.conversation_call(messages, tag=call_tag, prompt_tokens=prompt_tokens)
+        llm_outputs.append(summary)
+
+        # Add to context history (pair tokens counted once, reused for every later line)
+        pair_tokens = None
+        if token_budget is not None:
+            pair_tokens = line_tokens + _assistant_tokens(llm, summary)
+        context_history.append((current_line, summary, pair_tokens))
+
+    return llm_outputs
+
+
+def case_sweep(
+    cases: list[ClinicalCase],
+    outputs: dict[tuple[int | str, str], list[str]],
+    context_sizes: list,
+) -> dict[int | str, tuple[list[str], list[str]]]:
+    """Per context size: (case predictions, case references) for the summary metrics."""
+    case_refs = [case.index.reference for case in cases]
+    return {
+        ctx_size: ([case_prediction(outputs[(ctx_size, case.id)]) for case in cases], case_refs)
+        for ctx_size in context_sizes
+    }
+
+
+def report_results(
+    cases: list[ClinicalCase],
+    outputs: dict[tuple[int | str, str], list[str]],
+    sweep_results: dict,
+    context_sizes: list,
+    model_name: str,
+    token_budget: int | None = None,
+    prefilter: dict | None = None,
+) -> dict:
+    """Detection metrics from the per-line outputs + summary scores → results JSON (Table 3)."""
     all_results = {}
 
+    # Line-level detection for every context size × case in one pass
+    detection = sweep_detection(
+        {ctx_size: [outputs[(ctx_size, case.id)] for case in cases] for ctx_size in context_sizes},
+        [case.index.annotated for case in cases],
+        [len(case.lines) for case in cases],
+    )
+
     for ctx_size in context_sizes:
         print(f"\n{'='*60}")
         print(f"Context size: {ctx_size}")
         print(f"{'='*60}")
 
-        case_precisions = []
-        case_recalls = []
-        all_predictions = []
-        all_references = []
-
-        for case in tqdm(cases, desc=f"Context={ctx_size}"):
-            # Build annotated line indices set
-            annotated_lines = {a.line_idx for a in case.annotations}
-
-            # Process line-by-line
-            context_history = []  # list of (line_text, summary) pairs
-            llm_outputs = []
-
-            for i, line in enumerate(case.lines):
-                # Build messages
-                messages = [{"role": "system", "content": REALTIME_SYSTEM_PROMPT}]
-
-                # Add context (previous lines + summaries)
-                if ctx_size == "max":
-                    # Use all previous lines that fit
-                    context_to_use = context_history
-                elif ctx_size == 0:
-                    context_to_use = []
-                else:
-                    context_to_use = context_history[-ctx_size:]
-
-                for prev_line, prev_summary in context_to_use:
-                    messages.append({"role": "user", "content": prev_line})
-                    messages.append({"role": "assistant", "content": prev_summary})
-
-                # Add current line
-                current_line = REALTIME_USER_PROMPT.format(
-                    speaker=line.speaker, text=line.text
-                )
-                messages.append({"role": "user", "content": current_line})
-
-                # Get LLM response
-                summary = llm.conversation_call(messages)
-                llm_outputs.append(summary)
-
-                # Add to context history
-                context_history.append((current_line, summary))
-
-            # Detection metrics (line-level)
-            y_true = [1 if i in annotated_lines else 0 for i in range(len(case.lines))]
-            y_pred = [
-                0 if s.strip().lower() in ("none", "none.") else 1
-                for s in llm_outputs
-            ]
-            det_metrics = compute_detection_metrics(y_true, y_pred)
-            case_precisions.append(det_metrics["precision"])
-            case_recalls.append(det_metrics["recall"])
-
-            # Summarization: collect detected summaries vs reference
-            detected_summaries = [
-                s for s in llm_outputs if s.strip().lower() not in ("none", "none.")
-            ]
-            prediction = " ".join(detected_summaries) if detected_summaries else "None"
-            reference = " ".join(a.summary for a in case.annotations)
-            all_predictions.append(prediction)
-            all_references.append(reference)
-
-        # Compute summarization metrics
-        metrics = SummarizationMetrics()
-        sum_results = metrics.compute_all(all_predictions, all_references)
-
-        # Aggregate detection metrics
-        precision_arr = np.array(case_precisions)
-        recall_arr = np.array(case_recalls)
+        sum_results = sweep_results[ctx_size]
 
         result = {
-            "precision": {"mean": float(np.mean(precision_arr)), "std": float(np.std(precision_arr))},
-            "recall": {"mean": float(np.mean(recall_arr)), "std": float(np.std(recall_arr))},
+            "precision": detection[ctx_size]["precision"],
+            "recall": detection[ctx_size]["recall"],
+            "micro": detection[ctx_size]["micro"],
         }
         for name, data in sum_results.items():
             result[name] = {"mean": data["mean"], "std": data["std"]}
@@ -129,22 +207,114 @@ def run_realtime_simulation(
         print(f"\nContext={ctx_size} results:")
         print(f"  Precision:  {result['precision']['mean']:.2f} ± {result['precision']['std']:.2f}")
         print(f"  Recall:     {result['recall']['mean']:.2f} ± {result['recall']['std']:.2f}")
-        for name in ["Rouge-L", "BLEU", "BERTScore", "SemScore"]:
+        print(f"  Micro P/R:  {result['micro']['precision']:.2f} / {result['micro']['recall']:.2f}")
+        for name in sum_results:
             print(f"  {name}: {result[name]['mean']:.2f} ± {result[name]['std']:.2f}")
 
         all_results[str(ctx_size)] = result
 
-    # Save
-    output = {
+    return {
         "experiment": "realtime_simulation",
         "model": model_name,
+        "context_token_budget": token_budget,
+        "prefilter": prefilter,
         "results_by_context_size": all_results,
     }
+
+
+def run_realtime_simulation(
+    transcript_dir: str,
+    annotation_dir: str,
+    context_sizes: list = [0, 1, 20, 50, 100, "max"],
+    model_name: str = "gpt-3.5-turbo",
+    output_path: str = "results/realtime_sim_results.json",
+    llm: AsyncLLMClient | None = None,
+    max_in_flight: int = 8,
+    metrics: SummarizationMetrics | Callable[[], SummarizationMetrics] | None = None,
+    stream: bool = False,
+    token_budget: int | None = None,
+    gate_threshold: float | None = None,
+    generate_only: bool = False,
+    shard: tuple[int, int] | None = None,
+):
+    """Run real-time simulation with varying context window sizes.
+
+    metrics may be a zero-arg factory: it is then built in the background
+    while the LLM calls run, and finished cases are scored as they arrive.
+    """
+
+    cases = load_all_cases(transcript_dir, annotation_dir, shard)
+    if not cases:
+        print("ERROR: No cases found.")
+        return
+
+    if llm is None:
+        llm = AsyncLLMClient(model=model_name, temperature=0.0)
+
+    gates, gate_stats = {}, None
+    if gate_threshold is not None:
+        gates = cross_fitted_gates(cases, gate_threshold)
+        gate_stats = gate_report(cases, gates)
+        print_gate_report(gate_stats, gate_threshold)
+
+    # 생성 중에 평가 모델을 미리 로드하고, 끝난 case부터 채점
+    evaluator = None if generate_only else StreamingEvaluator(metrics or SummarizationMetrics)
+    references = {case.id: case.index.reference for case in cases}
+
+    def on_result(key, llm_outputs):
+        if evaluator is not None:
+            evaluator.submit(case_prediction(llm_outputs), references[key[1]])
+
+    # Every (context size, case) chain is independent → run them concurrently
+    chains = {
+        (ctx_size, case.id): partial(
+            simulate_case, llm, case, ctx_size, stream, token_budget, gates.get(case.id)
+        )
+        for ctx_size in context_sizes
+        for case in cases
+    }
+    outputs = asyncio.run(
+        run_chains(chains, max_in_flight, desc="Real-time simulation", on_result=on_result)
+    )
+    print_cache_stats(llm)
+    print_stream_stats(llm, experiment="realtime_simulation")
+
+    # 채점과 무관하게 줄 단위 출력을 저장 (rescore.py로 재채점 가능)
+    prefilter = None if gate_stats is None else {"threshold": gate_threshold, **gate_stats}
+    saved = write_outputs(
+        output_path, "realtime_simulation", model_name,
+        [(ctx_size, config_label(ctx_size, token_budget)) for ctx_size in context_sizes],
+        outputs, llm.ledger,
+        settings={
+            "context_sizes": context_sizes,
+            "context_token_budget": token_budget,
+            "prefilter": prefilter,
+        },
+    )
+
+    if generate_only:
+        # 채점 없이 종료: 응답은 outputs 파일(rescore로 채점)과 --cache, 호출 기록은 ledger에 남음
+        print_ledger_summary(llm.ledger.write(output_path, experiment="realtime_simulation"))
+        print_rescore_hint([saved])
+        return
+
+    # Per-config results from the streamed scores (identical pairs scored once)
+    sweep_results = evaluator.sweep_results(case_sweep(cases, outputs, context_sizes))
+    output = report_results(
+        cases, outputs, sweep_results, context_sizes, model_name, token_budget, prefilter
+    )
+    print_eval_timing(evaluator.metrics)
+    print_overlap(evaluator)
+
+    # Save
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
     with open(output_path, "w", encoding="utf-8") as f:
         json.dump(output, f, ensure_ascii=False, indent=2)
     print(f"\nResults saved to {output_path}")
 
+    # Token / latency / cost ledger next to the results JSON
+    print_ledger_summary(llm.ledger.write(output_path, experiment="realtime_simulation"))
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -153,6 +323,24 @@ if __name__ == "__main__":
     parser.add_argument("--context-sizes", nargs="+", default=[0, 1, 20, 50, 100, "max"])
     parser.add_argument("--model", default="gpt-3.5-turbo")
     parser.add_argument("--output", default="results/realtime_sim_results.json")
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Stream responses and stop at an early 'None' verdict (live-display latency path)",
+    )
+    parser.add_argument(
+        "--context-token-budget", type=int, default=None,
+        help="Keep only the most recent context pairs that fit this many tokens",
+    )
+    parser.add_argument(
+        "--gate-threshold", type=float, default=None,
+        help="Answer lines locally as 'None.' when the pre-filter's P(None) >= this",
+    )
+    parser.add_argument(
+        "--shard", type=parse_shard, default=None,
+        help="Run only shard i of N of the cases (i/N, 0-based; every N-th case from i)",
+    )
+    add_llm_arguments(parser)
+    add_eval_arguments(parser)
     args = parser.parse_args()
 
     # Parse context sizes (handle "max" string)
@@ -163,4 +351,12 @@ if __name__ == "__main__":
     run_realtime_simulation(
         args.transcript_dir, args.annotation_dir,
         ctx_sizes, args.model, args.output,
+        llm=client_from_args(args, AsyncLLMClient),
+        max_in_flight=args.max_in_flight,
+        metrics=partial(metrics_from_args, args),
+        stream=args.stream,
+        token_budget=args.context_token_budget,
+        gate_threshold=args.gate_threshold,
+        generate_only=args.generate_only,
+        shard=args.shard,
     )
@@ -0,0 +1,147 @@
+"""
+Rescore saved experiment outputs without calling the LLM.
+
+Every experiment saves its raw per-line / per-chunk / per-case outputs next
+to its results JSON (<results>_outputs.json, see src/utils/outputs.py).
+This entry point recomputes detection metrics (sweep_detection) and
+summarization metrics from those files and the annotations, so a changed
+metric setting does not mean re-running generation:
+
+    python -m src.experiments.rescore results/realtime_sim_results_outputs.json
+    python -m src.experiments.rescore results/*_outputs.json --bertscore-model roberta-base
+
+No LLM client is created and the ledger is left untouched; each results
+JSON is rewritten in the same format its experiment produces (or written
+to --output for a single input). All inputs share one SummarizationMetrics.
+"""
+
+import json
+import argparse
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.utils.data_loader import ClinicalCase, load_all_cases, parse_shard
+from src.utils.outputs import load_outputs, results_path
+from src.evaluation.metrics import (
+    SummarizationMetrics,
+    add_eval_arguments,
+    metrics_from_args,
+    print_eval_timing,
+)
+from src.experiments import baseline, input_lines, realtime_sim, context_agg
+
+# 줄 단위 출력을 저장하는 실험 (탐지 지표 계산 시 줄 수가 일치해야 함)
+LINE_LEVEL = ("realtime_simulation", "context_aggregation")
+
+
+def _select_cases(
+    cases: list[ClinicalCase], outputs: dict, experiment: str, path: str | Path
+) -> list[ClinicalCase]:
+    """Cases present in the outputs file, in load order (as in the original run)."""
+    saved = {case_id for _, case_id in outputs}
+    by_id = {case.id: case for case in cases}
+    missing = sorted(saved - by_id.keys())
+    if missing:
+        raise ValueError(f"{path}: cases not found in the annotation data: {missing}")
+    selected = [case for case in cases if case.id in saved]
+    if experiment in LINE_LEVEL:
+        for (key, case_id), case_outputs in outputs.items():
+            if len(case_outputs) != len(by_id[case_id].lines):
+                raise ValueError(
+                    f"{path}: {case_id} [{key}] has {len(case_outputs)} outputs "
+                    f"for {len(by_id[case_id].lines)} lines"
+                )
+    return selected
+
+
+def experiment_sweep(
+    experiment: str, cases: list[ClinicalCase], outputs: dict, settings: dict
+) -> dict:
+    """The experiment's {config: (predictions, references)} from its saved outputs."""
+    if experiment == "baseline":
+        summaries = {case_id: case_outputs[0] for (_, case_id), case_outputs in outputs.items()}
+        return baseline.case_sweep(cases, summaries)
+    if experiment == "input_lines":
+        return input_lines.case_sweep(cases, outputs, settings["chunk_sizes"])
+    if experiment == "realtime_simulation":
+        return realtime_sim.case_sweep(cases, outputs, settings["context_sizes"])
+    if experiment == "context_aggregation":
+        return context_agg.case_sweep(cases, outputs, len(settings["configs"]))
+    raise ValueError(f"unknown experiment {experiment!r}")
+
+
+def experiment_report(
+    experiment: str,
+    cases: list[ClinicalCase],
+    outputs: dict,
+    sweep: dict,
+    sweep_results: dict,
+    model: str,
+    settings: dict,
+) -> dict:
+    """The results JSON the experiment's own script writes."""
+    if experiment == "baseline":
+        return baseline.report_results(sweep, sweep_results, model)
+    if experiment == "input_lines":
+        return input_lines.report_results(sweep_results, settings["chunk_sizes"], model)
+    if experiment == "realtime_simulation":
+        return realtime_sim.report_results(
+            cases, outputs, sweep_results, settings["context_sizes"], model,
+            settings["context_token_budget"], settings["prefilter"],
+        )
+    if experiment == "context_aggregation":
+        return context_agg.report_results(
+            cases, outputs, sweep_results, settings["configs"], model, settings["prefilter"]
+        )
+    raise ValueError(f"unknown experiment {experiment!r}")
+
+
+def rescore(
+    outputs_file: str | Path, cases: list[ClinicalCase], metrics: SummarizationMetrics
+) -> dict:
+    """Results JSON of the experiment recorded in outputs_file."""
+    header, outputs = load_outputs(outputs_file)
+    experiment, model, settings = header["experiment"], header["model"], header["settings"]
+    cases = _select_cases(cases, outputs, experiment, outputs_file)
+
+    sweep = experiment_sweep(experiment, cases, outputs, settings)
+    return experiment_report(
+        experiment, cases, outputs, sweep, metrics.compute_sweep(sweep), model, settings
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute metrics from saved LLM outputs")
+    parser.add_argument("outputs", nargs="+", help="<results>_outputs.json file(s)")
+    parser.add_argument("--transcript-dir", default="data/processed")
+    parser.add_argument("--annotation-dir", default="data/annotations")
+    parser.add_argument(
+        "--shard", type=parse_shard, default=None,
+        help="Load only shard i of N of the cases (the shard the outputs were generated for)",
+    )
+    parser.add_argument(
+        "--output", default=None,
+        help="Results path (single input only; default: the results JSON next to the outputs file)",
+    )
+    add_eval_arguments(parser)
+    args = parser.parse_args()
+    if args.generate_only:
+        parser.error("--generate-only does not apply to rescoring")
+    if args.output is not None and len(args.outputs) > 1:
+        parser.error("--output needs a single outputs file")
+
+    cases = load_all_cases(args.transcript_dir, args.annotation_dir, args.shard)
+    metrics = metrics_from_args(args)
+
+    for outputs_file in args.outputs:
+        print(f"\nRescoring {outputs_file}")
+        output = rescore(outputs_file, cases, metrics)
+        output_path = Path(args.output or results_path(outputs_file))
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
+        print(f"\nResults saved to {output_path}")
+
+    print_eval_timing(metrics)
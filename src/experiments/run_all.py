@@ -0,0 +1,335 @@
+"""
+Unified sweep runner driven by configs/config.yaml.
+
+scripts/run_all.sh used to start the four experiment scripts one after the
+other, each loading the data, creating its own LLM client (connection
+pool, response cache) and loading the evaluation models again. This
+runner expands every experiment of the config into one execution plan and
+runs it in a single process:
+
+  - cases are loaded once (and the pre-filter gates fitted once per
+    threshold),
+  - one AsyncLLMClient per model, all sharing one backend, response cache,
+    rate limiter and ledger, with every (experiment, config, case) chain
+    scheduled together on one event loop (run_chains), and
+  - one StreamingEvaluator: the metric models load once in the background,
+    and identical (prediction, reference) pairs across experiments are
+    scored once.
+
+It writes the same four result files (+ outputs and ledger files) as the
+individual scripts:
+
+    python -m src.experiments.run_all --cache results/llm_cache.sqlite
+    python -m src.experiments.run_all --experiments realtime_sim context_agg --backend standin
+
+Experiment settings come from the `experiments` section (see
+src/experiments/plan.py: sweep_from_config), each model's max_tokens from
+`models`, the metrics and evaluation models from `evaluation`, data
+directories from `data` and the results directory from `output`;
+command-line options override all but the first.
+"""
+
+import json
+import time
+import asyncio
+import argparse
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+import yaml
+
+from src.utils.llm_client import (
+    AsyncLLMClient,
+    add_llm_arguments,
+    client_from_args,
+    print_cache_stats,
+    print_stream_stats,
+)
+from src.utils.data_loader import ClinicalCase, load_all_cases, parse_shard
+from src.utils.scheduler import run_chains
+from src.utils.ledger import print_ledger_summary
+from src.utils.outputs import print_rescore_hint, write_outputs
+from src.utils.prefilter import cross_fitted_gates, gate_report, print_gate_report
+from src.evaluation.metrics import METRICS, add_eval_arguments, metrics_from_args, print_eval_timing
+from src.evaluation.detection import case_prediction
+from src.evaluation.pipeline import StreamingEvaluator, print_overlap
+from src.experiments import realtime_sim, context_agg
+from src.experiments.plan import build_chains, experiment_model, model_config, sweep_from_config
+from src.experiments.rescore import experiment_report, experiment_sweep
+
+# config.yaml 섹션 → (ledger/outputs 실험 이름, 결과 파일)
+EXPERIMENTS = {
+    "baseline": ("baseline", "baseline_results.json"),
+    "input_lines": ("input_lines", "input_lines_results.json"),
+    "realtime_sim": ("realtime_simulation", "realtime_sim_results.json"),
+    "context_agg": ("context_aggregation", "context_agg_results.json"),
+}
+
+
+@dataclass
+class Step:
+    """One experiment of the execution plan."""
+
+    section: str  # key in the config's `experiments` section
+    experiment: str  # experiment name in the ledger and outputs file
+    model: str
+    configs: list  # sweep keys: chunk sizes, context sizes, context_agg configs
+    output_path: Path
+    options: dict = field(default_factory=dict)  # gate_threshold, stream, context_token_budget
+    max_tokens: int | None = None  # 모델 설정의 completion 상한
+
+    def run_key(self, cfg_idx: int, cfg):
+        """Sweep key the experiment's outputs are stored under (config index for context_agg)."""
+        return cfg_idx if self.experiment == "context_aggregation" else cfg
+
+
+def build_plan(config: dict, results_dir: str | Path, only: list[str] | None = None) -> list[Step]:
+    """Steps for the experiments in config (or only those sections), in EXPERIMENTS order."""
+    sweep = sweep_from_config(config)
+    steps = []
+    for section, (experiment, filename) in EXPERIMENTS.items():
+        if experiment not in sweep or (only and section not in only):
+            continue
+        options = config["experiments"][section] or {}
+        configs = sweep[experiment]
+        if experiment == "realtime_simulation":
+            configs = [ctx for ctx, _ in configs]  # 토큰 예산은 options로
+        steps.append(Step(
+            section=section,
+            experiment=experiment,
+            model=experiment_model(config, experiment),
+            configs=configs,
+            output_path=Path(results_dir) / filename,
+            options={
+                "gate_threshold": options.get("gate_threshold"),
+                "stream": bool(options.get("stream", False)),
+                "context_token_budget": options.get("context_token_budget"),
+            },
+            max_tokens=model_config(config, experiment).get("max_tokens"),
+        ))
+    return steps
+
+
+def shared_clients(
+    args: argparse.Namespace, models: dict[str, int | None]
+) -> dict[str, AsyncLLMClient]:
+    """model → client; all share the first client's backend, cache, limiter and ledger.
+
+    models maps each model name to its configured max_tokens (--max-tokens overrides).
+    """
+    names = list(models)
+    first = client_from_args(argparse.Namespace(**{
+        **vars(args), "model": names[0], "max_tokens": args.max_tokens or models[names[0]],
+    }), AsyncLLMClient)
+    clients = {names[0]: first}
+    for model in names[1:]:
+        clients[model] = AsyncLLMClient(
+            model=model,
+            temperature=first.temperature,
+            max_tokens=args.max_tokens or models[model],
+            backend=first.backend,
+            cache=first.cache,
+            limiter=first.limiter,
+            retry=first.retry,
+            timeout=first.timeout,
+            ledger=first.ledger,
+            dedup=first.flights is not None,
+        )
+    return clients
+
+
+def step_chains(step: Step, llm: AsyncLLMClient, cases: list[ClinicalCase], gates: dict) -> dict:
+    """The chains the experiment's own script schedules, keyed (experiment, run key, case_id)."""
+    configs = step.configs
+    if step.experiment == "realtime_simulation":
+        configs = [(ctx, step.options["context_token_budget"]) for ctx in step.configs]
+    chains = build_chains(llm, step.experiment, configs, cases, step.options["stream"], gates)
+    return {
+        (step.experiment, step.run_key(cfg_idx, step.configs[cfg_idx]), case_id): chain
+        for (cfg_idx, case_id), chain in chains.items()
+    }
+
+
+def step_outputs(step: Step, outputs: dict) -> dict:
+    """{(run key, case_id): outputs} of one step, in the outputs-file layout."""
+    selected = {key[1:]: value for key, value in outputs.items() if key[0] == step.experiment}
+    if step.experiment == "baseline":
+        return {key: [summary] for key, summary in selected.items()}
+    return selected
+
+
+def step_runs(step: Step) -> list[tuple]:
+    """(run key, ledger config label) pairs, as each experiment passes to write_outputs."""
+    if step.experiment == "baseline":
+        return [(cfg, cfg) for cfg in step.configs]
+    if step.experiment == "input_lines":
+        return [(size, str(size)) for size in step.configs]
+    if step.experiment == "realtime_simulation":
+        budget = step.options["context_token_budget"]
+        return [(ctx, realtime_sim.config_label(ctx, budget)) for ctx in step.configs]
+    return [(cfg_idx, context_agg.config_label(cfg)) for cfg_idx, cfg in enumerate(step.configs)]
+
+
+def step_settings(step: Step, prefilter: dict | None) -> dict:
+    """The outputs-file settings each experiment records (read back by rescore)."""
+    if step.experiment == "input_lines":
+        return {"chunk_sizes": step.configs}
+    if step.experiment == "realtime_simulation":
+        return {
+            "context_sizes": step.configs,
+            "context_token_budget": step.options["context_token_budget"],
+            "prefilter": prefilter,
+        }
+    if step.experiment == "context_aggregation":
+        return {"configs": step.configs, "prefilter": prefilter}
+    return {}
+
+
+def run_all(
+    steps: list[Step],
+    cases: list[ClinicalCase],
+    clients: dict[str, AsyncLLMClient],
+    max_in_flight: int = 8,
+    metrics=None,
+    generate_only: bool = False,
+):
+    """Run every step's chains on one event loop, then write each step's files."""
+    # 같은 threshold의 gate는 실험 간에 한 번만 학습
+    gate_sets = {}
+    for step in steps:
+        threshold = step.options["gate_threshold"]
+        if threshold is not None and threshold not in gate_sets:
+            gates = cross_fitted_gates(cases, threshold)
+            stats = gate_report(cases, gates)
+            print_gate_report(stats, threshold)
+            gate_sets[threshold] = (gates, stats)
+
+    # 생성 중에 평가 모델을 미리 로드하고, 끝난 case부터 채점 (모든 실험이 공유)
+    evaluator = None if generate_only else StreamingEvaluator(metrics)
+    references = {case.id: case.index.reference for case in cases}
+
+    def on_result(key, result):
+        if evaluator is not None:
+            prediction = result if key[0] == "baseline" else case_prediction(result)
+            evaluator.submit(prediction, references[key[2]])
+
+    chains = {}
+    for step in steps:
+        gates = gate_sets.get(step.options["gate_threshold"], ({}, None))[0]
+        chains.update(step_chains(step, clients[step.model], cases, gates))
+    print(f"Execution plan: {len(steps)} experiments, {len(chains)} chains on one event loop")
+    outputs = asyncio.run(
+        run_chains(chains, max_in_flight, desc="All experiments", on_result=on_result)
+    )
+    for llm in clients.values():
+        print_cache_stats(llm)
+    first = next(iter(clients.values()))  # 모든 client가 cache와 ledger를 공유
+    ledger = first.ledger
+    print_stream_stats(first, experiment="realtime_simulation")
+
+    # 채점과 무관하게 실험별 출력을 저장 (rescore.py로 재채점 가능)
+    saved = []
+    for step in steps:
+        threshold = step.options["gate_threshold"]
+        gate_stats = gate_sets[threshold][1] if threshold is not None else None
+        prefilter = None if gate_stats is None else {"threshold": threshold, **gate_stats}
+        settings = step_settings(step, prefilter)
+        results = step_outputs(step, outputs)
+        path = write_outputs(
+            step.output_path, step.experiment, step.model, step_runs(step),
+            results, ledger, settings=settings,
+        )
+        saved.append((step, results, settings, path))
+
+    if generate_only:
+        # 채점 없이 종료: 응답은 outputs 파일(rescore로 채점)과 --cache, 호출 기록은 ledger에 남음
+        for step in steps:
+            print_ledger_summary(ledger.write(step.output_path, experiment=step.experiment))
+        print_rescore_hint([path for *_, path in saved])
+        return
+
+    # 모든 실험의 pair를 먼저 제출해 한 번에 채점 (실험 간 동일 pair는 한 번만)
+    sweeps = [experiment_sweep(step.experiment, cases, results, settings)
+              for step, results, settings, _ in saved]
+    for sweep in sweeps:
+        for predictions, refs in sweep.values():
+            for pair in zip(predictions, refs):
+                evaluator.submit(*pair)
+
+    for (step, results, settings, _), sweep in zip(saved, sweeps):
+        print(f"\n=== {step.experiment} ===")
+        output = experiment_report(
+            step.experiment, cases, results, sweep, evaluator.sweep_results(sweep),
+            step.model, settings,
+        )
+        step.output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(step.output_path, "w", encoding="utf-8") as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
+        print(f"\nResults saved to {step.output_path}")
+        print_ledger_summary(ledger.write(step.output_path, experiment=step.experiment))
+
+    print_eval_timing(evaluator.metrics)
+    print_overlap(evaluator)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run every experiment in config.yaml in one process")
+    parser.add_argument("--config", default="configs/config.yaml")
+    parser.add_argument(
+        "--experiments", nargs="+", choices=list(EXPERIMENTS), default=None,
+        help="Run only these config.yaml experiment sections (default: all)",
+    )
+    parser.add_argument("--transcript-dir", default=None, help="Default: data.processed_dir")
+    parser.add_argument("--annotation-dir", default=None, help="Default: data.annotations_dir")
+    parser.add_argument("--results-dir", default=None, help="Default: output.results_dir")
+    parser.add_argument(
+        "--shard", type=parse_shard, default=None,
+        help="Run only shard i of N of the cases (i/N, 0-based; every N-th case from i)",
+    )
+    add_llm_arguments(parser)
+    add_eval_arguments(parser)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    data = config.get("data", {})
+    # 평가 설정: 명령행에서 지정하지 않은 항목은 config의 evaluation 섹션
+    evaluation = config.get("evaluation") or {}
+    for key in ("metrics", "bertscore_model", "semscore_model"):
+        if getattr(args, key) is None:
+            setattr(args, key, evaluation.get(key))
+    unknown = set(args.metrics or []) - set(METRICS)
+    if unknown:
+        parser.error(f"unknown evaluation.metrics {sorted(unknown)} (choose from {list(METRICS)})")
+    results_dir = args.results_dir or config.get("output", {}).get("results_dir", "results")
+    steps = build_plan(config, results_dir, args.experiments)
+    if not steps:
+        parser.error(f"no experiments to run in {args.config}")
+    for step in steps:
+        print(f"  {step.experiment} ({step.model}): {len(step.configs)} configs → {step.output_path}")
+
+    cases = load_all_cases(
+        args.transcript_dir or data.get("processed_dir", "data/processed"),
+        args.annotation_dir or data.get("annotations_dir", "data/annotations"),
+        args.shard,
+    )
+    if not cases:
+        print("ERROR: No cases found.")
+        sys.exit(1)
+
+    models = {}  # model → max_tokens (같은 모델은 첫 실험의 설정)
+    for step in steps:
+        models.setdefault(step.model, step.max_tokens)
+    run_all(
+        steps, cases,
+        shared_clients(args, models),
+        max_in_flight=args.max_in_flight,
+        metrics=partial(metrics_from_args, args),
+        generate_only=args.generate_only,
+    )
+    print(f"\nAll experiments complete in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,235 @@
+"""
+Chat-completion backends used by LLMClient / AsyncLLMClient.
+
+A backend takes a request dict (model, temperature, max_tokens, messages,
+timeout, optionally stop) and returns a ChatResult. stream()/astream() yield
+the response incrementally as ChatResult chunks (text deltas; the final
+chunk may carry token usage); closing the iterator cancels the request.
+Available backends:
+
+  - OpenAIBackend:    OpenAI API, or any OpenAI-compatible server via base_url
+                      (e.g. the local stand-in in src/utils/standin_server.py)
+  - ReplayBackend:    serves responses from a recorded JSONL cassette, offline
+  - RecordingBackend: wraps another backend and appends every exchange to a
+                      cassette that ReplayBackend can read back
+"""
+
+import os
+import json
+import asyncio
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Iterator
+
+from src.utils.cache import request_key
+
+
+@dataclass
+class ChatResult:
+    content: str
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+
+    @property
+    def total_tokens(self) -> int | None:
+        if self.prompt_tokens is None or self.completion_tokens is None:
+            return None
+        return self.prompt_tokens + self.completion_tokens
+
+
+class RecordingMiss(KeyError):
+    """Raised by ReplayBackend when a request is not in the cassette."""
+
+
+class ChatBackend:
+    """Base class: override complete(); the other methods have fallbacks.
+
+    acomplete() defaults to a worker thread; stream()/astream() default to
+    a single chunk holding the full response.
+    """
+
+    name = "base"
+
+    def complete(self, request: dict) -> ChatResult:
+        raise NotImplementedError
+
+    async def acomplete(self, request: dict) -> ChatResult:
+        return await asyncio.to_thread(self.complete, request)
+
+    def stream(self, request: dict) -> Iterator[ChatResult]:
+        yield self.complete(request)
+
+    async def astream(self, request: dict) -> AsyncIterator[ChatResult]:
+        yield await self.acomplete(request)
+
+
+def _request_id(request: dict) -> str:
+    """Content key of a request (timeout does not affect the response)."""
+    extra = {
+        k: v for k, v in request.items()
+        if k not in ("model", "temperature", "max_tokens", "messages", "timeout")
+    }
+    return request_key(
+        request["model"], request["temperature"], request["max_tokens"], request["messages"],
+        **extra,
+    )
+
+
+class OpenAIBackend(ChatBackend):
+    """OpenAI chat-completions API (or an OpenAI-compatible server)."""
+
+    name = "openai"
+
+    def __init__(self, base_url: str | None = None, api_key: str | None = None):
+        from openai import OpenAI, AsyncOpenAI
+
+        api_key = api_key or os.environ.get("OPENAI_API_KEY")
+        if not api_key:
+            if base_url is None:
+                raise ValueError(
+                    "OPENAI_API_KEY 환경변수가 설정되지 않았습니다.\n"
+                    "터미널에서 실행: export OPENAI_API_KEY='sk-your-key'"
+                )
+            api_key = "standin"  # 로컬 호환 서버는 키를 검사하지 않음
+        # 재시도는 RetryPolicy가 담당하므로 SDK 자체 재시도는 끔
+        self.client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        self.async_client = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+
+    @staticmethod
+    def _result(response) -> ChatResult:
+        usage = response.usage
+        return ChatResult(
+            content=response.choices[0].message.content.strip(),
+            prompt_tokens=usage.prompt_tokens if usage else None,
+            completion_tokens=usage.completion_tokens if usage else None,
+        )
+
+    def complete(self, request: dict) -> ChatResult:
+        return self._result(self.client.chat.completions.create(**request))
+
+    async def acomplete(self, request: dict) -> ChatResult:
+        return self._result(await self.async_client.chat.completions.create(**request))
+
+    @staticmethod
+    def _chunk(chunk) -> ChatResult:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        usage = chunk.usage
+        return ChatResult(
+            content=delta or "",
+            prompt_tokens=usage.prompt_tokens if usage else None,
+            completion_tokens=usage.completion_tokens if usage else None,
+        )
+
+    def stream(self, request: dict) -> Iterator[ChatResult]:
+        response = self.client.chat.completions.create(
+            **request, stream=True, stream_options={"include_usage": True}
+        )
+        try:
+            for chunk in response:
+                yield self._chunk(chunk)
+        finally:
+            response.close()  # 중간에 멈추면 연결을 끊어 생성을 취소
+
+    async def astream(self, request: dict) -> AsyncIterator[ChatResult]:
+        response = await self.async_client.chat.completions.create(
+            **request, stream=True, stream_options={"include_usage": True}
+        )
+        try:
+            async for chunk in response:
+                yield self._chunk(chunk)
+        finally:
+            await response.close()
+
+
+class ReplayBackend(ChatBackend):
+    """Serve responses from a JSONL cassette written by RecordingBackend."""
+
+    name = "replay"
+
+    def __init__(self, cassette_path: str):
+        self.records = {}
+        with open(cassette_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    rec = json.loads(line)
+                    self.records[rec["key"]] = rec
+
+    def complete(self, request: dict) -> ChatResult:
+        key = _request_id(request)
+        rec = self.records.get(key)
+        if rec is None:
+            raise RecordingMiss(f"Request not in cassette: {key}")
+        return ChatResult(rec["content"], rec.get("prompt_tokens"), rec.get("completion_tokens"))
+
+    async def acomplete(self, request: dict) -> ChatResult:
+        return self.complete(request)
+
+
+class RecordingBackend(ChatBackend):
+    """Pass requests to `inner` and append each exchange to a cassette."""
+
+    def __init__(self, inner: ChatBackend, cassette_path: str):
+        self.inner = inner
+        self.name = f"recording({inner.name})"
+        self.path = Path(cassette_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _record(self, request: dict, result: ChatResult, partial: bool = False):
+        rec = {
+            "key": _request_id(request),
+            "model": request["model"],
+            "messages": request["messages"],
+            "content": result.content,
+            "prompt_tokens": result.prompt_tokens,
+            "completion_tokens": result.completion_tokens,
+        }
+        if partial:
+            rec["partial"] = True  # 스트림이 중간에 닫힘: 그때까지 받은 텍스트
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+    def complete(self, request: dict) -> ChatResult:
+        result = self.inner.complete(request)
+        self._record(request, result)
+        return result
+
+    async def acomplete(self, request: dict) -> ChatResult:
+        result = await self.inner.acomplete(request)
+        self._record(request, result)
+        return result
+
+    @staticmethod
+    def _received(parts: list[str], usage: ChatResult, partial: bool = False) -> ChatResult:
+        # 중간에 끊긴 텍스트는 그대로 ("None\n"의 줄바꿈이 verdict를 결정)
+        text = "".join(parts)
+        return ChatResult(text if partial else text.strip(), usage.prompt_tokens, usage.completion_tokens)
+
+    # 클라이언트가 early "None"에서 스트림을 닫아도 (GeneratorExit) 받은 텍스트까지 기록,
+    # 그래야 replay 때 같은 verdict가 나옴. inner 오류로 끊긴 응답은 기록하지 않음.
+    def stream(self, request: dict) -> Iterator[ChatResult]:
+        parts, usage = [], ChatResult("")
+        try:
+            for chunk in self.inner.stream(request):
+                parts.append(chunk.content)
+                if chunk.prompt_tokens is not None:
+                    usage = chunk
+                yield chunk
+        except GeneratorExit:
+            self._record(request, self._received(parts, usage, partial=True), partial=True)
+            raise
+        self._record(request, self._received(parts, usage))
+
+    async def astream(self, request: dict) -> AsyncIterator[ChatResult]:
+        parts, usage = [], ChatResult("")
+        try:
+            async for chunk in self.inner.astream(request):
+                parts.append(chunk.content)
+                if chunk.prompt_tokens is not None:
+                    usage = chunk
+                yield chunk
+        except GeneratorExit:
+            self._record(request, self._received(parts, usage, partial=True), partial=True)
+            raise
+        self._record(request, self._received(parts, usage))
@@ -0,0 +1,205 @@
+"""
+Persistent response cache for LLM calls.
+
+Responses are stored in a SQLite file keyed on a SHA-256 hash of the full
+request (model, temperature, max_tokens, messages). With temperature=0 a
+re-run of the same sweep is served entirely from disk.
+
+Eviction is by age (max_age_days) and size (max_entries / max_bytes, least
+recently used first). In replay mode the database is opened read-only and
+a miss is an error instead of an API call.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+
+class CacheMiss(KeyError):
+    """Raised in replay mode when a request is not in the cache."""
+
+
+class CachedResponse(NamedTuple):
+    content: str
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+
+
+def request_key(
+    model: str, temperature: float, max_tokens: int, messages: list[dict], **extra
+) -> str:
+    """Stable content hash of a chat-completions request."""
+    payload = {
+        "model": model,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "messages": messages,
+    }
+    payload.update(extra)
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed content-addressed cache of LLM responses."""
+
+    EVICT_EVERY = 500  # put() 호출 N회마다 eviction 수행
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int | None = None,
+        max_bytes: int | None = None,
+        max_age_days: float | None = None,
+        replay: bool = False,
+    ):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+
+        if replay:
+            if not self.path.exists():
+                raise FileNotFoundError(f"Replay cache not found: {self.path}")
+            self._conn = sqlite3.connect(
+                f"file:{self.path}?mode=ro", uri=True, check_same_thread=False
+            )
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed)"
+            )
+            # 이전 버전 캐시 파일에는 usage 컬럼이 없음
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}
+            for col in ("prompt_tokens", "completion_tokens"):
+                if col not in columns:
+                    self._conn.execute(f"ALTER TABLE responses ADD COLUMN {col} INTEGER")
+            self._conn.commit()
+            self.evict()
+
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}
+        self._usage_columns = (
+            "prompt_tokens, completion_tokens" if "prompt_tokens" in columns else "NULL, NULL"
+        )
+
+    def get(self, key: str) -> CachedResponse | None:
+        """Return the cached response (with token usage) for key, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT response, created, {self._usage_columns} "
+                "FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self._expired(row[1]):
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if not self.replay:
+                self._conn.execute(
+                    "UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key)
+                )
+                self._conn.commit()
+            return CachedResponse(row[0], row[2], row[3])
+
+    def put(
+        self,
+        key: str,
+        response: str,
+        model: str | None = None,
+        prompt_tokens: int | None = None,
+        completion_tokens: int | None = None,
+    ):
+        """Store a response. No-op in replay mode."""
+        if self.replay:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, model, response, size, created, accessed, prompt_tokens, completion_tokens) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model, response, len(response.encode("utf-8")), now, now,
+                 prompt_tokens, completion_tokens),
+            )
+            self._conn.commit()
+            self._puts += 1
+        if self._puts % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        """Apply age and size limits. Returns the number of evicted entries."""
+        if self.replay:
+            return 0
+        removed = 0
+        with self._lock:
+            if self.max_age_days is not None:
+                cutoff = time.time() - self.max_age_days * 86400
+                removed += self._conn.execute(
+                    "DELETE FROM responses WHERE created < ?", (cutoff,)
+                ).rowcount
+            if self.max_entries is not None:
+                removed += self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                ).rowcount
+            if self.max_bytes is not None:
+                # 최근 사용 순으로 누적 크기를 세어 한도를 넘는 항목 삭제
+                total = 0
+                stale = []
+                for key, size in self._conn.execute(
+                    "SELECT key, size FROM responses ORDER BY accessed DESC"
+                ):
+                    total += size
+                    if total > self.max_bytes:
+                        stale.append((key,))
+                self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+                removed += len(stale)
+            self._conn.commit()
+        return removed
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current cache size."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _expired(self, created: float) -> bool:
+        if self.max_age_days is None:
+            return False
+        return created < time.time() - self.max_age_days * 86400
@@ -0,0 +1,312 @@
+"""
+Binary columnar corpus pack.
+
+The JSON layouts (data/processed + data/annotations, or a packed JSONL
+file) are parsed text on every run, which dominates start-up on large
+corpora. `pack` converts any case source into one file of column arrays:
+
+    case_id_heap / case_id_offsets       case ids (UTF-8 heap + byte offsets)
+    line_starts                          case → first line (num_cases + 1)
+    speaker                              one code per line (header "speakers")
+    text_heap / text_bytes / text_chars  line texts: one UTF-8 span per case,
+                                         char offset of each line within it
+    annotated                            CaseIndex bitmap, one byte per line
+    ann_starts                           case → first annotation
+    ann_line / ann_type                  annotation line index and type code
+    summary_heap / summary_offsets       annotation summaries
+
+A JSON header (after an 8-byte magic) stores the code tables, each
+column's dtype / offset / length and a SHA-256 of all column bytes, the
+corpus content hash. PackedCorpus memory-maps the file: opening costs one
+header parse regardless of corpus size, and a case is decoded only when it
+is accessed (a shard reads only its own cases); load_all_cases() returns a
+PackedCases sequence that keeps each case once decoded.
+
+    python -m src.utils.corpus_pack --transcript-dir data/processed \\
+        --annotation-dir data/annotations --output data/corpus.pack
+
+iter_cases() / load_all_cases() recognise a pack file by its magic, so
+--transcript-dir data/corpus.pack works in every experiment.
+"""
+
+import json
+import mmap
+import hashlib
+import argparse
+from array import array
+from pathlib import Path
+from typing import Iterable, Iterator, Sequence
+
+import numpy as np
+
+from src.utils.data_loader import Annotation, CaseIndex, ClinicalCase, LineStore, iter_cases
+
+MAGIC = b"CAPACK\x00\x01"
+FORMAT_VERSION = 1
+_ALIGN = 8
+
+# 컬럼 순서 = 파일 내 배치 순서 = content hash 계산 순서
+COLUMNS = {
+    "case_id_heap": "u1",
+    "case_id_offsets": "<u8",
+    "line_starts": "<u8",
+    "speaker": "u1",
+    "text_heap": "u1",
+    "text_bytes": "<u8",
+    "text_chars": "<u4",
+    "annotated": "u1",
+    "ann_starts": "<u8",
+    "ann_line": "<i4",
+    "ann_type": "u1",
+    "summary_heap": "u1",
+    "summary_offsets": "<u8",
+}
+
+
+def is_pack(path: str | Path) -> bool:
+    """True if path is a corpus pack file (checked by its magic bytes)."""
+    path = Path(path)
+    if not path.is_file():
+        return False
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def _columns(cases: Iterable[ClinicalCase]) -> tuple[dict[str, np.ndarray], list[str], list[str]]:
+    """Column arrays + speaker and annotation type tables for cases."""
+    speakers, types = {}, {}
+    case_ids, text_heap, summary_heap = bytearray(), bytearray(), bytearray()
+    case_id_offsets, line_starts, text_bytes = array("Q", [0]), array("Q", [0]), array("Q", [0])
+    ann_starts, summary_offsets = array("Q", [0]), array("Q", [0])
+    speaker, text_chars, annotated = array("B"), array("I"), array("B")
+    ann_line, ann_type = array("i"), array("B")
+
+    for case in cases:
+        case_ids += case.id.encode("utf-8")
+        case_id_offsets.append(len(case_ids))
+        chars = 0
+        for line in case.lines:
+            speaker.append(speakers.setdefault(line.speaker, len(speakers)))
+            text_chars.append(chars)
+            chars += len(line.text)
+            text_heap += line.text.encode("utf-8")
+        line_starts.append(len(speaker))
+        text_bytes.append(len(text_heap))
+        annotated.extend(case.index.annotated.astype(np.uint8).tolist())
+        for a in case.annotations:
+            ann_line.append(a.line_idx)
+            ann_type.append(types.setdefault(a.type, len(types)))
+            summary_heap += a.summary.encode("utf-8")
+            summary_offsets.append(len(summary_heap))
+        ann_starts.append(len(ann_line))
+    if len(speakers) > 256 or len(types) > 256:
+        raise ValueError("corpus pack supports at most 256 speakers and annotation types")
+
+    raw = {
+        "case_id_heap": case_ids,
+        "case_id_offsets": case_id_offsets,
+        "line_starts": line_starts,
+        "speaker": speaker,
+        "text_heap": text_heap,
+        "text_bytes": text_bytes,
+        "text_chars": text_chars,
+        "annotated": annotated,
+        "ann_starts": ann_starts,
+        "ann_line": ann_line,
+        "ann_type": ann_type,
+        "summary_heap": summary_heap,
+        "summary_offsets": summary_offsets,
+    }
+    # array/bytearray 버퍼를 복사 없이 numpy로 (typecode 크기 = dtype 크기)
+    columns = {name: np.frombuffer(raw[name], dtype=dtype) for name, dtype in COLUMNS.items()}
+    return columns, list(speakers), list(types)
+
+
+def _content_hash(columns: dict[str, np.ndarray], speakers: list[str], types: list[str]) -> str:
+    h = hashlib.sha256()
+    h.update(json.dumps([speakers, types], ensure_ascii=False).encode("utf-8"))
+    for name in COLUMNS:
+        h.update(memoryview(columns[name]).cast("B"))
+    return h.hexdigest()
+
+
+def _pad(n: int) -> int:
+    return -n % _ALIGN
+
+
+def pack_corpus(cases: Iterable[ClinicalCase], path: str | Path) -> dict:
+    """Write cases as a corpus pack; returns the header (with content_hash)."""
+    columns, speakers, types = _columns(cases)
+    header = {
+        "format_version": FORMAT_VERSION,
+        "content_hash": _content_hash(columns, speakers, types),
+        "num_cases": len(columns["line_starts"]) - 1,
+        "num_lines": len(columns["speaker"]),
+        "num_annotations": len(columns["ann_line"]),
+        "speakers": speakers,
+        "types": types,
+        "columns": {},
+    }
+    # 컬럼 오프셋은 헤더 뒤 데이터 영역 기준 (헤더 길이와 무관)
+    offset = 0
+    for name, dtype in COLUMNS.items():
+        header["columns"][name] = [dtype, offset, len(columns[name])]
+        offset += columns[name].nbytes
+        offset += _pad(offset)
+    blob = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    blob += b" " * _pad(len(MAGIC) + 8 + len(blob))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(blob).to_bytes(8, "little"))
+        f.write(blob)
+        for name in COLUMNS:
+            data = columns[name].tobytes()
+            f.write(data)
+            f.write(b"\0" * _pad(len(data)))
+    return header
+
+
+class PackedCorpus(Sequence):
+    """Memory-mapped corpus pack; cases[i] decodes one ClinicalCase on access."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path}: not a corpus pack")
+        size = int.from_bytes(self._mm[len(MAGIC) : len(MAGIC) + 8], "little")
+        base = len(MAGIC) + 8
+        self.header = json.loads(self._mm[base : base + size])
+        version = self.header.get("format_version")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{self.path}: unsupported corpus pack format {version!r}")
+        data = base + size
+        self._columns = {
+            name: np.frombuffer(self._mm, dtype=dtype, count=count, offset=data + offset)
+            for name, (dtype, offset, count) in self.header["columns"].items()
+        }
+        self._speakers = tuple(self.header["speakers"])
+        self._types = self.header["types"]
+        # 케이스 경계는 작으므로 파이썬 리스트로 (원소 접근이 numpy 스칼라보다 빠름)
+        self._line_starts = self._columns["line_starts"].tolist()
+        self._text_bytes = self._columns["text_bytes"].tolist()
+        self._ann_starts = self._columns["ann_starts"].tolist()
+        self._id_offsets = self._columns["case_id_offsets"].tolist()
+        self._summary_offsets = self._columns["summary_offsets"].tolist()
+        self._text_base = data + self.header["columns"]["text_heap"][1]
+        self._summary_base = data + self.header["columns"]["summary_heap"][1]
+        self._id_base = data + self.header["columns"]["case_id_heap"][1]
+
+    @property
+    def content_hash(self) -> str:
+        return self.header["content_hash"]
+
+    def verify(self) -> bool:
+        """Recompute the content hash over the mapped columns."""
+        columns = {name: self._columns[name] for name in COLUMNS}
+        return _content_hash(columns, list(self._speakers), self._types) == self.content_hash
+
+    def __len__(self) -> int:
+        return self.header["num_cases"]
+
+    def case_id(self, i: int) -> str:
+        a, b = self._id_offsets[i], self._id_offsets[i + 1]
+        return self._mm[self._id_base + a : self._id_base + b].decode("utf-8")
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("case index out of range")
+        cols, mm = self._columns, self._mm
+        lo, hi = self._line_starts[i], self._line_starts[i + 1]
+        heap = mm[self._text_base + self._text_bytes[i] : self._text_base + self._text_bytes[i + 1]]
+        heap = heap.decode("utf-8")
+        offsets = array("I", cols["text_chars"][lo:hi].tobytes())
+        offsets.append(len(heap))
+        lines = LineStore(self._speakers, array("B", cols["speaker"][lo:hi].tobytes()), heap, offsets)
+
+        a_lo, a_hi = self._ann_starts[i], self._ann_starts[i + 1]
+        bounds = self._summary_offsets[a_lo : a_hi + 1]
+        base = self._summary_base
+        types = self._types
+        annotations = [
+            Annotation(line_idx, types[code], mm[base + s : base + e].decode("utf-8"))
+            for line_idx, code, s, e in zip(
+                cols["ann_line"][a_lo:a_hi].tolist(),
+                cols["ann_type"][a_lo:a_hi].tolist(),
+                bounds,
+                bounds[1:],
+            )
+        ]
+        index = CaseIndex.build(hi - lo, annotations, annotated=cols["annotated"][lo:hi].astype(bool))
+        return ClinicalCase(id=self.case_id(i), lines=lines, annotations=annotations, index=index)
+
+    def _positions(self, shard: tuple[int, int] | None) -> range:
+        start, step = shard if shard is not None else (0, 1)
+        return range(start, len(self), step)
+
+    def iter_cases(self, shard: tuple[int, int] | None = None) -> Iterator[ClinicalCase]:
+        """Cases in pack order; shard=(i, N) decodes only every N-th case from i."""
+        for i in self._positions(shard):
+            yield self[i]
+
+    def cases(self, shard: tuple[int, int] | None = None) -> "PackedCases":
+        """The cases (of one shard) as a sequence that decodes each case on first access."""
+        return PackedCases(self, self._positions(shard))
+
+
+class PackedCases(Sequence):
+    """Cases of a PackedCorpus, decoded on first access and then kept.
+
+    load_all_cases() returns this for a pack, so loading costs only the
+    header parse; experiments index and iterate it like a list, and each
+    case (with its CaseIndex) is built once.
+    """
+
+    def __init__(self, corpus: PackedCorpus, positions: range):
+        self.corpus = corpus
+        self._positions = positions
+        self._decoded: dict[int, ClinicalCase] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        position = self._positions[i]  # 음수 인덱스/범위 검사는 range가 처리
+        case = self._decoded.get(position)
+        if case is None:
+            case = self._decoded[position] = self.corpus[position]
+        return case
+
+    def __repr__(self) -> str:
+        return f"PackedCases({len(self)} of {len(self.corpus)} cases, {len(self._decoded)} decoded)"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack a corpus into one memory-mappable columnar file")
+    parser.add_argument("--transcript-dir", default="data/processed", help="Case directory or packed .jsonl")
+    parser.add_argument("--annotation-dir", default="data/annotations")
+    parser.add_argument("--output", default="data/corpus.pack")
+    parser.add_argument("--verify", action="store_true", help="Check an existing pack (--output) instead")
+    args = parser.parse_args()
+
+    if args.verify:
+        corpus = PackedCorpus(args.output)
+        ok = corpus.verify()
+        print(f"{args.output}: {len(corpus)} cases, content hash {corpus.content_hash} "
+              f"{'OK' if ok else 'MISMATCH'}")
+        raise SystemExit(0 if ok else 1)
+
+    header = pack_corpus(iter_cases(args.transcript_dir, args.annotation_dir), args.output)
+    print(f"Packed {header['num_cases']} cases ({header['num_lines']} lines, "
+          f"{header['num_annotations']} annotations) into {args.output}")
+    print(f"Content hash: {header['content_hash']}")
@@ -30,62 +30,199 @@ annotation file (data/annotations/case_XX.json):
         ...
     ]
 }
+
+A corpus can also be a single packed JSONL file with one case per line,
+{"id": ..., "lines": [...], "annotations": [...]}; write_corpus_jsonl()
+or `python -m src.utils.data_loader --to-jsonl PATH` converts the two
+directories. iter_cases() yields cases lazily from either layout (the JSONL
+file is memory-mapped) and can keep only shard i of N (--shard i/N). The
+experiments still hold their shard's cases at once (load_all_cases), so
+memory grows with the shard size: split a large corpus into more shards
+to bound it. Each case stores its lines in
+a LineStore: one text heap + offsets and one byte per speaker, instead of
+a TranscriptLine object per line. The JSON layouts are parsed with orjson
+when it is installed. For the fastest start-up, src/utils/corpus_pack.py
+packs a corpus into one memory-mapped columnar file, which iter_cases()
+also accepts.
+
+Every ClinicalCase carries a CaseIndex built once when the case is created:
+annotated-line bitmap, line → annotations map, agenda/detail views and the
+joined reference summary, so experiments do not rebuild them per config.
 """
 
 import json
-import os
+import mmap
+import argparse
+from array import array
 from pathlib import Path
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Sequence
+
+import numpy as np
 
+try:
+    import orjson  # optional dependency: faster parsing of the JSON layouts
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
 
-@dataclass
+
+@dataclass(slots=True)
 class TranscriptLine:
     speaker: str  # "Provider" or "Patient"
     text: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Annotation:
     line_idx: int
     type: str  # "agenda_item" or "detail"
     summary: str
 
 
-@dataclass
+class LineStore(Sequence):
+    """Read-only transcript lines packed into one string heap.
+
+    Indexing returns a TranscriptLine built on access; slicing returns a
+    list of them, so code written against list[TranscriptLine] still works.
+    """
+
+    __slots__ = ("_speakers", "_codes", "_heap", "_offsets")
+
+    def __init__(self, speakers: tuple[str, ...], codes: array, heap: str, offsets: array):
+        self._speakers = speakers  # code → speaker name
+        self._codes = codes  # array('B'), one speaker code per line
+        self._heap = heap  # all line texts concatenated
+        self._offsets = offsets  # array('I'), len(lines) + 1 heap offsets
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[TranscriptLine | dict]) -> "LineStore":
+        speakers, codes, texts, offsets = {}, array("B"), [], array("I", [0])
+        for line in lines:
+            speaker, text = (
+                (line["speaker"], line["text"]) if isinstance(line, dict) else (line.speaker, line.text)
+            )
+            codes.append(speakers.setdefault(speaker, len(speakers)))
+            texts.append(text)
+            offsets.append(offsets[-1] + len(text))
+        return cls(tuple(speakers), codes, "".join(texts), offsets)
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("line index out of range")
+        return TranscriptLine(
+            self._speakers[self._codes[i]], self._heap[self._offsets[i] : self._offsets[i + 1]]
+        )
+
+    def __iter__(self) -> Iterator[TranscriptLine]:
+        speakers, heap, offsets = self._speakers, self._heap, self._offsets
+        for i, code in enumerate(self._codes):
+            yield TranscriptLine(speakers[code], heap[offsets[i] : offsets[i + 1]])
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(other) == len(self) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f"LineStore({len(self)} lines, {len(self._heap)} chars)"
+
+    def texts(self) -> list[str]:
+        return [self._heap[a:b] for a, b in zip(self._offsets, self._offsets[1:])]
+
+
+@dataclass(slots=True)
+class CaseIndex:
+    """Annotation lookups for one case, computed once (see ClinicalCase.index)."""
+
+    annotated: np.ndarray  # bool per line: the line has at least one annotation
+    by_line: dict[int, list[Annotation]]  # line_idx → annotations (a line can have several)
+    agenda_items: list[Annotation]
+    details: list[Annotation]
+    reference: str  # all summaries joined: the case-level reference summary
+
+    @classmethod
+    def build(
+        cls, num_lines: int, annotations: list[Annotation], annotated: np.ndarray | None = None
+    ) -> "CaseIndex":
+        """annotated: the bitmap if already known (stored in a corpus pack)."""
+        by_line = {}
+        for a in annotations:
+            by_line.setdefault(a.line_idx, []).append(a)
+        if annotated is None:
+            annotated = np.zeros(num_lines, dtype=bool)
+            for line_idx in by_line:
+                if 0 <= line_idx < num_lines:
+                    annotated[line_idx] = True
+        return cls(
+            annotated=annotated,
+            by_line=by_line,
+            agenda_items=[a for a in annotations if a.type == "agenda_item"],
+            details=[a for a in annotations if a.type == "detail"],
+            reference=" ".join(a.summary for a in annotations),
+        )
+
+    def at(self, line_idx: int) -> list[Annotation]:
+        """Annotations of one line ([] if none)."""
+        return self.by_line.get(line_idx, [])
+
+
+@dataclass(slots=True)
 class ClinicalCase:
     id: str
-    lines: list[TranscriptLine]
+    lines: Sequence[TranscriptLine]  # LineStore when loaded from disk
     annotations: list[Annotation]
+    index: CaseIndex = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.index is None:
+            self.index = CaseIndex.build(len(self.lines), self.annotations)
+
 
+def parse_shard(spec: str) -> tuple[int, int]:
+    """"i/N" → (i, N) for --shard (0-based shard index)."""
+    try:
+        index, count = (int(x) for x in spec.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {spec!r}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index must be in [0, {count}), got {spec!r}")
+    return index, count
 
-def load_transcript(filepath: str) -> tuple[str, list[TranscriptLine]]:
+
+def _in_shard(position: int, shard: tuple[int, int] | None) -> bool:
+    return shard is None or position % shard[1] == shard[0]
+
+
+def _annotations(records: list[dict]) -> list[Annotation]:
+    return [Annotation(line_idx=a["line_idx"], type=a["type"], summary=a["summary"]) for a in records]
+
+
+def load_transcript(filepath: str) -> tuple[str, LineStore]:
     """Load a single transcript JSON file."""
-    with open(filepath, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    lines = [TranscriptLine(speaker=l["speaker"], text=l["text"]) for l in data["lines"]]
-    return data["id"], lines
+    data = _loads(Path(filepath).read_bytes())
+    return data["id"], LineStore.from_lines(data["lines"])
 
 
 def load_annotations(filepath: str) -> tuple[str, list[Annotation]]:
     """Load a single annotation JSON file."""
-    with open(filepath, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    annotations = [
-        Annotation(line_idx=a["line_idx"], type=a["type"], summary=a["summary"])
-        for a in data["annotations"]
-    ]
-    return data["id"], annotations
+    data = _loads(Path(filepath).read_bytes())
+    return data["id"], _annotations(data["annotations"])
 
 
-def load_all_cases(
-    transcript_dir: str, annotation_dir: str
-) -> list[ClinicalCase]:
-    """Load all clinical cases from directories."""
-    cases = []
-    transcript_dir = Path(transcript_dir)
-    annotation_dir = Path(annotation_dir)
-
-    for t_file in sorted(transcript_dir.glob("*.json")):
+def _iter_directory(
+    transcript_dir: Path, annotation_dir: Path, shard: tuple[int, int] | None
+) -> Iterator[ClinicalCase]:
+    for position, t_file in enumerate(sorted(transcript_dir.glob("*.json"))):
+        if not _in_shard(position, shard):
+            continue  # 다른 shard의 case는 파싱하지 않음
         case_id, lines = load_transcript(str(t_file))
         a_file = annotation_dir / t_file.name
         if a_file.exists():
@@ -93,27 +230,112 @@ def load_all_cases(
         else:
             print(f"Warning: No annotation file for {case_id}")
             annotations = []
-        cases.append(ClinicalCase(id=case_id, lines=lines, annotations=annotations))
+        yield ClinicalCase(id=case_id, lines=lines, annotations=annotations)
+
+
+def _iter_jsonl(path: Path, shard: tuple[int, int] | None) -> Iterator[ClinicalCase]:
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            return  # 빈 파일은 mmap 불가
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            position = 0
+            for raw in iter(mm.readline, b""):
+                if not raw.strip():
+                    continue
+                if _in_shard(position, shard):
+                    data = _loads(raw)
+                    yield ClinicalCase(
+                        id=data["id"],
+                        lines=LineStore.from_lines(data["lines"]),
+                        annotations=_annotations(data.get("annotations", [])),
+                    )
+                position += 1
+
+
+def iter_cases(
+    source: str,
+    annotation_dir: str | None = None,
+    shard: tuple[int, int] | None = None,
+) -> Iterator[ClinicalCase]:
+    """Yield cases lazily from a transcript directory (+ annotation_dir), a packed .jsonl
+    file or a corpus pack (src/utils/corpus_pack.py).
 
-    print(f"Loaded {len(cases)} clinical cases")
+    shard=(i, N) keeps every N-th case starting at i (in file order), so N
+    processes given i = 0..N-1 cover the corpus exactly once.
+    """
+    from src.utils.corpus_pack import PackedCorpus, is_pack  # corpus_pack imports this module
+
+    path = Path(source)
+    if is_pack(path):
+        yield from PackedCorpus(path).iter_cases(shard)
+    elif path.is_file():
+        yield from _iter_jsonl(path, shard)
+    else:
+        yield from _iter_directory(path, Path(annotation_dir or path), shard)
+
+
+def load_all_cases(
+    transcript_dir: str, annotation_dir: str, shard: tuple[int, int] | None = None
+) -> Sequence[ClinicalCase]:
+    """Load all clinical cases (of one shard) from directories, a .jsonl file or a corpus pack.
+
+    A list, except for a corpus pack: then a PackedCases sequence that
+    decodes each case on first access (opening costs one header parse).
+    """
+    from src.utils.corpus_pack import PackedCorpus, is_pack
+
+    if is_pack(transcript_dir):
+        cases = PackedCorpus(transcript_dir).cases(shard)
+    else:
+        cases = list(iter_cases(transcript_dir, annotation_dir, shard))
+    suffix = f" (shard {shard[0]}/{shard[1]})" if shard is not None else ""
+    print(f"Loaded {len(cases)} clinical cases{suffix}")
     return cases
 
 
-def format_transcript(lines: list[TranscriptLine]) -> str:
+def write_corpus_jsonl(cases: Iterable[ClinicalCase], path: str) -> int:
+    """Write cases as a packed JSONL corpus (one case per line); returns the case count."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for case in cases:
+            record = {
+                "id": case.id,
+                "lines": [{"speaker": l.speaker, "text": l.text} for l in case.lines],
+                "annotations": [
+                    {"line_idx": a.line_idx, "type": a.type, "summary": a.summary}
+                    for a in case.annotations
+                ],
+            }
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            n += 1
+    return n
+
+
+def format_transcript(lines: Sequence[TranscriptLine]) -> str:
     """Format transcript lines into a single string for baseline experiment."""
     return "\n".join(f"[{l.speaker}] {l.text}" for l in lines)
 
 
 def chunk_lines(
-    lines: list[TranscriptLine], chunk_size: int
+    lines: Sequence[TranscriptLine], chunk_size: int
 ) -> list[list[TranscriptLine]]:
     """Split transcript lines into fixed-size chunks for input_lines experiment."""
     return [lines[i : i + chunk_size] for i in range(0, len(lines), chunk_size)]
 
 
-def get_ground_truth_for_line(annotations: list[Annotation], line_idx: int) -> Annotation | None:
-    """Get ground truth annotation for a specific line index."""
-    for a in annotations:
-        if a.line_idx == line_idx:
-            return a
-    return None
+def get_ground_truth_for_line(case: ClinicalCase, line_idx: int) -> Annotation | None:
+    """Get the (first) ground truth annotation for a specific line index."""
+    found = case.index.at(line_idx)
+    return found[0] if found else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a case directory pair into a packed JSONL corpus")
+    parser.add_argument("--transcript-dir", default="data/processed")
+    parser.add_argument("--annotation-dir", default="data/annotations")
+    parser.add_argument("--to-jsonl", required=True, help="Output corpus path (e.g. data/corpus.jsonl)")
+    args = parser.parse_args()
+
+    n = write_corpus_jsonl(iter_cases(args.transcript_dir, args.annotation_dir), args.to_jsonl)
+    print(f"Wrote {n} cases to {args.to_jsonl}")
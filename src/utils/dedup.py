@@ -0,0 +1,65 @@
+"""
+Request deduplication across the chains of a parameter sweep.
+
+Sweep configs often issue byte-identical requests: line 0 of a case is the
+same prompt under every context size, and on transcripts shorter than the
+window ctx=20/50/100/max build the same message lists for every line. The
+chains of a case therefore form a prefix tree: they share one path of
+requests until their prompts diverge. Because each request depends on the
+previous responses, the tree cannot be enumerated up front; SingleFlight
+walks it lazily instead. The first chain to reach a request sends it,
+chains arriving while it is in flight wait for it, and later arrivals get
+the stored result, so each unique request is executed once and fanned out
+to every config that shares it.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesce identical async requests by key (one asyncio event loop at a time)."""
+
+    def __init__(self):
+        self._pending: dict[str, asyncio.Future] = {}
+        self._done: dict[str, object] = {}
+        self.requests = 0
+        self.unique = 0
+
+    async def do(self, key: str, call: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """Return (result, shared); shared is True if another caller ran call()."""
+        self.requests += 1
+        if key in self._done:
+            return self._done[key], True
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        self.unique += 1
+        try:
+            result = await call()
+        except BaseException as exc:
+            del self._pending[key]
+            self.unique -= 1  # 실패 결과는 저장하지 않음 → 이후 호출자가 다시 보냄
+            if isinstance(exc, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(exc)
+                future.exception()  # 대기자가 없어도 경고가 나지 않도록 retrieved 처리
+            raise
+        del self._pending[key]
+        self._done[key] = result
+        future.set_result(result)
+        return result, False
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "unique": self.unique,
+            "shared": self.requests - self.unique,
+            "dedup_ratio": self.requests / self.unique if self.unique else 1.0,
+        }
@@ -0,0 +1,148 @@
+"""
+Per-call token, latency and cost ledger for LLM calls.
+
+Every LLMClient / AsyncLLMClient call appends a CallRecord (tagged with
+experiment, config, case id and line index by the caller). Ledger.write()
+saves the raw records and per-config summaries (calls, tokens, p50/p95/p99
+latency, estimated cost) next to an experiment's results JSON:
+
+    results/realtime_sim_results.json
+    results/realtime_sim_results_ledger.jsonl
+    results/realtime_sim_results_ledger_summary.json
+
+A request shared across configs (AsyncLLMClient dedup) is recorded for
+every config that used it, with the original call's tokens and latency and
+deduplicated=True. Per-config tokens, latency and estimated_cost_usd are
+therefore what the config would cost run alone; billed_tokens and
+billed_cost_usd count each request once, as the API bills it.
+"""
+
+import json
+import threading
+from dataclasses import dataclass, asdict
+from pathlib import Path
+
+import numpy as np
+
+# USD per 1K tokens (prompt, completion); 목록에 없는 모델은 비용 0으로 집계
+PRICES_PER_1K = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+}
+
+
+@dataclass
+class CallRecord:
+    model: str
+    latency_s: float  # wall time of the call, including retries
+    cache_hit: bool
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    experiment: str | None = None
+    config: str | None = None
+    case_id: str | None = None
+    line_idx: int | None = None
+    decision_latency_s: float | None = None  # streamed calls: time to None/summary verdict
+    short_circuit: bool = False  # streamed call cancelled after a "None" prefix
+    deduplicated: bool = False  # reused the response of an identical request (usage copied from it)
+    prompt_hash: str | None = None  # request_key() of the call (see src/utils/cache.py)
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prompt_price, completion_price = PRICES_PER_1K.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+
+class Ledger:
+    """Thread-safe in-memory collection of CallRecords."""
+
+    def __init__(self):
+        self.records: list[CallRecord] = []
+        self._lock = threading.Lock()
+
+    def record(self, rec: CallRecord):
+        with self._lock:
+            self.records.append(rec)
+
+    def select(self, experiment: str | None = None) -> list[CallRecord]:
+        with self._lock:
+            return [r for r in self.records if experiment is None or r.experiment == experiment]
+
+    @staticmethod
+    def _summarize(records: list[CallRecord]) -> dict:
+        # charged: 이 config가 단독으로 실행됐다면 보냈을 요청 (다른 config와 공유한 요청 포함);
+        # billed: 실제로 API에 보낸 요청 (공유 요청은 처음 보낸 config에서 한 번만)
+        charged = [r for r in records if not r.cache_hit]
+        billed = [r for r in charged if not r.deduplicated]
+        prompt = sum(r.prompt_tokens or 0 for r in records)
+        completion = sum(r.completion_tokens or 0 for r in records)
+        lat = np.array([r.latency_s for r in charged]) if charged else np.zeros(1)
+        summary = {
+            "calls": len(records),
+            "cache_hits": sum(r.cache_hit for r in records),
+            "deduplicated": sum(r.deduplicated for r in records),
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "total_tokens": prompt + completion,
+            "latency_s": {
+                "mean": float(np.mean(lat)),
+                "p50": float(np.percentile(lat, 50)),
+                "p95": float(np.percentile(lat, 95)),
+                "p99": float(np.percentile(lat, 99)),
+            },
+            # 캐시 적중은 비용 없음; 공유 요청은 config별 비용에는 포함, 청구액에는 한 번만
+            "estimated_cost_usd": sum(
+                estimate_cost(r.model, r.prompt_tokens or 0, r.completion_tokens or 0)
+                for r in charged
+            ),
+            "billed_tokens": sum((r.prompt_tokens or 0) + (r.completion_tokens or 0) for r in billed),
+            "billed_cost_usd": sum(
+                estimate_cost(r.model, r.prompt_tokens or 0, r.completion_tokens or 0)
+                for r in billed
+            ),
+        }
+        decisions = [r.decision_latency_s for r in charged if r.decision_latency_s is not None]
+        if decisions:
+            summary["decision_latency_s"] = {
+                "p50": float(np.percentile(decisions, 50)),
+                "p95": float(np.percentile(decisions, 95)),
+            }
+        return summary
+
+    def summarize(self, experiment: str | None = None) -> dict[str, dict]:
+        """Per-config summaries plus an "all" entry."""
+        records = self.select(experiment)
+        by_config = {}
+        for r in records:
+            by_config.setdefault(str(r.config), []).append(r)
+        summaries = {cfg: self._summarize(recs) for cfg, recs in by_config.items()}
+        summaries["all"] = self._summarize(records)
+        return summaries
+
+    def write(self, results_path: str, experiment: str | None = None) -> dict[str, dict]:
+        """Write <stem>_ledger.jsonl and <stem>_ledger_summary.json next to results_path."""
+        base = Path(results_path)
+        base.parent.mkdir(parents=True, exist_ok=True)
+        with open(base.with_name(f"{base.stem}_ledger.jsonl"), "w", encoding="utf-8") as f:
+            for r in self.select(experiment):
+                f.write(json.dumps(asdict(r), ensure_ascii=False) + "\n")
+        summaries = self.summarize(experiment)
+        with open(base.with_name(f"{base.stem}_ledger_summary.json"), "w", encoding="utf-8") as f:
+            json.dump(summaries, f, ensure_ascii=False, indent=2)
+        return summaries
+
+
+def print_ledger_summary(summaries: dict[str, dict]):
+    """Print one line per config: calls, tokens, latency percentiles, cost."""
+    print("\nLLM call ledger:")
+    for cfg, s in summaries.items():
+        lat = s["latency_s"]
+        print(
+            f"  {cfg:>24}: {s['calls']} calls ({s['cache_hits']} cached, "
+            f"{s.get('deduplicated', 0)} shared), "
+            f"{s['prompt_tokens']}+{s['completion_tokens']} tokens, "
+            f"p50={lat['p50'] * 1000:.0f}ms p95={lat['p95'] * 1000:.0f}ms "
+            f"p99={lat['p99'] * 1000:.0f}ms, ${s['estimated_cost_usd']:.4f} "
+            f"(billed ${s.get('billed_cost_usd', s['estimated_cost_usd']):.4f})"
+        )
@@ -1,49 +1,593 @@
 """
 LLM client wrapper for OpenAI API calls.
 Supports GPT-3.5 Turbo (paper's primary model).
+
+LLMClient is the blocking client; AsyncLLMClient has the same interface
+with awaitable calls, for running independent cases concurrently
+(see src/utils/scheduler.py). Both retry transient errors with jittered
+backoff and can share one RateLimiter (see src/utils/rate_limit.py).
+
+Requests go through a ChatBackend (src/utils/backends.py): the OpenAI API
+by default, or a recorded cassette / local stand-in server for offline runs.
+
+realtime_call() is the latency-oriented path for the line-by-line
+simulation: it streams the response, stops as soon as the first tokens
+read "None." (see early_verdict), and uses a newline stop sequence with a max_tokens budget
+sized to the input line.
+
+Every call is appended to the client's Ledger (src/utils/ledger.py) with
+token usage, latency and cache status; callers pass `tag` (experiment,
+config, case_id, line_idx) to attribute it.
+
+AsyncLLMClient sends each distinct request once per run and shares the
+response with every chain that issues the same request (see
+src/utils/dedup.py), so identical prompts across sweep configs cost one call.
 """
 
-import os
-from openai import OpenAI
+import time
+import asyncio
+import argparse
+from dataclasses import replace
+from functools import partial
 
+import numpy as np
 
-class LLMClient:
-    """Wrapper for OpenAI API calls with conversation history management."""
+from src.utils.backends import (
+    ChatBackend,
+    ChatResult,
+    OpenAIBackend,
+    ReplayBackend,
+    RecordingBackend,
+)
+from src.utils.cache import ResponseCache, CacheMiss, CachedResponse, request_key
+from src.utils.dedup import SingleFlight
+from src.utils.ledger import Ledger, CallRecord
+from src.utils.rate_limit import (
+    RateLimiter,
+    RetryPolicy,
+    estimate_tokens,
+    is_retryable,
+    retry_after_seconds,
+)
 
-    def __init__(self, model: str = "gpt-3.5-turbo", temperature: float = 0.0):
-        api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError(
-                "OPENAI_API_KEY 환경변수가 설정되지 않았습니다.\n"
-                "터미널에서 실행: export OPENAI_API_KEY='sk-your-key'"
-            )
-        self.client = OpenAI(api_key=api_key)
+REALTIME_STOP = ["\n"]  # 한 문장 요약이므로 줄바꿈에서 생성 중단
+
+
+def adaptive_max_tokens(line: str, floor: int = 32, ceiling: int = 512) -> int:
+    """Completion budget for a one-sentence summary of `line` (~2x its tokens)."""
+    return max(floor, min(ceiling, 2 * (len(line) // 4) + 16))
+
+
+def early_verdict(text: str) -> str | None:
+    """Classify a streamed prefix as "none", "summary", or None (undecided).
+
+    "none" only when the word is the whole verdict ("None." or "None" and a
+    newline); "None of the medications helped..." is a summary, so after
+    "None" plus a space or other punctuation we wait for the next token.
+    """
+    head = text.lstrip().lower()
+    if head.startswith("none"):
+        rest = head[4:]
+        if rest[:1] in (".", "\n"):
+            return "none"
+        if rest[:1].isalpha() or any(c.isalnum() for c in rest):
+            return "summary"  # "nonetheless", "None of ...", "None, but ..."
+        return None  # "None" / "None " / "None,": 다음 토큰까지 대기
+    if head and not "none".startswith(head[:4]):
+        return "summary"
+    return None
+
+
+class _DecisionTracker:
+    """Accumulates a streamed response and detects the None/summary verdict."""
+
+    def __init__(self):
+        self.parts = []
+        self.usage = None
+        self.verdict = None
+        self.start = time.monotonic()
+        self.decision_latency = None
+
+    def feed(self, chunk: ChatResult) -> bool:
+        """Add a chunk; True means the rest of the stream can be dropped."""
+        self.parts.append(chunk.content)
+        if chunk.total_tokens is not None:
+            self.usage = chunk
+        if self.verdict is None:
+            self.verdict = early_verdict("".join(self.parts))
+            if self.verdict is not None:
+                self.decision_latency = time.monotonic() - self.start
+        return self.verdict == "none"
+
+    def result(self) -> ChatResult:
+        if self.decision_latency is None:
+            self.decision_latency = time.monotonic() - self.start
+        content = "None." if self.verdict == "none" else "".join(self.parts).strip()
+        if self.usage is not None:
+            return ChatResult(content, self.usage.prompt_tokens, self.usage.completion_tokens)
+        return ChatResult(content)
+
+
+class _BaseLLMClient:
+    """Settings, cache, retry and ledger handling shared by sync and async clients."""
+
+    def __init__(
+        self,
+        model: str = "gpt-3.5-turbo",
+        temperature: float = 0.0,
+        backend: ChatBackend | None = None,
+        cache: ResponseCache | None = None,
+        limiter: RateLimiter | None = None,
+        retry: RetryPolicy | None = None,
+        timeout: float | None = 60.0,
+        ledger: Ledger | None = None,
+        max_tokens: int | None = None,
+    ):
         self.model = model
         self.temperature = temperature
+        self.max_tokens = max_tokens  # 모델 설정의 completion 상한 (None = 호출별 값 그대로)
+        self.cache = cache
+        self.limiter = limiter
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.timeout = timeout  # seconds per request
+        self.ledger = ledger if ledger is not None else Ledger()
+        self._sent: dict[str, CallRecord] = {}  # request key → record of the call that answered it
 
-    def single_call(
-        self, system_prompt: str, user_prompt: str, max_tokens: int = 1024
+        if backend is None and not (cache is not None and cache.replay):
+            # replay 모드에서는 캐시에서만 응답하므로 API 키가 필요 없음
+            backend = OpenAIBackend()
+        self.backend = backend
+
+    def _lookup(
+        self, messages: list[dict], max_tokens: int, **extra
+    ) -> tuple[str | None, CachedResponse | None]:
+        """Return (request key, cached response). Raises CacheMiss in replay mode."""
+        key = request_key(self.model, self.temperature, max_tokens, messages, **extra)
+        if self.cache is None:
+            return key, None
+        cached = self.cache.get(key)
+        if cached is None and self.cache.replay:
+            raise CacheMiss(f"Request not in replay cache: {key}")
+        return key, cached
+
+    def _log(
+        self,
+        tag: dict | None,
+        start: float,
+        result: ChatResult | CachedResponse,
+        cache_hit: bool,
+        decision_latency: float | None = None,
+        deduplicated: bool = False,
+        key: str | None = None,
+    ):
+        rec = CallRecord(
+            model=self.model,
+            latency_s=time.monotonic() - start,
+            cache_hit=cache_hit,
+            deduplicated=deduplicated,
+            prompt_tokens=result.prompt_tokens,
+            completion_tokens=result.completion_tokens,
+            decision_latency_s=decision_latency,
+            short_circuit=decision_latency is not None and result.content == "None.",
+            prompt_hash=key,
+            **(tag or {}),
+        )
+        self.ledger.record(rec)
+        if key is not None and not deduplicated:
+            self._sent[key] = rec
+
+    def _hit(self, key: str, tag: dict | None, start: float, cached: CachedResponse) -> str:
+        self._log(tag, start, cached, cache_hit=True, key=key)
+        return cached.content
+
+    def _finish(
+        self,
+        key: str,
+        tag: dict | None,
+        start: float,
+        result: ChatResult,
+        estimated: int,
+        decision_latency: float | None = None,
+        prompt_tokens: int | None = None,
     ) -> str:
-        """단일 호출: system prompt + user prompt → response"""
-        response = self.client.chat.completions.create(
+        """Reconcile the rate limiter, store in cache and log a completed call.
+
+        prompt_tokens (counted by the caller) fills in the usage of streams
+        cancelled before the API reported it.
+        """
+        if self.limiter is not None:
+            # 취소된 스트림은 usage가 없으므로 예약량을 그대로 유지 (보수적)
+            if result.total_tokens is not None:
+                self.limiter.reconcile(estimated, result.total_tokens)
+        if result.prompt_tokens is None and prompt_tokens is not None:
+            result = replace(result, prompt_tokens=prompt_tokens)
+        if self.cache is not None:
+            self.cache.put(
+                key, result.content, model=self.model,
+                prompt_tokens=result.prompt_tokens,
+                completion_tokens=result.completion_tokens,
+            )
+        self._log(
+            tag, start, result, cache_hit=False, decision_latency=decision_latency, key=key
+        )
+        return result.content
+
+    def _request_kwargs(
+        self, messages: list[dict], max_tokens: int, stop: list[str] | None = None
+    ) -> dict:
+        kwargs = dict(
             model=self.model,
             temperature=self.temperature,
             max_tokens=max_tokens,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
+            messages=messages,
+            timeout=self.timeout,
         )
-        return response.choices[0].message.content.strip()
+        if stop:
+            kwargs["stop"] = stop
+        return kwargs
+
+    def _cap(self, max_tokens: int) -> int:
+        """Clamp a call's completion budget to the model's max_tokens setting."""
+        return max_tokens if self.max_tokens is None else min(max_tokens, self.max_tokens)
+
+    def _realtime_params(self, messages: list[dict], max_tokens: int | None) -> tuple[int, dict]:
+        if max_tokens is None:
+            max_tokens = adaptive_max_tokens(messages[-1]["content"])
+        return self._cap(max_tokens), dict(stop=REALTIME_STOP, early_none=True)
+
+    def _on_error(self, exc: Exception, attempt: int, estimated: int) -> float:
+        """Return the backoff delay before retrying, or re-raise."""
+        if self.limiter is not None:
+            self.limiter.reconcile(estimated, 0)  # 실패한 요청은 토큰을 소비하지 않음
+        if not is_retryable(exc) or attempt >= self.retry.max_retries:
+            raise exc
+        retry_after = retry_after_seconds(exc)
+        delay = self.retry.delay(attempt, retry_after)
+        if self.limiter is not None and getattr(exc, "status_code", None) == 429:
+            # 429는 공유 quota 문제 → 모든 호출자를 함께 대기시킴
+            self.limiter.pause(delay)
+        print(f"\nLLM call failed ({type(exc).__name__}), retry {attempt + 1} in {delay:.1f}s")
+        return delay
+
+    @staticmethod
+    def _system_user(system_prompt: str, user_prompt: str) -> list[dict]:
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+
+
+class LLMClient(_BaseLLMClient):
+    """Wrapper for OpenAI API calls with conversation history management."""
+
+    def single_call(
+        self, system_prompt: str, user_prompt: str, max_tokens: int = 1024,
+        tag: dict | None = None,
+    ) -> str:
+        """단일 호출: system prompt + user prompt → response"""
+        return self._complete(self._system_user(system_prompt, user_prompt), max_tokens, tag)
 
     def conversation_call(
-        self, messages: list[dict], max_tokens: int = 512
+        self, messages: list[dict], max_tokens: int = 512, tag: dict | None = None
     ) -> str:
         """대화형 호출: 메시지 히스토리 전체를 전달"""
-        response = self.client.chat.completions.create(
-            model=self.model,
-            temperature=self.temperature,
-            max_tokens=max_tokens,
-            messages=messages,
+        return self._complete(messages, max_tokens, tag)
+
+    def _complete(self, messages: list[dict], max_tokens: int, tag: dict | None) -> str:
+        start = time.monotonic()
+        max_tokens = self._cap(max_tokens)
+        key, cached = self._lookup(messages, max_tokens)
+        if cached is not None:
+            return self._hit(key, tag, start, cached)
+
+        estimated = estimate_tokens(messages, max_tokens)
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                self.limiter.acquire(estimated)
+            try:
+                result = self.backend.complete(self._request_kwargs(messages, max_tokens))
+                break
+            except Exception as e:
+                time.sleep(self._on_error(e, attempt, estimated))
+                attempt += 1
+
+        return self._finish(key, tag, start, result, estimated)
+
+    def realtime_call(
+        self, messages: list[dict], max_tokens: int | None = None, tag: dict | None = None
+    ) -> str:
+        """Streaming call that returns "None." as soon as the first tokens say so."""
+        start = time.monotonic()
+        max_tokens, extra = self._realtime_params(messages, max_tokens)
+        key, cached = self._lookup(messages, max_tokens, **extra)
+        if cached is not None:
+            return self._hit(key, tag, start, cached)
+
+        estimated = estimate_tokens(messages, max_tokens)
+        request = self._request_kwargs(messages, max_tokens, extra["stop"])
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                self.limiter.acquire(estimated)
+            tracker = _DecisionTracker()
+            stream = self.backend.stream(request)
+            try:
+                for chunk in stream:
+                    if tracker.feed(chunk):
+                        break
+                break
+            except Exception as e:
+                time.sleep(self._on_error(e, attempt, estimated))
+                attempt += 1
+            finally:
+                stream.close()
+
+        result = tracker.result()
+        return self._finish(key, tag, start, result, estimated, tracker.decision_latency)
+
+
+class AsyncLLMClient(_BaseLLMClient):
+    """Async counterpart of LLMClient (same methods, awaitable).
+
+    With dedup=True (default) identical requests issued by concurrent chains
+    are sent once; the others wait for and reuse that response.
+    """
+
+    def __init__(self, *args, dedup: bool = True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.flights = SingleFlight() if dedup else None
+
+    async def single_call(
+        self, system_prompt: str, user_prompt: str, max_tokens: int = 1024,
+        tag: dict | None = None,
+    ) -> str:
+        """단일 호출: system prompt + user prompt → response"""
+        return await self._complete(
+            self._system_user(system_prompt, user_prompt), max_tokens, tag
+        )
+
+    async def conversation_call(
+        self, messages: list[dict], max_tokens: int = 512, tag: dict | None = None,
+        prompt_tokens: int | None = None,
+    ) -> str:
+        """대화형 호출: 메시지 히스토리 전체를 전달 (prompt_tokens: 호출자가 이미 센 prompt 토큰)"""
+        return await self._complete(messages, max_tokens, tag, prompt_tokens)
+
+    async def _shared(
+        self, call, messages: list[dict], max_tokens: int, tag: dict | None, **extra
+    ) -> str:
+        """Run call() once per distinct request; identical requests reuse its result."""
+        if self.flights is None:
+            return await call()
+        start = time.monotonic()
+        key = request_key(self.model, self.temperature, max_tokens, messages, **extra)
+        content, shared = await self.flights.do(key, call)
+        if shared:
+            origin = self._sent.get(key)
+            if origin is None:
+                self._log(
+                    tag, start, ChatResult(content), cache_hit=False, deduplicated=True, key=key
+                )
+            else:
+                # 공유한 config에도 원래 요청의 토큰·지연을 기록 (config별 비용 = 단독 실행 비용);
+                # deduplicated=True라서 실제 청구액(billed)에는 한 번만 합산됨
+                untagged = dict(experiment=None, config=None, case_id=None, line_idx=None)
+                self.ledger.record(replace(origin, deduplicated=True, **{**untagged, **(tag or {})}))
+        return content
+
+    async def _complete(
+        self, messages: list[dict], max_tokens: int, tag: dict | None,
+        prompt_tokens: int | None = None,
+    ) -> str:
+        max_tokens = self._cap(max_tokens)
+        return await self._shared(
+            partial(self._complete_once, messages, max_tokens, tag, prompt_tokens),
+            messages, max_tokens, tag,
+        )
+
+    async def _complete_once(
+        self, messages: list[dict], max_tokens: int, tag: dict | None,
+        prompt_tokens: int | None = None,
+    ) -> str:
+        start = time.monotonic()
+        key, cached = self._lookup(messages, max_tokens)
+        if cached is not None:
+            return self._hit(key, tag, start, cached)
+
+        estimated = _estimate(messages, max_tokens, prompt_tokens)
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                await self.limiter.acquire_async(estimated)
+            try:
+                result = await self.backend.acomplete(
+                    self._request_kwargs(messages, max_tokens)
+                )
+                break
+            except Exception as e:
+                await asyncio.sleep(self._on_error(e, attempt, estimated))
+                attempt += 1
+
+        return self._finish(key, tag, start, result, estimated, prompt_tokens=prompt_tokens)
+
+    async def realtime_call(
+        self, messages: list[dict], max_tokens: int | None = None, tag: dict | None = None,
+        prompt_tokens: int | None = None,
+    ) -> str:
+        """Streaming call that returns "None." as soon as the first tokens say so."""
+        max_tokens, extra = self._realtime_params(messages, max_tokens)
+        return await self._shared(
+            partial(self._realtime_once, messages, max_tokens, extra, tag, prompt_tokens),
+            messages, max_tokens, tag, **extra,
+        )
+
+    async def _realtime_once(
+        self, messages: list[dict], max_tokens: int, extra: dict, tag: dict | None,
+        prompt_tokens: int | None = None,
+    ) -> str:
+        start = time.monotonic()
+        key, cached = self._lookup(messages, max_tokens, **extra)
+        if cached is not None:
+            return self._hit(key, tag, start, cached)
+
+        estimated = _estimate(messages, max_tokens, prompt_tokens)
+        request = self._request_kwargs(messages, max_tokens, extra["stop"])
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                await self.limiter.acquire_async(estimated)
+            tracker = _DecisionTracker()
+            stream = self.backend.astream(request)
+            try:
+                async for chunk in stream:
+                    if tracker.feed(chunk):
+                        break
+                break
+            except Exception as e:
+                await asyncio.sleep(self._on_error(e, attempt, estimated))
+                attempt += 1
+            finally:
+                await stream.aclose()
+
+        result = tracker.result()
+        return self._finish(
+            key, tag, start, result, estimated, tracker.decision_latency, prompt_tokens
+        )
+
+
+def _estimate(messages: list[dict], max_tokens: int, prompt_tokens: int | None) -> int:
+    """Rate-limiter reservation: the caller's token count when given, else the heuristic."""
+    if prompt_tokens is None:
+        return estimate_tokens(messages, max_tokens)
+    return prompt_tokens + max_tokens
+
+
+def add_llm_arguments(parser: argparse.ArgumentParser):
+    """Register the LLM client options shared by all experiment scripts."""
+    parser.add_argument("--cache", default=None, help="SQLite response cache path")
+    parser.add_argument(
+        "--replay", action="store_true",
+        help="Serve responses from --cache only; a miss is an error",
+    )
+    parser.add_argument("--cache-max-entries", type=int, default=None)
+    parser.add_argument("--cache-max-bytes", type=int, default=None)
+    parser.add_argument("--cache-max-age-days", type=float, default=None)
+    parser.add_argument(
+        "--max-in-flight", type=int, default=8,
+        help="Maximum number of case chains with a request in flight",
+    )
+    parser.add_argument("--rpm", type=float, default=None, help="Requests-per-minute budget")
+    parser.add_argument("--tpm", type=float, default=None, help="Tokens-per-minute budget")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout (s)")
+    parser.add_argument(
+        "--max-tokens", type=int, default=None,
+        help="Completion-token ceiling for every request (default: each call's own budget)",
+    )
+    parser.add_argument("--max-retries", type=int, default=6)
+    parser.add_argument(
+        "--no-dedup", action="store_true",
+        help="Send identical requests from different configs separately",
+    )
+    parser.add_argument(
+        "--backend", choices=["openai", "replay", "standin"], default="openai",
+        help="openai: OpenAI API (or --base-url); replay: --cassette file; "
+        "standin: in-process local stand-in server",
+    )
+    parser.add_argument("--base-url", default=None, help="OpenAI-compatible endpoint")
+    parser.add_argument("--cassette", default=None, help="JSONL recording to replay")
+    parser.add_argument("--record", default=None, help="Append every exchange to this JSONL")
+    parser.add_argument("--standin-latency", default="const:0", help="e.g. lognormal:-1.5,0.5")
+    parser.add_argument("--standin-error-rate", type=float, default=0.0)
+    parser.add_argument("--standin-seed", type=int, default=0)
+
+
+def backend_from_args(args: argparse.Namespace) -> ChatBackend | None:
+    """Build the ChatBackend selected by --backend (None for cache-only replay)."""
+    if args.backend == "replay":
+        if not args.cassette:
+            raise ValueError("--backend replay requires --cassette")
+        backend = ReplayBackend(args.cassette)
+    elif args.backend == "standin":
+        from src.utils.standin_server import StandinConfig, serve_in_thread
+
+        server = serve_in_thread(StandinConfig(
+            latency=args.standin_latency,
+            error_rate=args.standin_error_rate,
+            seed=args.standin_seed,
+        ))
+        print(f"Stand-in server running at {server.base_url}")
+        backend = OpenAIBackend(base_url=server.base_url)
+    elif args.replay and not args.base_url:
+        return None
+    else:
+        backend = OpenAIBackend(base_url=args.base_url)
+    if args.record:
+        backend = RecordingBackend(backend, args.record)
+    return backend
+
+
+def client_from_args(args: argparse.Namespace, client_cls: type = LLMClient):
+    """Build an LLMClient (or AsyncLLMClient) from add_llm_arguments options."""
+    cache = None
+    if args.cache:
+        cache = ResponseCache(
+            args.cache,
+            max_entries=args.cache_max_entries,
+            max_bytes=args.cache_max_bytes,
+            max_age_days=args.cache_max_age_days,
+            replay=args.replay,
+        )
+    elif args.replay:
+        raise ValueError("--replay requires --cache")
+    limiter = None
+    if args.rpm or args.tpm:
+        limiter = RateLimiter(requests_per_minute=args.rpm, tokens_per_minute=args.tpm)
+    extra = {}
+    if issubclass(client_cls, AsyncLLMClient):
+        extra["dedup"] = not args.no_dedup
+    return client_cls(
+        model=args.model,
+        temperature=0.0,
+        max_tokens=args.max_tokens,
+        backend=backend_from_args(args),
+        cache=cache,
+        limiter=limiter,
+        retry=RetryPolicy(max_retries=args.max_retries),
+        timeout=args.timeout,
+        **extra,
+    )
+
+
+def print_cache_stats(llm: _BaseLLMClient):
+    """Print response cache and request-dedup counters, where enabled."""
+    flights = getattr(llm, "flights", None)
+    if flights is not None and flights.requests:
+        d = flights.stats()
+        print(
+            f"\nRequest dedup: {d['requests']} requests, {d['unique']} unique, "
+            f"{d['shared']} shared across configs (dedup ratio {d['dedup_ratio']:.2f}x)"
         )
-        return response.choices[0].message.content.strip()
+    if llm.cache is None:
+        return
+    s = llm.cache.stats()
+    print(
+        f"\nResponse cache: {s['hits']} hits / {s['misses']} misses "
+        f"({s['hit_rate'] * 100:.1f}% hit rate), {s['entries']} entries, {s['bytes']} bytes"
+    )
+
+
+def print_stream_stats(llm: _BaseLLMClient, experiment: str | None = None):
+    """Print time-to-first-decision for realtime_call (streamed) requests."""
+    streamed = [
+        r for r in llm.ledger.select(experiment)
+        if r.decision_latency_s is not None and not r.deduplicated
+    ]
+    if not streamed:
+        return
+    lat = np.array([r.decision_latency_s for r in streamed]) * 1000
+    short = sum(r.short_circuit for r in streamed)
+    print(
+        f"\nStreaming: {len(lat)} calls, {short} short-circuited on 'None', "
+        f"time-to-decision p50={np.percentile(lat, 50):.0f}ms p95={np.percentile(lat, 95):.0f}ms"
+    )
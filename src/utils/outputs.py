@@ -0,0 +1,115 @@
+"""
+Raw LLM outputs of an experiment run, saved next to its results JSON.
+
+Every experiment writes the per-line (realtime_sim, context_agg), per-chunk
+(input_lines) or per-case (baseline) outputs of each sweep config, together
+with the request hash (request_key(), see src/utils/cache.py) of every call
+that produced them, taken from the run's Ledger:
+
+    results/realtime_sim_results.json
+    results/realtime_sim_results_outputs.json
+
+src/experiments/rescore.py recomputes detection and summarization metrics
+from this file alone, so changing a metric setting does not mean re-running
+generation. The prompt hashes tell whether two runs sent the same requests.
+"""
+
+import json
+from pathlib import Path
+from typing import Hashable
+
+from src.utils.ledger import Ledger
+
+FORMAT_VERSION = 1
+
+
+def outputs_path(results_path: str | Path) -> Path:
+    path = Path(results_path)
+    return path.with_name(f"{path.stem}_outputs.json")
+
+
+def results_path(outputs_file: str | Path) -> Path:
+    """Inverse of outputs_path(): the results JSON an outputs file belongs to."""
+    path = Path(outputs_file)
+    return path.with_name(path.name.removesuffix("_outputs.json") + ".json")
+
+
+def _prompt_hashes(ledger: Ledger, experiment: str) -> dict[tuple[str, str], list[dict]]:
+    """(config, case_id) → [{"line_idx", "prompt_hash"}] ordered by line index."""
+    calls = {}
+    for rec in ledger.select(experiment):
+        calls.setdefault((rec.config, rec.case_id), {})[rec.line_idx] = rec.prompt_hash
+    return {
+        key: [
+            {"line_idx": idx, "prompt_hash": h}
+            for idx, h in sorted(by_line.items(), key=lambda kv: -1 if kv[0] is None else kv[0])
+        ]
+        for key, by_line in calls.items()
+    }
+
+
+def write_outputs(
+    results_path: str | Path,
+    experiment: str,
+    model: str,
+    runs: list[tuple[Hashable, str]],
+    outputs: dict[tuple[Hashable, str], list[str]],
+    ledger: Ledger,
+    settings: dict | None = None,
+) -> Path:
+    """Save outputs[(run key, case_id)] for each (run key, ledger config label) in runs.
+
+    Run keys must be JSON values (rescore gets them back as the sweep keys);
+    settings holds whatever else the experiment's report needs.
+    """
+    hashes = _prompt_hashes(ledger, experiment)
+    # run key별로 한 번에 묶음 (run마다 전체 출력을 훑지 않도록)
+    by_run: dict[Hashable, dict[str, list[str]]] = {}
+    for (run_key, case_id), case_outputs in outputs.items():
+        by_run.setdefault(run_key, {})[case_id] = case_outputs
+    payload = {
+        "format_version": FORMAT_VERSION,
+        "experiment": experiment,
+        "model": model,
+        "settings": settings or {},
+        "runs": [
+            {
+                "key": key,
+                "config": config,
+                "cases": {
+                    case_id: {
+                        "outputs": case_outputs,
+                        "calls": hashes.get((config, case_id), []),
+                    }
+                    for case_id, case_outputs in by_run.get(key, {}).items()
+                },
+            }
+            for key, config in runs
+        ],
+    }
+    path = outputs_path(results_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=1)
+    print(f"Outputs saved to {path}")
+    return path
+
+
+def print_rescore_hint(paths: list[Path]):
+    """How to score outputs saved by a --generate-only run."""
+    print(f"Score the saved outputs with: python -m src.experiments.rescore {' '.join(map(str, paths))}")
+
+
+def load_outputs(path: str | Path) -> tuple[dict, dict[tuple[Hashable, str], list[str]]]:
+    """(header without runs, {(run key, case_id): outputs}) from an outputs file."""
+    with open(path, encoding="utf-8") as f:
+        payload = json.load(f)
+    version = payload.get("format_version")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported outputs format {version!r}")
+    outputs = {
+        (run["key"], case_id): case["outputs"]
+        for run in payload.pop("runs")
+        for case_id, case in run["cases"].items()
+    }
+    return payload, outputs
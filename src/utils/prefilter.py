@@ -0,0 +1,113 @@
+"""
+Local pre-filter gate for the line-by-line experiments.
+
+REALTIME_SYSTEM_PROMPT tells the model to answer "None." for provider
+questions and for lines without clinically relevant details, and about half
+of all transcript lines are such lines. LineGate answers those locally:
+
+  - Model: TF-IDF (word 1-2 grams, speaker-prefixed) + logistic regression
+    trained on data/annotations (label = line has no annotation). A line is
+    gated when P(None) >= threshold.
+  - Rule feature: provider lines containing a question mark (the prompt's
+    own "None." instruction) get an extra token, so the model learns how
+    much the rule is worth instead of the rule overriding P(None). Every
+    line therefore stays subject to the threshold; with threshold above the
+    largest P(None) nothing is skipped.
+
+Gates are cross-fitted (cross_fitted_gates): each case is gated by a model
+trained on the other cases, so the reported recall loss is not inflated by
+training on the evaluated annotations. gate_report() measures calls saved
+and recall lost with compute_detection_metrics.
+"""
+
+import numpy as np
+
+from src.utils.data_loader import ClinicalCase, TranscriptLine
+from src.evaluation.detection import compute_detection_metrics
+
+
+def _is_provider_question(line: TranscriptLine) -> bool:
+    return line.speaker == "Provider" and "?" in line.text
+
+
+def _line_text(line: TranscriptLine) -> str:
+    rule = " provider_question_rule" if _is_provider_question(line) else ""
+    return f"{line.speaker.lower()}_speaker {line.text}{rule}"
+
+
+class LineGate:
+    """Decide per line whether the LLM call can be skipped ("None." locally)."""
+
+    def __init__(self, threshold: float = 0.9):
+        self.threshold = threshold
+        self.model = None
+
+    def fit(self, cases: list[ClinicalCase]) -> "LineGate":
+        texts, labels = [], []
+        for case in cases:
+            texts.extend(_line_text(line) for line in case.lines)
+            labels.extend((~case.index.annotated).astype(int).tolist())  # 1 = None
+        if len(set(labels)) < 2:
+            return self  # 한 클래스만 있으면 학습 불가 → 아무 줄도 건너뛰지 않음
+        # sklearn은 게이트를 쓸 때만 import (실험 스크립트 시작 시간 단축)
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import make_pipeline
+
+        self.model = make_pipeline(
+            TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, min_df=1),
+            LogisticRegression(max_iter=1000, class_weight="balanced"),
+        )
+        self.model.fit(texts, labels)
+        return self
+
+    def none_probability(self, lines: list[TranscriptLine]) -> np.ndarray:
+        """P(None) per line (0.0 if no model is fitted)."""
+        if self.model is None or not lines:
+            return np.zeros(len(lines))
+        return self.model.predict_proba([_line_text(l) for l in lines])[:, 1]
+
+    def decide(self, lines: list[TranscriptLine]) -> list[bool]:
+        """True for lines to answer "None." without an LLM call."""
+        return (self.none_probability(lines) >= self.threshold).tolist()
+
+
+def cross_fitted_gates(
+    cases: list[ClinicalCase], threshold: float = 0.9, folds: int = 5
+) -> dict[str, LineGate]:
+    """case id → LineGate trained on the cases outside that case's fold."""
+    folds = max(2, min(folds, len(cases)))
+    gates = {}
+    for k in range(folds):
+        held_out = cases[k::folds]
+        held_ids = {c.id for c in held_out}
+        train = [c for c in cases if c.id not in held_ids]
+        gate = LineGate(threshold).fit(train)
+        for case in held_out:
+            gates[case.id] = gate
+    return gates
+
+
+def gate_report(cases: list[ClinicalCase], gates: dict[str, LineGate]) -> dict:
+    """Calls saved and recall lost if the gate alone decided which lines reach the LLM."""
+    y_true, y_pass = [], []
+    for case in cases:
+        y_true.extend(case.index.annotated.astype(int).tolist())
+        y_pass.extend(0 if skip else 1 for skip in gates[case.id].decide(case.lines))
+    det = compute_detection_metrics(y_true, y_pass)
+    skipped = len(y_pass) - sum(y_pass)
+    return {
+        "lines": len(y_pass),
+        "skipped": skipped,
+        "calls_saved_pct": 100.0 * skipped / len(y_pass) if y_pass else 0.0,
+        "gate_recall": det["recall"],
+        "recall_lost": 100.0 - det["recall"] if det["actual_positives"] else 0.0,
+    }
+
+
+def print_gate_report(report: dict, threshold: float):
+    print(
+        f"\nPre-filter gate (threshold={threshold}): {report['skipped']}/{report['lines']} lines "
+        f"answered locally ({report['calls_saved_pct']:.1f}% of line calls saved), "
+        f"recall lost {report['recall_lost']:.2f} pts"
+    )
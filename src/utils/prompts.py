@@ -56,3 +56,16 @@ CONTEXT_AGG_CONTEXT_PREFIX = """Here is a summary of the conversation so far:
 {context_summary}
 
 Now process the following line:"""
+
+# Multi-line input (input_size > 1): several numbered lines per request,
+# answered with one verdict per line so detection stays line-level
+CONTEXT_AGG_MULTILINE_SYSTEM_PROMPT = REALTIME_SYSTEM_PROMPT + """
+
+You may receive several lines at once, each prefixed with its line number (e.g., "Line 12: [Patient] It's like a 9."). Apply the same rules to every line and respond only with a JSON object that maps each line number to its one-sentence summary or to "None.", for example: {"12": "Patient rates the pain as 9 out of 10.", "13": "None."}"""
+
+CONTEXT_AGG_MULTILINE_PREFIX = """Here is a summary of the conversation so far:
+{context_summary}
+
+Now process the following lines:"""
+
+CONTEXT_AGG_NUMBERED_LINE = """Line {idx}: [{speaker}] {text}"""
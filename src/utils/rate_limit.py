@@ -0,0 +1,155 @@
+"""
+Client-side rate limiting and retry policy for LLM calls.
+
+RateLimiter enforces requests-per-minute and tokens-per-minute budgets with
+two token buckets. Token usage is estimated before a request is sent and
+reconciled with the provider-reported usage afterwards. The limiter is
+thread-safe and has both blocking (acquire) and async (acquire_async)
+entry points, so one instance can be shared by LLMClient and AsyncLLMClient.
+
+RetryPolicy computes jittered exponential backoff, honoring Retry-After
+headers on 429 responses.
+"""
+
+import asyncio
+import random
+import threading
+import sys
+import time
+from dataclasses import dataclass
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `capacity` per minute.
+
+    reserve() takes tokens immediately (the balance may go negative) and
+    returns how long the caller must wait before its reservation is covered,
+    so concurrent callers are served in arrival order.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0  # tokens per second
+        self.balance = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.balance = min(self.capacity, self.balance + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        self._refill(now)
+        # 한 번에 capacity 이상을 요청하면 영원히 대기하므로 capacity로 제한
+        self.balance -= min(amount, self.capacity)
+        return 0.0 if self.balance >= 0 else -self.balance / self.rate
+
+    def credit(self, amount: float, now: float):
+        self._refill(now)
+        self.balance = min(self.capacity, self.balance + amount)
+
+
+class RateLimiter:
+    """Shared RPM/TPM limiter usable from threads and asyncio tasks."""
+
+    def __init__(
+        self,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+    ):
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, estimated_tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._blocked_until - now)
+            if self._requests is not None:
+                wait = max(wait, self._requests.reserve(1, now))
+            if self._tokens is not None:
+                wait = max(wait, self._tokens.reserve(estimated_tokens, now))
+            return wait
+
+    def acquire(self, estimated_tokens: int):
+        """Block until a request of estimated_tokens fits the budget."""
+        wait = self._reserve(estimated_tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, estimated_tokens: int):
+        """Async variant of acquire()."""
+        wait = self._reserve(estimated_tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the token bucket once the real usage is known."""
+        if self._tokens is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if actual_tokens < estimated_tokens:
+                self._tokens.credit(estimated_tokens - actual_tokens, now)
+            else:
+                self._tokens.reserve(actual_tokens - estimated_tokens, now)
+
+    def pause(self, seconds: float):
+        """Hold back every caller for `seconds` (e.g. after a 429)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+def estimate_tokens(messages: list[dict], max_tokens: int) -> int:
+    """Rough pre-send token estimate: ~4 characters per token plus overhead.
+
+    The completion budget (max_tokens) counts toward provider TPM limits,
+    so it is included; reconcile() returns the unused part.
+    """
+    prompt = sum(len(m["content"]) // 4 + 4 for m in messages) + 3
+    return prompt + max_tokens
+
+
+@dataclass
+class RetryPolicy:
+    """Jittered exponential backoff for transient API errors."""
+
+    max_retries: int = 6
+    base_delay: float = 1.0  # seconds
+    max_delay: float = 60.0
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """Seconds to wait before retry number `attempt` (0-based)."""
+        if retry_after is not None:
+            # 서버가 지정한 대기 시간 + 약간의 jitter (동시 재시도 분산)
+            return retry_after + random.uniform(0, self.base_delay)
+        ceiling = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return random.uniform(0, ceiling)  # full jitter
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Transient errors: timeouts, connection errors, 408/409/429 and 5xx."""
+    # openai는 OpenAIBackend가 쓸 때만 import됨; 없으면 openai 예외도 있을 수 없음
+    openai = sys.modules.get("openai")
+    if openai is not None:
+        if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError)):
+            return True
+        if isinstance(exc, openai.APIStatusError):
+            return exc.status_code in (408, 409, 429) or exc.status_code >= 500
+    return isinstance(exc, asyncio.TimeoutError)
+
+
+def retry_after_seconds(exc: Exception) -> float | None:
+    """Parse Retry-After (or retry-after-ms) from an API error response."""
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        return None  # HTTP-date 형식은 무시하고 지수 backoff 사용
+    return None
@@ -0,0 +1,45 @@
+"""
+Bounded-concurrency scheduler for independent LLM call chains.
+
+Each chain is one unit with an internal dependency order (e.g. the lines of
+one case under one config, each call needing the previous summary). Chains
+are independent of each other, so they run concurrently with at most
+`max_in_flight` running at once. Results come back keyed and ordered as
+the chains were given, regardless of completion order; on_result(key,
+result) is called as each chain finishes (e.g. to start scoring early).
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+from tqdm import tqdm
+
+T = TypeVar("T")
+
+
+async def run_chains(
+    chains: dict[Hashable, Callable[[], Awaitable[T]]],
+    max_in_flight: int = 8,
+    desc: str | None = None,
+    on_result: Callable[[Hashable, T], None] | None = None,
+) -> dict[Hashable, T]:
+    """Run chain factories concurrently; return {key: result} in input order."""
+    if max_in_flight < 1:
+        raise ValueError(f"max_in_flight must be >= 1, got {max_in_flight}")
+
+    semaphore = asyncio.Semaphore(max_in_flight)
+    progress = tqdm(total=len(chains), desc=desc)
+
+    async def _run(key, chain):
+        async with semaphore:
+            result = await chain()
+        progress.update(1)
+        if on_result is not None:
+            on_result(key, result)
+        return result
+
+    try:
+        results = await asyncio.gather(*(_run(key, chain) for key, chain in chains.items()))
+    finally:
+        progress.close()
+    return dict(zip(chains.keys(), results))
@@ -0,0 +1,251 @@
+"""
+Local deterministic stand-in for the OpenAI chat-completions API.
+
+Speaks enough of the protocol (POST /v1/chat/completions) for the openai
+SDK, so the experiments can be benchmarked and load-tested offline:
+
+    python -m src.utils.standin_server --port 8089 --latency lognormal:-1.5,0.5 --error-rate 0.02
+    python -m src.experiments.realtime_sim --backend openai --base-url http://127.0.0.1:8089/v1
+
+Responses are a deterministic function of the request: provider lines and
+lines without a patient turn get "None.", patient lines get a one-sentence
+paraphrase (numbered multi-line requests get a JSON object of per-line
+verdicts). Latency, injected errors (500, or 429 with Retry-After) and
+reported token counts are configurable. `stop` sequences are honored and
+`stream: true` is answered with server-sent events, one word per chunk
+(per_token_latency apart). Random draws are seeded from
+(seed, request content, occurrence count), so a run is repeatable and a
+retried request gets a fresh draw.
+"""
+
+import re
+import json
+import time
+import math
+import random
+import hashlib
+import argparse
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_TAGGED_LINE = re.compile(r"\[(Provider|Patient)\]\s*(.+)")
+_NUMBERED_LINE = re.compile(r"^Line (\d+): \[(Provider|Patient)\]\s*(.+)$", re.M)
+
+
+@dataclass
+class StandinConfig:
+    latency: str = "const:0"        # const:S | uniform:A,B | lognormal:MU,SIGMA (seconds)
+    per_token_latency: float = 0.0  # extra seconds per completion token
+    error_rate: float = 0.0         # fraction of requests that fail
+    rate_limit_share: float = 0.5   # fraction of failures returned as 429
+    retry_after: float = 1.0        # Retry-After header on 429 (seconds)
+    chars_per_token: float = 4.0    # reported usage = len(text) / chars_per_token
+    seed: int = 0
+
+
+def sample_latency(spec: str, rng: random.Random) -> float:
+    """Draw one latency (seconds) from a distribution spec string."""
+    kind, _, params = spec.partition(":")
+    args = [float(x) for x in params.split(",")] if params else []
+    if kind == "const":
+        return args[0] if args else 0.0
+    if kind == "uniform":
+        return rng.uniform(args[0], args[1])
+    if kind == "lognormal":
+        return rng.lognormvariate(args[0], args[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def _paraphrase(text: str) -> str:
+    first = re.split(r"(?<=[.!?])\s+", text.strip())[0].rstrip(".!?")
+    return f"Patient reports: {first[0].lower()}{first[1:]}." if first else ""
+
+
+def standin_reply(messages: list[dict]) -> str:
+    """Deterministic agenda-style answer for the last user message.
+
+    Numbered multi-line requests ("Line N: [Speaker] ...") get a JSON object
+    with one verdict per line.
+    """
+    content = messages[-1]["content"]
+    numbered = _NUMBERED_LINE.findall(content)
+    if numbered:
+        return json.dumps({
+            idx: (_paraphrase(text) if speaker == "Patient" else "") or "None."
+            for idx, speaker, text in numbered
+        })
+    tagged = _TAGGED_LINE.findall(content)
+    patient = [text for speaker, text in tagged if speaker == "Patient"]
+    if not patient:
+        return "None."
+    return " ".join(s for s in map(_paraphrase, patient) if s) or "None."
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: StandinConfig):
+        super().__init__(address, _Handler)
+        self.config = config
+        self.requests_served = 0
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def rng_for(self, body: bytes) -> random.Random:
+        digest = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            n = self._seen.get(digest, 0)
+            self._seen[digest] = n + 1
+            self.requests_served += 1
+        return random.Random(f"{self.config.seed}:{digest}:{n}")
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StandinServer
+
+    def log_message(self, format, *args):
+        pass  # 요청마다 로그를 찍지 않음
+
+    def _send(self, status: int, payload: dict, headers: dict | None = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        request = json.loads(raw)
+        cfg = self.server.config
+        rng = self.server.rng_for(raw)
+
+        if rng.random() < cfg.error_rate:
+            time.sleep(sample_latency(cfg.latency, rng))
+            if rng.random() < cfg.rate_limit_share:
+                self._send(
+                    429,
+                    {"error": {"message": "Rate limit reached (stand-in)", "type": "rate_limit"}},
+                    {"Retry-After": str(cfg.retry_after)},
+                )
+            else:
+                self._send(500, {"error": {"message": "Injected failure (stand-in)", "type": "server_error"}})
+            return
+
+        messages = request["messages"]
+        content = standin_reply(messages)
+        stop = request.get("stop") or []
+        for seq in [stop] if isinstance(stop, str) else stop:
+            content = content.split(seq)[0]
+        max_tokens = request.get("max_tokens") or 1024
+        max_chars = int(max_tokens * cfg.chars_per_token)
+        finish_reason = "length" if len(content) > max_chars else "stop"
+        content = content[:max_chars]
+
+        prompt_chars = sum(len(m.get("content") or "") for m in messages)
+        prompt_tokens = math.ceil(prompt_chars / cfg.chars_per_token) + 4 * len(messages)
+        completion_tokens = max(1, math.ceil(len(content) / cfg.chars_per_token))
+
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        base = {
+            "id": f"chatcmpl-standin-{self.server.requests_served}",
+            "created": int(time.time()),
+            "model": request.get("model", "standin"),
+        }
+
+        time.sleep(sample_latency(cfg.latency, rng))
+        if request.get("stream"):
+            include_usage = (request.get("stream_options") or {}).get("include_usage", False)
+            self._stream(base, content, finish_reason, usage if include_usage else None)
+            return
+
+        time.sleep(completion_tokens * cfg.per_token_latency)
+        self._send(200, {
+            **base,
+            "object": "chat.completion",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": finish_reason,
+            }],
+            "usage": usage,
+        })
+
+    def _stream(self, base: dict, content: str, finish_reason: str, usage: dict | None):
+        """Send the reply as server-sent events, one word per chunk."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def event(choices: list, extra: dict | None = None):
+            payload = {**base, "object": "chat.completion.chunk", "choices": choices, **(extra or {})}
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        try:
+            event([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+            for word in re.findall(r"\S+\s*", content):
+                time.sleep(self.server.config.per_token_latency)
+                event([{"index": 0, "delta": {"content": word}, "finish_reason": None}])
+            event([{"index": 0, "delta": {}, "finish_reason": finish_reason}])
+            if usage is not None:
+                event([], {"usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # 클라이언트가 스트림을 중간에 취소함
+
+
+def serve_in_thread(
+    config: StandinConfig | None = None, host: str = "127.0.0.1", port: int = 0
+) -> StandinServer:
+    """Start a stand-in server on a background thread (port 0 = any free port)."""
+    server = StandinServer((host, port), config or StandinConfig())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default="const:0")
+    parser.add_argument("--per-token-latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-share", type=float, default=0.5)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--chars-per-token", type=float, default=4.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = StandinConfig(
+        latency=args.latency,
+        per_token_latency=args.per_token_latency,
+        error_rate=args.error_rate,
+        rate_limit_share=args.rate_limit_share,
+        retry_after=args.retry_after,
+        chars_per_token=args.chars_per_token,
+        seed=args.seed,
+    )
+    server = StandinServer((args.host, args.port), config)
+    print(f"Stand-in server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nServed {server.requests_served} requests")
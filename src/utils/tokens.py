@@ -0,0 +1,71 @@
+"""
+Token counting for prompt budgeting and sweep planning.
+
+Uses tiktoken when it is installed and its encoding files are available;
+otherwise falls back to the ~4 characters per token heuristic used by the
+rate limiter. Message overhead follows the OpenAI chat format (3 tokens per
+message plus 3 for the reply primer).
+"""
+
+import math
+from functools import lru_cache
+
+TOKENS_PER_MESSAGE = 3
+REPLY_PRIMER_TOKENS = 3
+
+# 모델별 컨텍스트 윈도우 (prompt + completion 토큰)
+CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4o-mini": 128000,
+    "gpt-4o": 128000,
+}
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    try:
+        import tiktoken  # optional dependency, imported on first use
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # 오프라인 환경에서는 인코딩 파일을 내려받지 못함 → 근사치 사용
+        print("tiktoken encoding unavailable, using ~4 chars/token estimate")
+        return None
+
+
+def tokenizer_name(model: str = "gpt-3.5-turbo") -> str:
+    """Name of the encoding used for `model` ("chars/4" for the fallback)."""
+    enc = _encoding(model)
+    return enc.name if enc is not None else "chars/4"
+
+
+@lru_cache(maxsize=1 << 16)
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """Number of tokens in `text` under the model's tokenizer (memoized:
+    replayed context lines are counted once)."""
+    enc = _encoding(model)
+    if enc is None:
+        return math.ceil(len(text) / 4)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def message_tokens(message: dict, model: str = "gpt-3.5-turbo") -> int:
+    """Tokens one chat message adds to a prompt (content + role + overhead)."""
+    return (
+        TOKENS_PER_MESSAGE
+        + count_tokens(message.get("content") or "", model)
+        + count_tokens(message["role"], model)
+    )
+
+
+def count_message_tokens(messages: list[dict], model: str = "gpt-3.5-turbo") -> int:
+    """Prompt tokens of a chat-completions request."""
+    return sum(message_tokens(m, model) for m in messages) + REPLY_PRIMER_TOKENS
+
+
+def context_window(model: str) -> int | None:
+    return CONTEXT_WINDOWS.get(model)
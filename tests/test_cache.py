@@ -0,0 +1,111 @@
+"""ResponseCache eviction (LRU, size, age) and replay-mode misses, on a fake clock."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils import cache as cache_module
+from src.utils.backends import ChatBackend, ChatResult
+from src.utils.cache import CacheMiss, ResponseCache
+from src.utils.llm_client import LLMClient
+
+DAY = 86400
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """cache 모듈의 time.time()을 수동으로 진행하는 시계로 교체."""
+    clock = SimpleNamespace(now=1_000_000.0)
+    clock.time = lambda: clock.now
+    monkeypatch.setattr(cache_module, "time", clock)
+    return clock
+
+
+def _fill(cache, clock, keys, response="x" * 10):
+    for key in keys:
+        clock.now += 1
+        cache.put(key, response, model="m", prompt_tokens=3, completion_tokens=1)
+
+
+def test_put_get_round_trip(tmp_path, clock):
+    cache = ResponseCache(tmp_path / "c.sqlite")
+    cache.put("k", "Chest pain.", model="m", prompt_tokens=12, completion_tokens=4)
+    assert cache.get("k") == ("Chest pain.", 12, 4)
+    assert cache.get("missing") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1, "bytes": 11}
+
+
+def test_max_entries_evicts_least_recently_used(tmp_path, clock):
+    cache = ResponseCache(tmp_path / "c.sqlite", max_entries=3)
+    _fill(cache, clock, ["a", "b", "c", "d"])
+    clock.now += 1
+    assert cache.get("a") is not None  # a가 가장 최근 사용 → b가 가장 오래됨
+    assert cache.evict() == 1
+    assert [k for k in "abcd" if cache.get(k) is not None] == ["a", "c", "d"]
+
+
+def test_max_bytes_keeps_most_recent(tmp_path, clock):
+    cache = ResponseCache(tmp_path / "c.sqlite", max_bytes=25)
+    _fill(cache, clock, ["a", "b", "c", "d"])  # 10 bytes each
+    assert cache.evict() == 2
+    assert [k for k in "abcd" if cache.get(k) is not None] == ["c", "d"]
+    assert cache.stats()["bytes"] == 20
+
+
+def test_max_age_expires_on_get_and_evict(tmp_path, clock):
+    cache = ResponseCache(tmp_path / "c.sqlite", max_age_days=1)
+    _fill(cache, clock, ["old"])
+    clock.now += DAY / 2
+    _fill(cache, clock, ["new"])
+    clock.now += DAY / 2  # old는 1일 + 2초 전, new는 반나절 전
+
+    assert cache.get("old") is None
+    assert cache.get("new") is not None
+    assert cache.evict() == 1
+    assert cache.stats()["entries"] == 1
+
+
+def test_put_evicts_every_n_puts(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(ResponseCache, "EVICT_EVERY", 4)
+    cache = ResponseCache(tmp_path / "c.sqlite", max_entries=2)
+    _fill(cache, clock, ["a", "b", "c"])
+    assert cache.stats()["entries"] == 3
+    _fill(cache, clock, ["d"])
+    assert cache.stats()["entries"] == 2
+
+
+def test_replay_requires_an_existing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        ResponseCache(tmp_path / "missing.sqlite", replay=True)
+
+
+class CountingBackend(ChatBackend):
+    name = "counting"
+
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, request):
+        self.calls += 1
+        return ChatResult("Cough for a week.", 20, 5)
+
+
+def test_replay_serves_hits_and_raises_on_misses(tmp_path, clock):
+    path = tmp_path / "c.sqlite"
+    messages = [{"role": "user", "content": "cough"}]
+    backend = CountingBackend()
+    recorded = ResponseCache(path)
+    LLMClient(backend=backend, cache=recorded).conversation_call(messages)
+    recorded.close()
+
+    replay = ResponseCache(path, replay=True)
+    llm = LLMClient(backend=backend, cache=replay)
+    assert llm.conversation_call(messages) == "Cough for a week."
+    with pytest.raises(CacheMiss):
+        llm.conversation_call([{"role": "user", "content": "knee pain"}])
+    assert backend.calls == 1  # replay 모드의 miss는 API를 호출하지 않음
+
+    # replay는 읽기 전용: put/evict는 아무것도 바꾸지 않음
+    replay.put("k", "ignored")
+    assert replay.evict() == 0
+    assert replay.stats()["entries"] == 1
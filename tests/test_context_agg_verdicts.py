@@ -0,0 +1,55 @@
+"""Per-line verdicts from multi-line (input_size > 1) context_agg responses."""
+
+import pytest
+
+from src.experiments.context_agg import parse_line_verdicts
+
+LINES = [3, 4, 5]
+
+
+def test_json_object():
+    text = '{"3": "Chest pain for two days.", "4": "None.", "5": "Takes ibuprofen."}'
+    assert parse_line_verdicts(text, LINES) == ["Chest pain for two days.", "None.", "Takes ibuprofen."]
+
+
+def test_json_with_prose_and_labelled_keys():
+    text = 'Here you go:\n```json\n{"Line 3": "Chest pain.", "line 5": "Cough."}\n```'
+    assert parse_line_verdicts(text, LINES) == ["Chest pain.", "None.", "Cough."]
+
+
+def test_missing_line_is_none_not_shifted():
+    # 4번 줄이 빠져도 5번 줄의 요약이 4번으로 밀리지 않음
+    assert parse_line_verdicts('{"3": "Chest pain.", "5": "Cough."}', LINES) == ["Chest pain.", "None.", "Cough."]
+    assert parse_line_verdicts("Line 3: Chest pain.\nLine 5: Cough.", LINES) == ["Chest pain.", "None.", "Cough."]
+
+
+def test_extra_lines_are_ignored():
+    text = '{"2": "Earlier line.", "3": "Chest pain.", "4": "None.", "5": "None.", "6": "Later line."}'
+    assert parse_line_verdicts(text, LINES) == ["Chest pain.", "None.", "None."]
+
+
+@pytest.mark.parametrize("value", ['null', '""', '"none"', '"None"', '" None. "'])
+def test_none_spellings(value):
+    assert parse_line_verdicts(f'{{"3": {value}, "4": "Cough."}}', LINES) == ["None.", "Cough.", "None."]
+
+
+def test_truncated_json_keeps_complete_pairs():
+    text = '{"3": "Chest pain for two days.", "4": "Takes \\"ibuprofen\\" daily.", "5": "Cou'
+    assert parse_line_verdicts(text, LINES) == [
+        "Chest pain for two days.", 'Takes "ibuprofen" daily.', "None."
+    ]
+
+
+def test_numbered_line_fallback():
+    text = "3. Chest pain.\n4) None\n5: Cough for a week."
+    assert parse_line_verdicts(text, LINES) == ["Chest pain.", "None.", "Cough for a week."]
+
+
+def test_json_array_falls_back_to_numbered_lines():
+    text = '["Chest pain.", "None.", "Cough."]'
+    assert parse_line_verdicts(text, LINES) == ["None.", "None.", "None."]
+
+
+def test_unparseable_response_is_all_none():
+    assert parse_line_verdicts("I could not summarize these lines.", LINES) == ["None."] * 3
+    assert parse_line_verdicts("", LINES) == ["None."] * 3
@@ -0,0 +1,124 @@
+"""Directory, JSONL and corpus-pack layouts load identically; shards partition the corpus."""
+
+import argparse
+import json
+from pathlib import Path
+
+import pytest
+
+from src.utils.corpus_pack import PackedCorpus, pack_corpus
+from src.utils.data_loader import iter_cases, load_all_cases, parse_shard, write_corpus_jsonl
+
+ROOT = Path(__file__).resolve().parents[1]
+
+SYNTHETIC = [
+    {
+        "id": "synthetic_unicode",
+        "lines": [
+            {"speaker": "Provider", "text": "Any pain? 🙂"},
+            {"speaker": "Patient", "text": "Yes — in my knée, since Tuesday.\nIt gets worse at night."},
+            {"speaker": "Interpreter", "text": ""},
+        ],
+        "annotations": [
+            {"line_idx": 1, "type": "agenda_item", "summary": "Knee pain."},
+            {"line_idx": 1, "type": "detail", "summary": "Worse at night, since Tuesday."},
+        ],
+    },
+    {"id": "synthetic_empty", "lines": [], "annotations": []},
+]
+
+
+@pytest.fixture(scope="module")
+def corpus_dir(tmp_path_factory):
+    """data/의 실제 case + 경계 사례(유니코드, 한 줄에 여러 주석, 빈 case)."""
+    root = tmp_path_factory.mktemp("corpus")
+    transcripts, annotations = root / "processed", root / "annotations"
+    transcripts.mkdir()
+    annotations.mkdir()
+    for source, target in ((ROOT / "data/processed", transcripts), (ROOT / "data/annotations", annotations)):
+        for f in source.glob("*.json"):
+            (target / f.name).write_bytes(f.read_bytes())
+    for case in SYNTHETIC:
+        (transcripts / f"{case['id']}.json").write_text(
+            json.dumps({"id": case["id"], "lines": case["lines"]}, ensure_ascii=False), encoding="utf-8"
+        )
+        (annotations / f"{case['id']}.json").write_text(
+            json.dumps({"id": case["id"], "annotations": case["annotations"]}, ensure_ascii=False),
+            encoding="utf-8",
+        )
+    return transcripts, annotations
+
+
+@pytest.fixture(scope="module")
+def layouts(corpus_dir, tmp_path_factory):
+    """layout 이름 → (source, annotation_dir)."""
+    transcripts, annotations = corpus_dir
+    root = tmp_path_factory.mktemp("layouts")
+    write_corpus_jsonl(iter_cases(str(transcripts), str(annotations)), str(root / "corpus.jsonl"))
+    pack_corpus(iter_cases(str(transcripts), str(annotations)), root / "corpus.pack")
+    return {
+        "directory": (str(transcripts), str(annotations)),
+        "jsonl": (str(root / "corpus.jsonl"), None),
+        "pack": (str(root / "corpus.pack"), None),
+    }
+
+
+def _snapshot(case):
+    """Everything an experiment reads from a case, in comparable form."""
+    return (
+        case.id,
+        [(l.speaker, l.text) for l in case.lines],
+        [(a.line_idx, a.type, a.summary) for a in case.annotations],
+        case.index.annotated.tolist(),
+        case.index.reference,
+        {i: [a.summary for a in anns] for i, anns in case.index.by_line.items()},
+    )
+
+
+@pytest.mark.parametrize("layout", ["jsonl", "pack"])
+def test_layouts_load_identically(layouts, layout):
+    expected = [_snapshot(c) for c in iter_cases(*layouts["directory"])]
+    assert len(expected) == len(list((ROOT / "data/processed").glob("*.json"))) + len(SYNTHETIC)
+    source, annotation_dir = layouts[layout]
+    assert [_snapshot(c) for c in iter_cases(source, annotation_dir)] == expected
+    assert [_snapshot(c) for c in load_all_cases(source, annotation_dir)] == expected
+    assert list(iter_cases(source, annotation_dir)) == list(iter_cases(*layouts["directory"]))
+
+
+def test_pack_round_trips_through_its_hash(layouts):
+    corpus = PackedCorpus(layouts["pack"][0])
+    assert corpus.verify()
+    repacked = Path(layouts["pack"][0]).with_name("repacked.pack")
+    pack_corpus(iter_cases(*layouts["jsonl"]), repacked)
+    assert PackedCorpus(repacked).content_hash == corpus.content_hash
+
+
+@pytest.mark.parametrize("layout", ["directory", "jsonl", "pack"])
+@pytest.mark.parametrize("count", [1, 2, 3, 5, 20])
+def test_shards_partition_the_corpus(layouts, layout, count):
+    source, annotation_dir = layouts[layout]
+    everything = [c.id for c in iter_cases(source, annotation_dir)]
+    shards = [[c.id for c in iter_cases(source, annotation_dir, shard=(i, count))] for i in range(count)]
+    # 겹치지 않고, 합치면 전체 (각 shard는 파일 순서 유지)
+    assert sorted(sum(shards, [])) == sorted(everything)
+    assert len(set(sum(shards, []))) == len(everything)
+    for i, ids in enumerate(shards):
+        assert ids == everything[i::count]
+        assert [c.id for c in load_all_cases(source, annotation_dir, shard=(i, count))] == ids
+
+
+@pytest.mark.parametrize("spec, shard", [("0/1", (0, 1)), ("2/3", (2, 3)), (" 1 / 4 ", (1, 4))])
+def test_parse_shard(spec, shard):
+    assert parse_shard(spec) == shard
+
+
+@pytest.mark.parametrize("spec", ["3/3", "-1/2", "0/0", "1", "a/b", "1/2/3"])
+def test_parse_shard_rejects(spec):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_shard(spec)
+
+
+def test_packed_cases_decode_each_case_once(layouts):
+    cases = load_all_cases(layouts["pack"][0], None, shard=(1, 2))
+    assert cases[0] is cases[0]
+    assert [c.id for c in cases[-2:]] == [c.id for c in list(cases)[-2:]]
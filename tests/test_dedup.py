@@ -0,0 +1,72 @@
+"""Cross-config request dedup (SingleFlight) and its ledger accounting."""
+
+import argparse
+import asyncio
+
+import pytest
+
+from src.utils import llm_client
+from src.utils.backends import ChatBackend, ChatResult
+from src.utils.llm_client import AsyncLLMClient, add_llm_arguments, client_from_args
+
+MESSAGES = [{"role": "system", "content": "summarize"}, {"role": "user", "content": "chest pain"}]
+
+
+class SlowBackend(ChatBackend):
+    """Counts requests; each one stays in flight long enough to overlap."""
+
+    name = "slow"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def acomplete(self, request):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return ChatResult("Patient reports chest pain.", prompt_tokens=20, completion_tokens=5)
+
+
+def _run(llm, configs):
+    async def calls():
+        return await asyncio.gather(*(
+            llm.conversation_call(MESSAGES, tag={"experiment": "exp", "config": cfg, "case_id": "c1"})
+            for cfg in configs
+        ))
+
+    return asyncio.run(calls())
+
+
+def test_identical_concurrent_requests_are_sent_once():
+    backend = SlowBackend()
+    llm = AsyncLLMClient(backend=backend)
+    responses = _run(llm, ["0", "1", "20"])
+
+    assert backend.calls == 1
+    assert responses == ["Patient reports chest pain."] * 3
+    assert llm.flights.stats()["shared"] == 2
+
+    records = llm.ledger.select("exp")
+    assert [r.deduplicated for r in records] == [False, True, True]
+    # 공유한 config에도 원래 요청의 토큰이 기록됨
+    assert {(r.prompt_tokens, r.completion_tokens) for r in records} == {(20, 5)}
+
+    summary = llm.ledger.summarize("exp")
+    assert summary["1"]["estimated_cost_usd"] == pytest.approx(summary["0"]["estimated_cost_usd"])
+    assert summary["1"]["estimated_cost_usd"] > 0
+    assert summary["1"]["billed_cost_usd"] == 0
+    assert summary["all"]["billed_tokens"] == 25
+    assert summary["all"]["billed_cost_usd"] == pytest.approx(summary["0"]["billed_cost_usd"])
+
+
+@pytest.mark.parametrize("flags, sent", [([], 1), (["--no-dedup"], 3)])
+def test_no_dedup_flag(monkeypatch, flags, sent):
+    backend = SlowBackend()
+    monkeypatch.setattr(llm_client, "backend_from_args", lambda args: backend)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="gpt-3.5-turbo")  # 각 실험 스크립트가 등록
+    add_llm_arguments(parser)
+    llm = client_from_args(parser.parse_args(flags), AsyncLLMClient)
+
+    _run(llm, ["0", "1", "20"])
+    assert backend.calls == sent
+    assert sum(r.deduplicated for r in llm.ledger.select("exp")) == 3 - sent
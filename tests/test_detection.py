@@ -0,0 +1,93 @@
+"""sweep_detection against compute_detection_metrics, one case at a time."""
+
+import random
+
+import numpy as np
+import pytest
+
+from src.evaluation.detection import compute_detection_metrics, line_level_detection, sweep_detection
+
+OUTPUTS = ["None.", "None", " none. ", "Patient reports chest pain.", "Cough for two weeks."]
+
+
+def reference(predictions, annotated, num_lines):
+    """The per-case loop sweep_detection replaces."""
+    results = {}
+    for key, cases in predictions.items():
+        per_case = [
+            compute_detection_metrics(*line_level_detection(outputs, [{"line_idx": i} for i in lines], n))
+            for outputs, lines, n in zip(cases, annotated, num_lines)
+        ]
+        precision = [m["precision"] for m in per_case]
+        recall = [m["recall"] for m in per_case]
+        tp = sum(m["true_positives"] for m in per_case)
+        pp = sum(m["predicted_positives"] for m in per_case)
+        ap = sum(m["actual_positives"] for m in per_case)
+        results[key] = {
+            "precision": {"mean": float(np.mean(precision)), "std": float(np.std(precision))},
+            "recall": {"mean": float(np.mean(recall)), "std": float(np.std(recall))},
+            "micro": {
+                "precision": tp / pp * 100 if pp else 0.0,
+                "recall": tp / ap * 100 if ap else 0.0,
+            },
+        }
+    return results
+
+
+def _random_sweep(rng):
+    num_lines = [rng.choice([0, 1, rng.randint(2, 40)]) for _ in range(rng.randint(1, 6))]
+    annotated = [sorted(rng.sample(range(n), rng.randint(0, n))) for n in num_lines]
+    predictions = {
+        cfg: [[rng.choice(OUTPUTS) for _ in range(n)] for n in num_lines]
+        for cfg in range(rng.randint(1, 4))
+    }
+    return predictions, annotated, num_lines
+
+
+def assert_matches(got, expected):
+    assert got.keys() == expected.keys()
+    for key in expected:
+        for metric in ("precision", "recall"):
+            for stat in ("mean", "std"):
+                assert got[key][metric][stat] == pytest.approx(expected[key][metric][stat])
+            assert got[key]["micro"][metric] == pytest.approx(expected[key]["micro"][metric])
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_random_sweeps_match_the_per_case_metrics(seed):
+    predictions, annotated, num_lines = _random_sweep(random.Random(seed))
+    assert_matches(sweep_detection(predictions, annotated, num_lines), reference(predictions, annotated, num_lines))
+
+
+def test_line_bitmaps_match_line_indices():
+    predictions, annotated, num_lines = _random_sweep(random.Random(7))
+    bitmaps = []
+    for lines, n in zip(annotated, num_lines):
+        bitmap = np.zeros(n, dtype=bool)
+        bitmap[lines] = True
+        bitmaps.append(bitmap)
+    assert_matches(sweep_detection(predictions, bitmaps, num_lines), reference(predictions, annotated, num_lines))
+
+
+def test_empty_cases():
+    predictions = {"0": [[], [], []]}
+    result = sweep_detection(predictions, [[], [], []], [0, 0, 0])
+    assert_matches(result, reference(predictions, [[], [], []], [0, 0, 0]))
+    assert result["0"]["micro"] == {"precision": 0.0, "recall": 0.0}
+
+
+def test_all_none_outputs():
+    num_lines = [5, 3]
+    annotated = [[1, 4], [0]]
+    predictions = {"max": [["None."] * 5, ["None", " none. ", "NONE."]]}
+    result = sweep_detection(predictions, annotated, num_lines)
+    assert_matches(result, reference(predictions, annotated, num_lines))
+    assert result["max"]["precision"]["mean"] == 0.0
+    assert result["max"]["recall"]["mean"] == 0.0
+    assert list(result["max"]["per_case"]["predicted_positives"]) == [0, 0]
+    assert list(result["max"]["per_case"]["actual_positives"]) == [2, 1]
+
+
+def test_output_count_mismatch_is_an_error():
+    with pytest.raises(ValueError):
+        sweep_detection({"0": [["None."] * 2]}, [[0]], [3])
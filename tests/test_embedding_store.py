@@ -0,0 +1,89 @@
+"""EmbeddingStore LRU eviction and heap compaction keep surviving arrays bit-identical."""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.evaluation import embedding_store
+from src.evaluation.embedding_store import EmbeddingStore
+
+MODEL = "test-encoder"
+ENTRY_BYTES = 64 * 256 * 4  # (64, 256) float32
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """LRU 순서를 결정적으로 만들기 위해 time.time()을 호출마다 1초씩 진행."""
+    clock = SimpleNamespace(now=0.0)
+
+    def tick():
+        clock.now += 1
+        return clock.now
+
+    clock.time = tick
+    monkeypatch.setattr(embedding_store, "time", clock)
+    return clock
+
+
+def _arrays(n, seed=0):
+    rng = np.random.default_rng(seed)
+    arrays = {}
+    for i in range(n):
+        arr = rng.standard_normal((64, 256)).astype(np.float32)
+        # 값 비교로는 놓치는 비트 차이(-0.0, NaN payload, subnormal)도 검사
+        arr[0, :4] = [-0.0, np.nan, np.float32(1e-45), np.inf]
+        arrays[f"sentence {i}"] = arr
+    return arrays
+
+
+def assert_bit_identical(got, expected):
+    assert got.shape == expected.shape and got.dtype == np.float32
+    assert got.tobytes() == expected.tobytes()
+
+
+def test_compaction_keeps_surviving_vectors_bit_identical(tmp_path, clock):
+    arrays = _arrays(40)
+    texts = list(arrays)
+    store = EmbeddingStore(tmp_path / "store", max_bytes=4 * ENTRY_BYTES)
+    for i, text in enumerate(texts):
+        store.put(MODEL, text, arrays[text])
+        if i >= 1:
+            store.get(MODEL, texts[0])  # 첫 항목은 계속 사용 → LRU에서 살아남음
+
+    stats = store.stats()
+    assert stats["entries"] == 4 and stats["bytes"] == 4 * ENTRY_BYTES
+    # 죽은 공간이 1 MiB를 넘으면 heap을 다시 씀 → 40개를 모두 쓴 크기보다 작음
+    assert stats["heap_bytes"] < 40 * ENTRY_BYTES
+
+    survivors = [texts[0], *texts[-3:]]
+    found = store.get_many(MODEL, texts)
+    assert sorted(found) == sorted(survivors)
+    for text in survivors:
+        assert_bit_identical(found[text], arrays[text])
+    store.close()
+
+    # 압축 후 다시 열어도 offset과 내용이 그대로
+    reopened = EmbeddingStore(tmp_path / "store", max_bytes=4 * ENTRY_BYTES)
+    for text in survivors:
+        assert_bit_identical(reopened.get(MODEL, text), arrays[text])
+    reopened.close()
+
+
+def test_mixed_shapes_survive_compaction(tmp_path, clock):
+    rng = np.random.default_rng(1)
+    vectors = {f"s{i}": rng.standard_normal(384).astype(np.float32) for i in range(8)}
+    store = EmbeddingStore(tmp_path / "store", max_bytes=8 * 384 * 4 + 2 * ENTRY_BYTES)
+    store.put_many(MODEL, vectors)
+    for text, arr in _arrays(30, seed=2).items():
+        store.put(MODEL, text, arr)
+        store.get_many(MODEL, list(vectors))
+
+    assert store.stats()["heap_bytes"] < 30 * ENTRY_BYTES
+    found = store.get_many(MODEL, list(vectors))
+    assert found.keys() == vectors.keys()
+    for text, vec in vectors.items():
+        assert_bit_identical(found[text], vec)
+    # 다른 모델의 같은 텍스트는 별개 항목
+    assert store.get("other-encoder", "s0") is None
+    store.close()
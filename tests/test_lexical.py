@@ -0,0 +1,46 @@
+"""Bit-parallel LCS and batch ROUGE-L/BLEU against the reference implementations."""
+
+import random
+
+import pytest
+
+from src.evaluation import lexical
+from src.evaluation.lexical import LexicalScorer, lcs_length
+
+WORDS = ["chest", "pain", "none", "cough", "fever", "sleep", "pain", "a", "the"]
+
+
+def reference_lcs(a, b):
+    """The O(n·m) DP table."""
+    table = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i, x in enumerate(a):
+        for j, y in enumerate(b):
+            table[i + 1][j + 1] = table[i][j] + 1 if x == y else max(table[i][j + 1], table[i + 1][j])
+    return table[-1][-1]
+
+
+def _sequences(rng, n):
+    return [tuple(rng.choices(WORDS, k=rng.randint(0, 70))) for _ in range(n)]
+
+
+def test_lcs_matches_dp_table():
+    rng = random.Random(0)
+    seqs = _sequences(rng, 60)
+    for a, b in zip(seqs, reversed(seqs)):
+        assert lcs_length(a, b) == reference_lcs(a, b)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_scores_match_rouge_score_and_nltk(workers):
+    rng = random.Random(1)
+    pairs = [(" ".join(p), " ".join(r)) for p, r in zip(_sequences(rng, 40), _sequences(rng, 40))]
+    pairs += [("", "chest pain"), ("None.", "chest pain"), ("?!", "chest pain")]
+    report = lexical.check_parity(pairs, workers=workers, min_parallel=1)
+    assert report["rouge_mismatches"] == 0 and report["bleu_mismatches"] == 0
+
+    # 같은 pair를 프로세스 풀로 채점해도 결과가 같아야 함
+    with LexicalScorer(workers, min_parallel=1) as scorer:
+        got = scorer.score([p for p, _ in pairs], [r for _, r in pairs])
+        assert (scorer._pool is not None) == (workers > 1)
+    assert scorer._pool is None
+    assert got == LexicalScorer(1).score([p for p, _ in pairs], [r for _, r in pairs])
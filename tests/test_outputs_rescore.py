@@ -0,0 +1,81 @@
+"""write_outputs → load_outputs → rescore reproduces each experiment's results JSON."""
+
+import json
+import zlib
+from pathlib import Path
+
+import pytest
+
+from src.evaluation.metrics import SummarizationMetrics
+from src.experiments import baseline, context_agg, input_lines, realtime_sim, rescore
+from src.utils.backends import ChatBackend, ChatResult
+from src.utils.data_loader import load_all_cases
+from src.utils.llm_client import AsyncLLMClient
+from src.utils.outputs import load_outputs, outputs_path, write_outputs
+from src.utils.ledger import Ledger
+
+ROOT = Path(__file__).resolve().parents[1]
+TRANSCRIPTS, ANNOTATIONS = str(ROOT / "data/processed"), str(ROOT / "data/annotations")
+
+
+class EchoBackend(ChatBackend):
+    """Deterministic responses: "None." for most requests, else the line itself."""
+
+    name = "echo"
+
+    def complete(self, request):
+        line = request["messages"][-1]["content"]
+        if zlib.crc32(line.encode()) % 3:
+            return ChatResult("None.", 10, 2)
+        return ChatResult(line.splitlines()[-1][:80], 10, 12)
+
+
+RUNS = {
+    "baseline": lambda **kw: baseline.run_baseline(TRANSCRIPTS, ANNOTATIONS, **kw),
+    "input_lines": lambda **kw: input_lines.run_input_lines(
+        TRANSCRIPTS, ANNOTATIONS, chunk_sizes=[2, 10], **kw
+    ),
+    "realtime_sim": lambda **kw: realtime_sim.run_realtime_simulation(
+        TRANSCRIPTS, ANNOTATIONS, context_sizes=[0, 1, "max"], **kw
+    ),
+    "context_agg": lambda **kw: context_agg.run_context_aggregation(
+        TRANSCRIPTS, ANNOTATIONS,
+        configs=[
+            {"aggregation": "sliding_window", "input_size": 1, "context_size": 2},
+            {"aggregation": "growing_window", "input_size": 5, "context_size": 5},
+        ],
+        **kw,
+    ),
+}
+
+
+@pytest.fixture(scope="module")
+def metrics():
+    # ROUGE-L/BLEU만 → 인코더 모델 없이 실행
+    return SummarizationMetrics(metrics=["rouge_l", "bleu"], lexical_workers=1)
+
+
+@pytest.mark.parametrize("experiment", list(RUNS))
+def test_rescore_reproduces_the_results_json(tmp_path, metrics, experiment):
+    results_file = tmp_path / f"{experiment}_results.json"
+    RUNS[experiment](
+        output_path=str(results_file), llm=AsyncLLMClient(backend=EchoBackend()), metrics=metrics
+    )
+    expected = json.loads(results_file.read_text(encoding="utf-8"))
+
+    cases = load_all_cases(TRANSCRIPTS, ANNOTATIONS)
+    rescored = rescore.rescore(outputs_path(results_file), cases, metrics)
+    assert json.loads(json.dumps(rescored)) == expected
+
+
+def test_write_then_load_outputs(tmp_path):
+    outputs = {(cfg, f"case_{i}"): [f"{cfg}-{i}-{j}" for j in range(3)] for cfg in (0, 1, "max") for i in range(4)}
+    path = write_outputs(
+        tmp_path / "r.json", "exp", "model", [(0, "0"), (1, "1"), ("max", "max"), (20, "20")],
+        outputs, Ledger(), settings={"context_sizes": [0, 1, "max", 20]},
+    )
+    header, loaded = load_outputs(path)
+    assert loaded == outputs
+    assert header["settings"] == {"context_sizes": [0, 1, "max", 20]}
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    assert [len(run["cases"]) for run in payload["runs"]] == [4, 4, 4, 0]
@@ -0,0 +1,74 @@
+"""Pre-filter gate: the threshold alone decides what is skipped, and its report."""
+
+import numpy as np
+import pytest
+
+from src.utils.data_loader import Annotation, ClinicalCase, TranscriptLine
+from src.utils.prefilter import LineGate, cross_fitted_gates, gate_report
+
+PROVIDER = ["Any chest pain?", "How long has it been?", "Let me check your chart.", "Okay."]
+PATIENT = ["I have had a cough for two weeks.", "My knee hurts when I walk.", "Fine, thanks.", "Yes."]
+
+
+def _cases(n=6):
+    cases = []
+    for c in range(n):
+        lines, annotations = [], []
+        for i in range(8):
+            speaker, texts = ("Provider", PROVIDER) if i % 2 == 0 else ("Patient", PATIENT)
+            text = texts[(i // 2 + c) % len(texts)]
+            lines.append(TranscriptLine(speaker=speaker, text=text))
+            if speaker == "Patient" and "." in text and len(text) > 12:
+                annotations.append(Annotation(line_idx=i, type="detail", summary=text))
+        cases.append(ClinicalCase(id=f"case_{c}", lines=lines, annotations=annotations))
+    return cases
+
+
+def test_threshold_above_every_probability_skips_nothing():
+    cases = _cases()
+    gates = cross_fitted_gates(cases, threshold=0.5)
+    top = max(float(gates[c.id].none_probability(c.lines).max()) for c in cases)
+    assert top < 1.0
+    for case in cases:
+        gate = gates[case.id]
+        gate.threshold = np.nextafter(top, 1.0)
+        assert not any(gate.decide(case.lines))
+        gate.threshold = 1.0
+        assert not any(gate.decide(case.lines))
+
+
+def test_provider_questions_are_not_forced_to_none():
+    gate = LineGate(threshold=1.0)  # 학습 전: 모델이 없으면 아무 줄도 건너뛰지 않음
+    questions = [TranscriptLine(speaker="Provider", text=text) for text in PROVIDER[:2]]
+    assert gate.decide(questions) == [False, False]
+    gate.fit(_cases())
+    assert all(p < 1.0 for p in gate.none_probability(questions))
+
+
+class FixedGate:
+    def __init__(self, skips):
+        self.skips = skips
+
+    def decide(self, lines):
+        return self.skips
+
+
+def test_gate_report_counts_recall_lost():
+    cases = _cases(2)
+    annotated = [set(np.flatnonzero(c.index.annotated)) for c in cases]
+    # case_0: 주석 줄 하나를 건너뜀, case_1: 주석 없는 줄만 건너뜀
+    first = sorted(annotated[0])[0]
+    skips = [
+        [i == first or i == 0 for i in range(8)],
+        [i in (0, 2) for i in range(8)],
+    ]
+    report = gate_report(cases, {c.id: FixedGate(s) for c, s in zip(cases, skips)})
+    total = sum(len(a) for a in annotated)
+    assert report["lines"] == 16
+    assert report["skipped"] == 4
+    assert report["calls_saved_pct"] == 25.0
+    assert report["gate_recall"] == pytest.approx(100.0 * (total - 1) / total)
+    assert report["recall_lost"] == pytest.approx(100.0 / total)
+
+    nothing = gate_report(cases, {c.id: FixedGate([False] * 8) for c in cases})
+    assert (nothing["skipped"], nothing["recall_lost"]) == (0, 0.0)
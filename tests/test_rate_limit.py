@@ -0,0 +1,150 @@
+"""Token-bucket pacing, 429 pauses and Retry-After handling on a fake monotonic clock."""
+
+import asyncio
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils import llm_client, rate_limit
+from src.utils.backends import ChatBackend, ChatResult
+from src.utils.llm_client import LLMClient
+from src.utils.rate_limit import RateLimiter, RetryPolicy, TokenBucket, retry_after_seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """rate_limit 모듈의 time.monotonic()/sleep()을 가짜 시계로 교체 (sleep은 시계만 진행)."""
+    clock = SimpleNamespace(now=100.0, sleeps=[])
+    clock.monotonic = lambda: clock.now
+
+    def sleep(seconds):
+        clock.sleeps.append(seconds)
+        clock.now += seconds
+
+    clock.sleep = sleep
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+def test_token_bucket_paces_after_the_burst():
+    bucket = TokenBucket(60)  # 초당 1개
+    now = bucket.updated
+    assert [bucket.reserve(1, now) for _ in range(60)] == [0.0] * 60
+    # 잔고가 바닥난 뒤에는 도착 순서대로 1초씩 밀림
+    assert [bucket.reserve(1, now) for _ in range(3)] == [1.0, 2.0, 3.0]
+    assert bucket.reserve(1, now + 10) == pytest.approx(0.0)
+
+
+def test_token_bucket_credit_and_oversized_requests():
+    bucket = TokenBucket(600)  # 초당 10개
+    now = bucket.updated
+    assert bucket.reserve(550, now) == 0.0
+    bucket.credit(500, now)
+    assert bucket.balance == 550
+    bucket.credit(500, now)
+    assert bucket.balance == 600  # capacity 이상 쌓이지 않음
+    # capacity보다 큰 요청은 capacity로 제한 → 무한 대기하지 않음
+    assert bucket.reserve(10_000, now) == 0.0
+    assert bucket.reserve(10, now) == pytest.approx(1.0)
+
+
+def test_limiter_blocks_on_requests_and_tokens(clock):
+    limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=600)
+    limiter.acquire(100)
+    limiter.acquire(100)
+    assert clock.sleeps == []
+    limiter.acquire(100)  # RPM 2 → 세 번째 요청은 30초 대기
+    assert clock.sleeps == [pytest.approx(30.0)]
+
+    clock.now += 60
+    limiter.acquire(700)  # TPM: capacity(600)로 제한 → 가득 찬 bucket을 비우고 통과
+    assert len(clock.sleeps) == 1
+    assert limiter._reserve(600) == pytest.approx(60.0)
+
+
+def test_reconcile_returns_unused_tokens(clock):
+    limiter = RateLimiter(tokens_per_minute=600)
+    limiter.acquire(600)
+    assert limiter._reserve(0) == 0.0
+    limiter.reconcile(estimated_tokens=600, actual_tokens=100)
+    assert limiter._reserve(500) == 0.0
+    limiter.reconcile(estimated_tokens=0, actual_tokens=60)  # 추정보다 많이 쓴 경우
+    assert limiter._reserve(0) == pytest.approx(6.0)
+
+
+def test_pause_holds_every_caller(clock):
+    limiter = RateLimiter(requests_per_minute=600)
+    limiter.pause(5)
+    limiter.pause(2)  # 더 짧은 pause가 기존 대기를 줄이지 않음
+    limiter.acquire(1)
+    assert clock.sleeps == [pytest.approx(5.0)]
+
+    async def acquire():
+        await limiter.acquire_async(1)
+
+    asyncio.run(acquire())  # pause가 지나면 바로 통과
+    assert len(clock.sleeps) == 1
+
+
+class RateLimited(asyncio.TimeoutError):
+    """A retryable error carrying a 429 status and Retry-After headers."""
+
+    status_code = 429
+
+    def __init__(self, headers):
+        super().__init__("rate limited")
+        self.response = SimpleNamespace(headers=headers)
+
+
+@pytest.mark.parametrize("headers, seconds", [
+    ({"retry-after": "7"}, 7.0),
+    ({"retry-after-ms": "1500", "retry-after": "9"}, 1.5),
+    ({"retry-after": "Wed, 21 Oct 2026 07:28:00 GMT"}, None),
+    ({}, None),
+])
+def test_retry_after_seconds(headers, seconds):
+    assert retry_after_seconds(RateLimited(headers)) == seconds
+    assert retry_after_seconds(ValueError("no response")) is None
+
+
+def test_retry_delay_honors_retry_after():
+    policy = RetryPolicy(base_delay=0.5, max_delay=8.0)
+    random.seed(0)
+    for attempt in range(6):
+        assert 7.0 <= policy.delay(attempt, retry_after=7.0) <= 7.5
+        # Retry-After가 없으면 full jitter: [0, min(max_delay, base * 2^attempt)]
+        assert 0.0 <= policy.delay(attempt) <= min(8.0, 0.5 * 2 ** attempt)
+
+
+class FlakyBackend(ChatBackend):
+    name = "flaky"
+
+    def __init__(self, failures):
+        self.failures = failures
+
+    def complete(self, request):
+        if self.failures:
+            self.failures -= 1
+            raise RateLimited({"retry-after": "3"})
+        return ChatResult("Cough for a week.", 20, 5)
+
+
+def test_client_waits_retry_after_and_pauses_the_limiter(clock, monkeypatch):
+    monkeypatch.setattr(rate_limit.random, "uniform", lambda low, high: low)
+    limiter = RateLimiter(requests_per_minute=600)
+    llm = LLMClient(backend=FlakyBackend(failures=2), limiter=limiter, retry=RetryPolicy(max_retries=3))
+    monkeypatch.setattr(llm_client, "time", clock)
+
+    assert llm.conversation_call([{"role": "user", "content": "cough"}]) == "Cough for a week."
+    # 매 429마다 client가 3초 대기하고 limiter도 pause됨 (이미 지난 pause는 추가 대기 없음)
+    assert clock.sleeps == [3.0, 3.0]
+    assert limiter._blocked_until == pytest.approx(clock.now)
+
+
+def test_client_gives_up_after_max_retries(clock, monkeypatch):
+    monkeypatch.setattr(llm_client, "time", clock)
+    llm = LLMClient(backend=FlakyBackend(failures=5), retry=RetryPolicy(max_retries=2))
+    with pytest.raises(RateLimited):
+        llm.conversation_call([{"role": "user", "content": "cough"}])
+    assert len(clock.sleeps) == 2
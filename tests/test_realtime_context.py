@@ -0,0 +1,49 @@
+"""Context token budget: counted only when set, and reused as the prompt size."""
+
+import asyncio
+
+import pytest
+
+from src.utils.data_loader import ClinicalCase, TranscriptLine
+from src.experiments import realtime_sim
+from src.utils.tokens import count_message_tokens
+
+
+class CountingClient:
+    model = "gpt-3.5-turbo"
+
+    def __init__(self):
+        self.calls = []
+
+    async def conversation_call(self, messages, tag=None, prompt_tokens=None):
+        self.calls.append((prompt_tokens, count_message_tokens(messages, self.model)))
+        return "None." if len(self.calls) % 2 else "Patient reports chest pain."
+
+
+def _case(n_lines=8):
+    lines = [TranscriptLine(speaker="Provider", text=f"How is the pain today, visit line {i}?") for i in range(n_lines)]
+    return ClinicalCase(id="case_x", lines=lines, annotations=[])
+
+
+def test_prompt_tokens_match_the_sent_messages():
+    llm = CountingClient()
+    asyncio.run(realtime_sim.simulate_case(llm, _case(), "max", token_budget=60))
+    assert llm.calls and all(given == actual for given, actual in llm.calls)
+
+
+def test_no_tokenizing_without_a_budget(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("tokenized without a budget")
+
+    monkeypatch.setattr(realtime_sim, "message_tokens", fail)
+    llm = CountingClient()
+    asyncio.run(realtime_sim.simulate_case(llm, _case(), "max"))
+    assert [given for given, _ in llm.calls] == [None] * 8
+
+
+@pytest.mark.parametrize("budget", [0, 60, 10_000])
+def test_budget_caps_the_replayed_context(budget):
+    llm = CountingClient()
+    asyncio.run(realtime_sim.simulate_case(llm, _case(), "max", token_budget=budget))
+    system_and_line = llm.calls[0][1]
+    assert all(actual - system_and_line <= budget for _, actual in llm.calls)
@@ -0,0 +1,81 @@
+"""Record → replay round trip for streamed (realtime_call) requests."""
+
+import asyncio
+
+import pytest
+
+from src.utils.backends import ChatBackend, ChatResult, RecordingBackend, ReplayBackend
+from src.utils.llm_client import AsyncLLMClient, LLMClient, early_verdict
+
+# 줄 → 스트리밍 청크 (앞의 둘은 early "None"으로 중간에 끊김)
+RESPONSES = {
+    "line a": ["None", ".", " extra text the client never reads"],
+    "line b": ["None", "\n"],
+    "line c": ["None", " of the", " medications helped."],
+    "line d": ["Patient reports", " chest pain."],
+}
+
+
+class ChunkedBackend(ChatBackend):
+    name = "chunked"
+
+    def __init__(self):
+        self.closed_early = 0
+
+    def stream(self, request):
+        chunks = RESPONSES[request["messages"][-1]["content"]]
+        finished = False
+        try:
+            for chunk in chunks:
+                yield ChatResult(chunk)
+            yield ChatResult("", prompt_tokens=10, completion_tokens=len(chunks))
+            finished = True
+        finally:
+            self.closed_early += not finished
+
+    async def astream(self, request):
+        for chunk in self.stream(request):
+            yield chunk
+
+    def complete(self, request):
+        return ChatResult("".join(RESPONSES[request["messages"][-1]["content"]]))
+
+
+def _messages(line):
+    return [{"role": "system", "content": "summarize"}, {"role": "user", "content": line}]
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_streamed_record_replay_round_trip(tmp_path, use_async):
+    cassette = tmp_path / "cassette.jsonl"
+    inner = ChunkedBackend()
+
+    def run(backend):
+        if use_async:
+            llm = AsyncLLMClient(backend=backend)
+
+            async def calls():
+                return [await llm.realtime_call(_messages(line)) for line in RESPONSES]
+
+            return asyncio.run(calls())
+        llm = LLMClient(backend=backend)
+        return [llm.realtime_call(_messages(line)) for line in RESPONSES]
+
+    recorded = run(RecordingBackend(inner, str(cassette)))
+    assert inner.closed_early == 2
+    assert recorded == [
+        "None.", "None.", "None of the medications helped.", "Patient reports chest pain."
+    ]
+    assert len(cassette.read_text(encoding="utf-8").splitlines()) == len(RESPONSES)
+
+    assert run(ReplayBackend(str(cassette))) == recorded
+
+
+def test_early_verdict_waits_for_a_whole_none():
+    assert early_verdict("None.") == "none"
+    assert early_verdict("None\n") == "none"
+    assert early_verdict("None") is None
+    assert early_verdict("None ") is None
+    assert early_verdict("None of the medications helped") == "summary"
+    assert early_verdict("Nonetheless") == "summary"
+    assert early_verdict("Patient") == "summary"
@@ -0,0 +1,32 @@
+"""StreamingEvaluator shared by several sweeps (run_all.py)."""
+
+from src.evaluation.pipeline import StreamingEvaluator
+
+
+class LengthMetrics:
+    """compute_all stand-in: one metric, the prediction length."""
+
+    def __init__(self):
+        self.pairs_requested = 0
+        self.pairs_scored = 0
+        self.calls = 0
+
+    def compute_all(self, predictions, references):
+        self.calls += len(predictions)
+        return {"Length": {"scores": [float(len(p)) for p in predictions]}}
+
+
+def test_shared_evaluator_counts_each_pair_once():
+    metrics = LengthMetrics()
+    evaluator = StreamingEvaluator(metrics)
+    first = {0: (["a", "bb"], ["r1", "r2"]), 1: (["a", "ccc"], ["r1", "r2"])}
+    second = {0: (["a", "bb"], ["r1", "r2"]), 1: (["dddd", "bb"], ["r1", "r2"])}
+
+    results = evaluator.sweep_results(first)
+    assert results[1]["Length"]["mean"] == 2.0
+    assert (metrics.pairs_requested, metrics.pairs_scored) == (4, 3)
+
+    results = evaluator.sweep_results(second)  # ("dddd", "r1") is scored after finish()
+    assert results[1]["Length"]["scores"] == [4.0, 2.0]
+    assert (metrics.pairs_requested, metrics.pairs_scored) == (8, 4)
+    assert metrics.calls == 4